@@ -0,0 +1,133 @@
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Максимальное число строк данных на листе Excel (без строки заголовка)
+EXCEL_MAX_ROWS = 1_048_575
+
+# Категории: (доля операций, MCC, варианты описания, медианная сумма, признак поступления)
+CATEGORIES: Dict[str, Tuple[float, float, List[str], float, bool]] = {
+    "Супермаркеты": (0.34, 5411.0, ["Колхоз", "Магнит", "SPAR", "Пятёрочка", "Перекрёсток"], 350.0, False),
+    "Фастфуд": (0.19, 5814.0, ["Бургер Кинг", "McDonald's", "KFC", "Kofe s sobojj"], 250.0, False),
+    "Транспорт": (0.06, 4131.0, ["Метро Санкт-Петербург", "Яндекс Такси"], 60.0, False),
+    "Переводы": (
+        0.05,
+        6012.0,
+        ["Иван С.", "Сергей З.", "Артем П.", "Константин Л.", "Перевод с карты"],
+        3000.0,
+        False,
+    ),
+    "Ж/д билеты": (0.04, 4112.0, ["РЖД", "Ozon.travel"], 1800.0, False),
+    "Различные товары": (0.04, 5399.0, ["Ozon.ru", "Wildberries", "AliExpress"], 900.0, False),
+    "Связь": (0.03, 7379.0, ["МТС +7 921 111-22-33", "Тинькофф Мобайл +7 995 555-55-55"], 300.0, False),
+    "Пополнения": (0.03, 6012.0, ["Пополнение через Сбербанк", "Пополнение счета"], 15000.0, True),
+    "Аптеки": (0.02, 5912.0, ["Apteka 7", "Ригла"], 450.0, False),
+    "Каршеринг": (0.02, 7512.0, ["Ситидрайв", "Делимобиль"], 400.0, False),
+    "Рестораны": (0.02, 5812.0, ["Mouse Tail", "Pizza Hut"], 1500.0, False),
+    "Бонусы": (0.015, np.nan, ["Кешбэк за обычные покупки"], 300.0, True),
+    "Наличные": (0.015, 6011.0, ["Снятие в банкомате Сбербанк"], 5000.0, False),
+    "Дом и ремонт": (0.015, 5200.0, ["Леруа Мерлен", "OBI"], 2500.0, False),
+    "Услуги банка": (0.015, np.nan, ["Плата за обслуживание"], 99.0, False),
+    "Образование": (0.01, 8299.0, ["СПбПУ", "Skillbox"], 4000.0, False),
+    "Топливо": (0.01, 5541.0, ["Shell", "Лукойл"], 2000.0, False),
+    "Одежда и обувь": (0.01, 5651.0, ["Zara", "Adidas"], 3500.0, False),
+    "Другое": (0.015, 5817.0, ["Google Play", "App Store"], 300.0, False),
+}
+
+CARDS = ["*7197", "*4556", "*5091", "*5441", "*1112", "*5507", "*6002"]
+CARD_WEIGHTS = [0.72, 0.17, 0.03, 0.02, 0.02, 0.02, 0.02]
+FOREIGN_CURRENCIES = ["TRY", "EUR", "CNY", "USD"]
+
+COLUMNS = [
+    "Дата операции",
+    "Дата платежа",
+    "Номер карты",
+    "Статус",
+    "Сумма операции",
+    "Валюта операции",
+    "Сумма платежа",
+    "Валюта платежа",
+    "Кэшбэк",
+    "Категория",
+    "MCC",
+    "Описание",
+    "Бонусы (включая кэшбэк)",
+    "Округление на инвесткопилку",
+    "Сумма операции с округлением",
+]
+
+
+def generate_transactions(
+    n_rows: int, seed: int = 0, start: str = "2018-01-01", end: str = "2021-12-31 23:59:59"
+) -> pd.DataFrame:
+    """Генерирует синтетическую выписку в формате operations.xlsx.
+    Операции отсортированы по убыванию даты, как в выгрузке банка."""
+    rng = np.random.default_rng(seed)
+
+    names = list(CATEGORIES)
+    weights = np.array([CATEGORIES[name][0] for name in names])
+    category_idx = rng.choice(len(names), size=n_rows, p=weights / weights.sum())
+
+    mcc = np.array([CATEGORIES[name][1] for name in names])[category_idx]
+    medians = np.array([CATEGORIES[name][3] for name in names])[category_idx]
+    is_income = np.array([CATEGORIES[name][4] for name in names])[category_idx]
+
+    # Описание выбирается из вариантов своей категории
+    descriptions = np.empty(n_rows, dtype=object)
+    for idx, name in enumerate(names):
+        mask = category_idx == idx
+        options = np.array(CATEGORIES[name][2], dtype=object)
+        descriptions[mask] = options[rng.integers(0, len(options), size=int(mask.sum()))]
+
+    amounts = np.round(rng.lognormal(mean=np.log(medians), sigma=0.8), 2)
+    payment = np.where(is_income, amounts, -amounts)
+    rounded = np.where(is_income, amounts, np.ceil(amounts / 10) * 10)
+
+    start_ts, end_ts = pd.Timestamp(start).value // 10**9, pd.Timestamp(end).value // 10**9
+    seconds = np.sort(rng.integers(start_ts, end_ts, size=n_rows))[::-1]
+    operation_dates = pd.to_datetime(seconds, unit="s")
+    payment_dates = operation_dates + pd.to_timedelta(rng.integers(0, 3, size=n_rows), unit="D")
+
+    cards = np.array(CARDS, dtype=object)[rng.choice(len(CARDS), size=n_rows, p=CARD_WEIGHTS)]
+    cards[rng.random(n_rows) < 0.1] = np.nan
+
+    operation_currency = np.full(n_rows, "RUB", dtype=object)
+    foreign = rng.random(n_rows) < 0.02
+    operation_currency[foreign] = np.array(FOREIGN_CURRENCIES, dtype=object)[
+        rng.integers(0, len(FOREIGN_CURRENCIES), size=int(foreign.sum()))
+    ]
+
+    status = np.where(rng.random(n_rows) < 0.006, "FAILED", "OK")
+    cashback = np.where(rng.random(n_rows) < 0.1, np.floor(amounts * 0.01), np.nan)
+
+    return pd.DataFrame(
+        {
+            "Дата операции": operation_dates.strftime("%d.%m.%Y %H:%M:%S"),
+            "Дата платежа": payment_dates.strftime("%d.%m.%Y"),
+            "Номер карты": cards,
+            "Статус": status,
+            "Сумма операции": payment,
+            "Валюта операции": operation_currency,
+            "Сумма платежа": payment,
+            "Валюта платежа": "RUB",
+            "Кэшбэк": cashback,
+            "Категория": np.array(names, dtype=object)[category_idx],
+            "MCC": mcc,
+            "Описание": descriptions,
+            "Бонусы (включая кэшбэк)": np.floor(amounts * 0.01).astype("int64"),
+            "Округление на инвесткопилку": 0,
+            "Сумма операции с округлением": rounded,
+        },
+        columns=COLUMNS,
+    )
+
+
+def write_operations_xlsx(df_transactions: pd.DataFrame, path: Union[str, Path]) -> Path:
+    """Записывает синтетическую выписку в Excel-файл того же вида, что и data/operations.xlsx."""
+    if len(df_transactions) > EXCEL_MAX_ROWS:
+        raise ValueError(f"Excel не поддерживает больше {EXCEL_MAX_ROWS} строк на листе")
+    path = Path(path)
+    df_transactions.to_excel(path, index=False)
+    return path
@@ -0,0 +1,267 @@
+"""Бенчмарки функций обработки транзакций на синтетических данных.
+
+Пример запуска:
+    python -m benchmarks.run_benchmarks --sizes 10000 100000 --output benchmarks/results/current.json
+    python -m benchmarks.run_benchmarks --sizes 10000 --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from benchmarks.generator import EXCEL_MAX_ROWS, generate_transactions, write_operations_xlsx
+from src import utils
+from src.database import TransactionDatabase
+from src.dates import clear_cache as clear_dates_cache
+from src.dates import parse_dates
+from src.parallel import aggregate_cards_parallel
+from src.reports import spending_by_category
+from src.serialization import dumps
+from src.services import find_anomalous_payments, find_duplicate_charges, get_transactions_ind
+from src.stub_server import StubQuoteServer
+from src.utils import get_expenses_cards, top_transaction, transaction_currency
+from src.views import clear_page_cache, form_main_page_info
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Бенчмарк: имя -> функция, которая по датафрейму и пути к Excel-файлу возвращает
+# (подготовку аргументов, измеряемую функцию). Подготовка не входит в замер.
+Setup = Callable[[], Tuple[Any, ...]]
+Benchmark = Callable[[pd.DataFrame, Optional[Path]], Tuple[Setup, Callable[..., Any]]]
+
+TRANSFER_PATTERN = r"\b[А-Я][а-я]+\s[А-Я]\."
+
+
+def _last_date(df: pd.DataFrame) -> str:
+    return str(df["Дата операции"].iloc[0])
+
+
+def _uncached_dates(df: pd.DataFrame) -> Tuple[pd.Series]:
+    """Столбец дат для замера разбора без кэша предыдущих повторов."""
+    clear_dates_cache()
+    return (df["Дата операции"],)
+
+
+def _to_datetime(dates: pd.Series) -> pd.Series:
+    """Прежний способ разбора дат, для сравнения с parse_dates."""
+    return pd.to_datetime(dates, dayfirst=True, errors="coerce")
+
+
+def _response_records(df: pd.DataFrame) -> Tuple[List[Dict[str, Any]]]:
+    """Ответ размером со всю выписку: записи с numpy-скалярами, как после выборки из датафрейма."""
+    return ([dict(zip(df.columns, row)) for row in df.itertuples(index=False)],)
+
+
+_databases: Dict[int, TransactionDatabase] = {}
+
+
+def _database(df: pd.DataFrame) -> Tuple[TransactionDatabase]:
+    """База SQLite с данными выписки. Создается один раз для датафрейма и не входит в замер."""
+    if id(df) not in _databases:
+        path = Path(tempfile.mkdtemp()) / "transactions.db"
+        _databases[id(df)] = TransactionDatabase.build(df, path)
+    return (_databases[id(df)],)
+
+
+def _main_page_args(df: pd.DataFrame) -> Tuple[pd.DataFrame, str]:
+    """Аргументы главной страницы. Кэш данных страницы очищается перед каждым повтором:
+    его ключ строится по файлу data/operations.xlsx, а не по подставленной выписке."""
+    clear_page_cache()
+    return df, _last_date(df)
+
+
+def _stub_response(url: str, *args: Any, **kwargs: Any) -> MagicMock:
+    """Заглушка HTTP-ответов API курсов валют и акций."""
+    if "/latest.json" in url:
+        return MagicMock(status_code=200, json=lambda: {"rates": {"RUB": 73.21, "EUR": 0.88, "USD": 1.0}})
+    return MagicMock(status_code=200, json=lambda: {"Global Quote": {"05. price": "150.12"}})
+
+
+def _main_page(df: pd.DataFrame, date: str) -> Any:
+    page_date = datetime.strptime(date, "%d.%m.%Y %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
+    with (
+        patch("src.views.pd.read_excel", return_value=df),
+        patch("src.api_client.requests.get", side_effect=_stub_response),
+        patch.dict("os.environ", {"API_KEY": "benchmark", "API_KEY_STOCK": "benchmark"}),
+    ):
+        return form_main_page_info(page_date)
+
+
+_stub_servers: List[StubQuoteServer] = []
+
+
+def _main_page_stub_server(df: pd.DataFrame, date: str) -> Any:
+    """Главная страница с котировками по HTTP от локального сервера-заглушки (src.stub_server)."""
+    if not _stub_servers:
+        _stub_servers.append(StubQuoteServer().start())
+    page_date = datetime.strptime(date, "%d.%m.%Y %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
+    environ = {**_stub_servers[0].environ(), "API_MODE": "live", "API_KEY": "benchmark", "API_KEY_STOCK": "benchmark"}
+    with patch("src.views.pd.read_excel", return_value=df), patch.dict("os.environ", environ):
+        return form_main_page_info(page_date)
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "reader_transaction_excel": lambda df, xlsx: ((lambda: (str(xlsx),)), utils.reader_transaction_excel),
+    "get_dict_transaction": lambda df, xlsx: ((lambda: (str(xlsx),)), utils.get_dict_transaction),
+    "top_transaction": lambda df, xlsx: ((lambda: (df,)), top_transaction),
+    "get_expenses_cards": lambda df, xlsx: ((lambda: (df,)), get_expenses_cards),
+    "get_expenses_cards_parallel_card": lambda df, xlsx: (
+        (lambda: (df,)),
+        lambda data: aggregate_cards_parallel(data, partition="card"),
+    ),
+    "get_expenses_cards_parallel_month": lambda df, xlsx: (
+        (lambda: (df,)),
+        lambda data: aggregate_cards_parallel(data, by_month=True, partition="month"),
+    ),
+    "get_expenses_cards_database": lambda df, xlsx: ((lambda: _database(df)), get_expenses_cards),
+    "top_transaction_database": lambda df, xlsx: ((lambda: _database(df)), top_transaction),
+    "database_build": lambda df, xlsx: (
+        (lambda: (df, Path(tempfile.mkdtemp()) / "transactions.db")),
+        TransactionDatabase.build,
+    ),
+    "transaction_currency": lambda df, xlsx: ((lambda: (df, _last_date(df))), transaction_currency),
+    # Запись отчета декоратором выполняется в фоне и в замер не входит
+    "spending_by_category": lambda df, xlsx: (
+        (lambda: (df.copy(), "Супермаркеты", _last_date(df))),
+        spending_by_category.__wrapped__,
+    ),
+    "get_transactions_ind": lambda df, xlsx: (
+        (lambda: (df.to_dict(orient="records"), TRANSFER_PATTERN)),
+        get_transactions_ind,
+    ),
+    "form_main_page_info": lambda df, xlsx: ((lambda: _main_page_args(df)), _main_page),
+    "form_main_page_info_stub_server": lambda df, xlsx: ((lambda: _main_page_args(df)), _main_page_stub_server),
+    "parse_dates": lambda df, xlsx: ((lambda: _uncached_dates(df)), parse_dates),
+    "parse_dates_cached": lambda df, xlsx: ((lambda: (df["Дата операции"],)), parse_dates),
+    "parse_dates_to_datetime": lambda df, xlsx: ((lambda: (df["Дата операции"],)), _to_datetime),
+    "find_duplicate_charges": lambda df, xlsx: ((lambda: (df,)), find_duplicate_charges),
+    "find_anomalous_payments": lambda df, xlsx: ((lambda: (df,)), find_anomalous_payments),
+    "serialize_pretty": lambda df, xlsx: ((lambda: _response_records(df)), lambda data: dumps(data, indent=4)),
+    "serialize_compact_json": lambda df, xlsx: (
+        (lambda: _response_records(df)),
+        lambda data: dumps(data, compact=True, backend="json"),
+    ),
+    "serialize_compact_orjson": lambda df, xlsx: (
+        (lambda: _response_records(df)),
+        lambda data: dumps(data, compact=True, backend="orjson"),
+    ),
+}
+
+EXCEL_BENCHMARKS = {"reader_transaction_excel", "get_dict_transaction"}
+
+
+def time_benchmark(setup: Setup, func: Callable[..., Any], repeat: int) -> Dict[str, float]:
+    """Замеряет время выполнения функции repeat раз и возвращает статистику в секундах."""
+    timings = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "repeat": repeat,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    sizes: List[int], names: List[str], repeat: int = 3, excel_max_rows: int = 100_000, seed: int = 0
+) -> Dict[str, Any]:
+    """Запускает выбранные бенчмарки на данных каждого размера и возвращает результаты."""
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            df = generate_transactions(size, seed=seed)
+            xlsx: Optional[Path] = None
+            if size <= min(excel_max_rows, EXCEL_MAX_ROWS) and EXCEL_BENCHMARKS & set(names):
+                xlsx = write_operations_xlsx(df, Path(tmp_dir) / f"operations_{size}.xlsx")
+
+            for name in names:
+                if name in EXCEL_BENCHMARKS and xlsx is None:
+                    print(f"{name}[{size}]: пропущен, Excel-файл не создается для такого размера")
+                    continue
+                setup, func = BENCHMARKS[name](df, xlsx)
+                stats = time_benchmark(setup, func, repeat)
+                stats["rows"] = size
+                results[f"{name}[{size}]"] = stats
+                print(f"{name}[{size}]: median {stats['median']:.4f} s, {size / stats['median']:,.0f} rows/s")
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+        },
+        "results": results,
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2) -> List[Dict[str, Any]]:
+    """Сравнивает медианы с базовыми результатами и возвращает список регрессий,
+    то есть бенчмарков, замедлившихся больше чем на threshold."""
+    regressions = []
+    for name, stats in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = stats["median"] / base["median"]
+        if ratio > 1 + threshold:
+            regressions.append({"name": name, "baseline": base["median"], "current": stats["median"], "ratio": ratio})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки обработки транзакций")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES[:2], help="Размеры выписок")
+    parser.add_argument("--benchmarks", nargs="+", default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов каждого замера")
+    parser.add_argument("--excel-max-rows", type=int, default=100_000, help="Максимальный размер Excel-файла")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "latest.json")
+    parser.add_argument("--compare", type=Path, help="Файл с результатами для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимое замедление (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.benchmarks, args.repeat, args.excel_max_rows, args.seed)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Результаты записаны в {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare_results(report, baseline, args.threshold)
+        for regression in regressions:
+            print(
+                f"Регрессия {regression['name']}: {regression['baseline']:.4f} s -> "
+                f"{regression['current']:.4f} s (x{regression['ratio']:.2f})"
+            )
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
+import logging
+
 from src.config import file_path
+from src.profiling import collect_timings, format_timings, stage
 from src.reports import spending_by_category
 from src.services import get_transactions_ind
 from src.utils import get_dict_transaction, reader_transaction_excel
@@ -6,28 +9,42 @@ from src.views import create_json_response, get_expenses_cards, greeting_by_time
 
 
 def main() -> None:
+    with collect_timings() as timings:
+        _main()
+    # Разбивка времени выполнения по этапам
+    for record in format_timings(timings):
+        logging.info(f"Этап {record['stage']}: {record['seconds']} с, строк: {record['rows']}")
+
+
+def _main() -> None:
     # 1. Получение текущего времени и приветствия
     greeting = greeting_by_time_of_day()
     print(greeting)  # Выводим приветствие
 
     # 2. Чтение транзакций из Excel
     try:
-        transactions_df = reader_transaction_excel(str(file_path))
+        with stage("read_excel") as record:
+            transactions_df = reader_transaction_excel(str(file_path))
+            record["rows"] = len(transactions_df)
     except FileNotFoundError:
         print(f"Ошибка: файл '{file_path}' не найден.")
         return
 
     # 3. Преобразование DataFrame в словарь
-    transactions_dict = get_dict_transaction(str(file_path))
+    with stage("get_dict_transaction", rows=len(transactions_df)):
+        transactions_dict = get_dict_transaction(str(file_path))
 
     # 4. Генерация карт расходов
-    expenses_cards = get_expenses_cards(transactions_df)
+    with stage("cards", rows=len(transactions_df)):
+        expenses_cards = get_expenses_cards(transactions_df)
 
     # 5. Топ транзакции
-    top_transactions = top_transaction(transactions_df)
+    with stage("top_transactions", rows=len(transactions_df)):
+        top_transactions = top_transaction(transactions_df)
 
     # 6. Формирование JSON-ответа
-    json_response = create_json_response(expenses_cards, top_transactions)
+    with stage("serialize"):
+        json_response = create_json_response(expenses_cards, top_transactions)
 
     # 7. Вывод JSON-ответа
     print("JSON-ответ:")
@@ -42,13 +59,15 @@ def main() -> None:
     print(f"Ваш кешбэк за месяц: {cashback} рублей.")
 
     # 10. Регистрация всех транзакций инд
-    recent_transactions_json = get_transactions_ind(transactions_dict, "Физлицо")
+    with stage("transactions_ind", rows=len(transactions_dict)):
+        recent_transactions_json = get_transactions_ind(transactions_dict, "Физлицо")
     print("JSON со всеми транзакциями по физлицам:")
     print(recent_transactions_json)
 
     # 11. Пример: получение расходов по категории за последние 3 месяца
     category = "Продукты"  # Название категории, для которой вы хотите получить данные
-    category_expenses = spending_by_category(transactions_df, category)
+    with stage("spending_by_category", rows=len(transactions_df)):
+        category_expenses = spending_by_category(transactions_df, category)
     print(f"Расходы по категории '{category}' за последние 3 месяца:")
     print(category_expenses)
 
@@ -0,0 +1,118 @@
+"""HTTP-запросы к API курсов валют и акций.
+
+Базовые адреса API задаются переменными окружения CURRENCY_API_URL и STOCK_API_URL
+(по умолчанию openexchangerates.org и alphavantage.co), поэтому запросы можно направить
+на локальный сервер-заглушку (src.stub_server). Переменная API_MODE включает запись ответов
+("record") в директорию API_RECORDINGS_DIR или их воспроизведение без сети ("replay").
+API-ключи из параметров запроса в записи не попадают и на выбор записи не влияют.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from src.config import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CURRENCY_API_URL = "https://openexchangerates.org/api"
+DEFAULT_STOCK_API_URL = "https://www.alphavantage.co"
+DEFAULT_RECORDINGS_DIR = DATA_DIR / "api_recordings"
+API_MODES = ("live", "record", "replay")
+# Параметры запроса с API-ключами
+SECRET_PARAMS = ("app_id", "apikey")
+REQUEST_TIMEOUT = 10
+
+
+def currency_api_url() -> str:
+    """Базовый адрес API курсов валют (переменная окружения CURRENCY_API_URL)."""
+    return os.environ.get("CURRENCY_API_URL", DEFAULT_CURRENCY_API_URL).rstrip("/")
+
+
+def stock_api_url() -> str:
+    """Базовый адрес API котировок акций (переменная окружения STOCK_API_URL)."""
+    return os.environ.get("STOCK_API_URL", DEFAULT_STOCK_API_URL).rstrip("/")
+
+
+def get_api_mode() -> str:
+    """Режим запросов из переменной окружения API_MODE: "live" (по умолчанию), "record" или "replay"."""
+    mode = os.environ.get("API_MODE", "live").strip().lower()
+    if mode not in API_MODES:
+        logger.warning(f"Неизвестный режим запросов к API: {mode}")
+        return "live"
+    return mode
+
+
+def recordings_dir() -> Path:
+    return Path(os.environ.get("API_RECORDINGS_DIR", DEFAULT_RECORDINGS_DIR))
+
+
+class RecordedResponse:
+    """Записанный ответ API с теми атрибутами requests.Response, которые используют функции котировок."""
+
+    def __init__(self, status_code: int, text: str, reason: str = "") -> None:
+        self.status_code = status_code
+        self.text = text
+        self.reason = reason
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+def _redact(url: str) -> str:
+    """Адрес запроса без API-ключей и с упорядоченными параметрами."""
+    parts = urlsplit(url)
+    params = sorted((key, value) for key, value in parse_qsl(parts.query) if key not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(params), ""))
+
+
+def recording_path(url: str, directory: Optional[Union[str, Path]] = None) -> Path:
+    """Файл записи ответа на запрос url."""
+    redacted = _redact(url)
+    digest = hashlib.sha1(redacted.encode("utf-8")).hexdigest()[:16]
+    return Path(directory or recordings_dir()) / f"{urlsplit(redacted).hostname}_{digest}.json"
+
+
+def _save_recording(url: str, response: Any, directory: Optional[Union[str, Path]] = None) -> None:
+    """Сохраняет ответ атомарно (временный файл + переименование)."""
+    path = recording_path(url, directory)
+    os.makedirs(path.parent, exist_ok=True)
+    record: Dict[str, Any] = {
+        "url": _redact(url),
+        "status_code": response.status_code,
+        "reason": response.reason,
+        "text": response.text,
+    }
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, delete=False, suffix=".tmp") as file:
+        json.dump(record, file, ensure_ascii=False, indent=2)
+    os.replace(file.name, path)
+    logger.info(f"Ответ {record['url']} записан в {path}")
+
+
+def _load_recording(url: str, directory: Optional[Union[str, Path]] = None) -> RecordedResponse:
+    path = recording_path(url, directory)
+    try:
+        with open(path, encoding="utf-8") as file:
+            record = json.load(file)
+    except FileNotFoundError:
+        logger.error(f"Нет записанного ответа на запрос {_redact(url)} ({path})")
+        return RecordedResponse(404, "", "Нет записанного ответа")
+    return RecordedResponse(record["status_code"], record["text"], record.get("reason", ""))
+
+
+def api_get(url: str) -> Any:
+    """Выполняет GET-запрос к API с учетом режима API_MODE и возвращает ответ."""
+    mode = get_api_mode()
+    if mode == "replay":
+        return _load_recording(url)
+    response = requests.get(url, timeout=REQUEST_TIMEOUT)
+    if mode == "record":
+        _save_recording(url, response)
+    return response
@@ -0,0 +1,177 @@
+"""Пакетное формирование главной страницы для многих пользователей.
+
+Манифест - JSON-список или CSV-файл с полями user, statement, settings, date.
+Пример запуска:
+    python -m src.batch manifest.json output/ --workers 8
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TypedDict, Union
+
+from src.config import load_user_currencies, load_user_stocks, write_report
+from src.utils import get_currency_rates, get_stock_price
+from src.views import form_main_page_info
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FIELDS = ("user", "statement", "settings", "date")
+
+# Котировки, общие для всех задач рабочего процесса
+_worker_quotes: Dict[str, Dict[str, Any]] = {}
+
+
+class BatchTask(TypedDict):
+    """Задача пакета: запись манифеста и валюты и акции из настроек пользователя."""
+
+    user: str
+    statement: str
+    settings: str
+    date: str
+    currencies: List[str]
+    stocks: List[str]
+
+
+def load_manifest(manifest_path: Union[str, Path]) -> List[Dict[str, str]]:
+    """Загружает манифест пакета из JSON- или CSV-файла."""
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, encoding="utf-8", newline="") as file:
+        if manifest_path.suffix.lower() == ".csv":
+            tasks = list(csv.DictReader(file))
+        else:
+            tasks = json.load(file)
+
+    for number, task in enumerate(tasks, start=1):
+        missing = [field for field in MANIFEST_FIELDS if not task.get(field)]
+        if missing:
+            raise ValueError(f"В записи {number} манифеста отсутствуют поля: {', '.join(missing)}")
+    return tasks
+
+
+def fetch_shared_quotes(currencies: List[str], stocks: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Запрашивает котировки всех валют и акций пакета по одному разу."""
+    rates = get_currency_rates(currencies)
+    prices = get_stock_price(stocks)
+    return {
+        "currency_rates": {rate["currency"]: rate for rate in rates},
+        "stock_prices": {price["stock"]: price for price in prices},
+    }
+
+
+def select_user_quotes(
+    quotes: Dict[str, Dict[str, Any]], currencies: List[str], stocks: List[str]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Выбирает из общего кэша котировки пользователя в том же виде,
+    в каком их возвращают get_currency_rates и get_stock_price."""
+    rates = quotes["currency_rates"]
+    # get_currency_rates всегда возвращает курс USD первым
+    user_currencies = ["USD"] + [currency for currency in currencies if currency != "USD"]
+    return {
+        "currency_rates": [rates[currency] for currency in user_currencies if currency in rates],
+        "stock_prices": [quotes["stock_prices"][stock] for stock in stocks if stock in quotes["stock_prices"]],
+    }
+
+
+def _init_worker(quotes: Dict[str, Dict[str, Any]]) -> None:
+    """Инициализация рабочего процесса: общий кэш котировок передается один раз на процесс."""
+    _worker_quotes.clear()
+    _worker_quotes.update(quotes)
+
+
+def render_user_page(task: BatchTask, output_dir: str) -> Dict[str, Any]:
+    """Формирует главную страницу одного пользователя и записывает ее в output_dir/<user>.json.
+    Статус "ok" означает, что страница сформирована и записана."""
+    start = time.perf_counter()
+    user_quotes = select_user_quotes(_worker_quotes, task["currencies"], task["stocks"])
+    try:
+        result = form_main_page_info(
+            task["date"],
+            statement_path=task["statement"],
+            settings_path=task["settings"],
+            currency_rates=user_quotes["currency_rates"],
+            stock_prices=user_quotes["stock_prices"],
+        )
+        # При ошибке form_main_page_info возвращает JSON-строку
+        page = json.loads(result) if isinstance(result, str) else result
+        status = "error" if isinstance(result, str) else "ok"
+    except Exception as e:
+        logger.error(f"Ошибка формирования страницы пользователя {task['user']}: {e}")
+        page, status = {"error": str(e)}, "error"
+
+    output = os.path.join(output_dir, f"{task['user']}.json")
+    if not write_report(output, page):
+        status = "error"
+    return {"user": task["user"], "status": status, "output": output, "seconds": time.perf_counter() - start}
+
+
+def run_batch(
+    manifest: Union[str, Path, List[Dict[str, str]]],
+    output_dir: Union[str, Path],
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+) -> Dict[str, Any]:
+    """Формирует главные страницы всех пользователей манифеста в пуле процессов.
+    Котировки запрашиваются один раз на весь пакет. Возвращает сводку с пропускной способностью."""
+    start = time.perf_counter()
+    entries = load_manifest(manifest) if isinstance(manifest, (str, Path)) else manifest
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Настройки каждого пользователя читаются в основном процессе, чтобы собрать общий список котировок
+    tasks = [
+        BatchTask(
+            user=entry["user"],
+            statement=entry["statement"],
+            settings=entry["settings"],
+            date=entry["date"],
+            currencies=load_user_currencies(entry["settings"]),
+            stocks=load_user_stocks(entry["settings"]),
+        )
+        for entry in entries
+    ]
+    all_currencies = sorted({currency for task in tasks for currency in task["currencies"]})
+    all_stocks = sorted({stock for task in tasks for stock in task["stocks"]})
+
+    quotes_start = time.perf_counter()
+    quotes = fetch_shared_quotes(all_currencies, all_stocks)
+    quotes_seconds = time.perf_counter() - quotes_start
+    logger.info(f"Котировки пакета получены: валют {len(all_currencies)}, акций {len(all_stocks)}")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(quotes,)) as executor:
+        results = list(
+            executor.map(render_user_page, tasks, [str(output_dir)] * len(tasks), chunksize=max(chunksize, 1))
+        )
+
+    seconds = time.perf_counter() - start
+    failed = [result["user"] for result in results if result["status"] != "ok"]
+    summary = {
+        "users": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": failed,
+        "seconds": round(seconds, 3),
+        "quotes_seconds": round(quotes_seconds, 3),
+        "users_per_second": round(len(results) / seconds, 2) if seconds else None,
+    }
+    logger.info(f"Пакет обработан: {summary}")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Пакетное формирование главной страницы")
+    parser.add_argument("manifest", type=Path, help="JSON- или CSV-файл с полями user, statement, settings, date")
+    parser.add_argument("output_dir", type=Path, help="Директория для JSON-файлов пользователей")
+    parser.add_argument("--workers", type=int, default=None, help="Количество процессов")
+    parser.add_argument("--chunksize", type=int, default=16, help="Количество пользователей в одной порции")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.manifest, args.output_dir, args.workers, args.chunksize)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Правила кешбэка и формат агрегатов по картам.
+
+Общие функции для всех способов подсчета get_expenses_cards: в pandas (src.utils),
+в пуле процессов (src.parallel) и запросом к базе SQLite (src.database). Правило может задавать
+категорию ("category") или MCC-код ("mcc"), ставку ("rate") и лимит кешбэка по карте за период ("cap").
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def cashback_rates(df_transactions: pd.DataFrame, rules: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Возвращает для каждой транзакции ставку кешбэка и номер сработавшего правила (-1 - без правила)."""
+    default_rate, default_id = 0.0, -1
+    category_rules: Dict[Any, Tuple[float, int]] = {}
+    mcc_rules: Dict[Any, Tuple[float, int]] = {}
+    for rule_id, rule in enumerate(rules):
+        if "mcc" in rule:
+            mcc_rules[float(rule["mcc"])] = (rule["rate"], rule_id)
+        elif "category" in rule:
+            category_rules[rule["category"]] = (rule["rate"], rule_id)
+        else:
+            default_rate, default_id = rule["rate"], rule_id
+
+    rates = np.full(len(df_transactions), default_rate, dtype="float64")
+    rule_ids = np.full(len(df_transactions), default_id, dtype="int64")
+    # Сначала применяем правила по категориям, затем более приоритетные правила по MCC
+    for column, column_rules, numeric in (("Категория", category_rules, False), ("MCC", mcc_rules, True)):
+        if not column_rules or column not in df_transactions.columns:
+            continue
+        keys = pd.to_numeric(df_transactions[column], errors="coerce") if numeric else df_transactions[column]
+        matched_rates = keys.map({key: rate for key, (rate, _) in column_rules.items()}).to_numpy(dtype="float64")
+        matched_ids = keys.map({key: rid for key, (_, rid) in column_rules.items()}).to_numpy(dtype="float64")
+        mask = ~np.isnan(matched_rates)
+        rates[mask] = matched_rates[mask]
+        rule_ids[mask] = matched_ids[mask]
+    return rates, rule_ids
+
+
+def capped_cashback(cashback: pd.Series, keys: List[str], rules: List[Dict[str, Any]]) -> pd.Series:
+    """Суммирует кешбэк, посчитанный в разрезе keys + ["rule"], ограничивая его лимитом правила
+    в пределах карты (и месяца)."""
+    caps = {rule_id: rule["cap"] for rule_id, rule in enumerate(rules) if "cap" in rule}
+    if caps:
+        rule_caps = cashback.index.get_level_values("rule").map(caps).to_numpy(dtype="float64", na_value=float("inf"))
+        cashback = cashback.clip(upper=rule_caps)
+    return cashback.groupby(level=keys, observed=True).sum()
+
+
+def format_cards(totals: pd.DataFrame, by_month: bool) -> List[Dict[str, Any]]:
+    """Преобразует агрегаты по картам (индекс - карта или карта и месяц) в список словарей ответа."""
+    expenses_cards = []
+    for key, row in zip(totals.index, totals.itertuples(index=False)):
+        card, month = (key, None) if not by_month else key
+        expenses_card = {
+            "last_digits": str(card)[-4:],
+            "total_spent": round(row.total_spent, 2),
+            "cashback": round(row.cashback, 2),
+            "transactions": int(row.transactions),
+            "income": round(row.income, 2),
+        }
+        if by_month:
+            expenses_card = {"month": month, **expenses_card}
+        expenses_cards.append(expenses_card)
+    return expenses_cards
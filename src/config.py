@@ -1,8 +1,15 @@
+import atexit
+import functools
+import gzip
 import json
 import logging
 import os
+import tempfile
+import threading
 from pathlib import Path
-from typing import Any, Callable, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from src.serialization import dumps_bytes
 
 # Определяем корневую директорию проекта
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -30,44 +37,309 @@ logging.basicConfig(
 # Путь к файлу пользовательских настроек
 user_setting_path = Path(PROJECT_ROOT) / "user_settings.json"
 
+# Путь к файлу конфигурации приложения
+app_config_path = Path(PROJECT_ROOT) / "src" / "config.json"
+
+# Режим выполнения агрегаций по картам (секция "execution" в config.json):
+# "single" - в одном процессе, "parallel" - в пуле процессов над массивами в общей памяти.
+# В параллельном режиме выписка делится на части по картам ("card") или по месяцам ("month"),
+# и он включается только для выписок не меньше min_rows строк. workers - число процессов (None - по числу ядер).
+EXECUTION_MODES = ("single", "parallel")
+PARTITIONS = ("card", "month")
+DEFAULT_EXECUTION: Dict[str, Any] = {"mode": "single", "partition": "card", "workers": None, "min_rows": 1_000_000}
+
+# Правила начисления кешбэка (секция "cashback_rules" в config.json). Правило может задавать категорию ("category")
+# или MCC-код ("mcc"), ставку ("rate") и необязательный лимит кешбэка по карте за период ("cap").
+# Правило без категории и MCC задает ставку по умолчанию. MCC имеет приоритет над категорией.
+DEFAULT_CASHBACK_RULES: List[Dict[str, Any]] = [{"rate": 0.01}]
+
+
+# Кэш пользовательских настроек: путь к файлу -> (версия файла, настройки)
+_settings_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, List[str]]]] = {}
+_settings_lock = threading.Lock()
+
+
+def get_settings_version(settings_path: Optional[Union[str, Path]] = None) -> Optional[Tuple[int, int]]:
+    """Возвращает версию файла настроек (время изменения и размер) или None, если файл недоступен."""
+    try:
+        stat = os.stat(settings_path or user_setting_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _validate_user_settings(content: Any) -> Dict[str, List[str]]:
+    """Проверяет содержимое файла настроек и оставляет только корректные значения."""
+    if not isinstance(content, dict):
+        raise ValueError("Файл настроек должен содержать JSON-объект")
+    settings = {}
+    for key in ("user_currencies", "user_stocks"):
+        values = content.get(key, [])
+        if not isinstance(values, list):
+            logging.warning(f"Настройка {key} должна быть списком, получено: {values}")
+            values = []
+        settings[key] = [value for value in values if isinstance(value, str)]
+        if len(settings[key]) != len(values):
+            logging.warning(f"В настройке {key} пропущены значения, не являющиеся строками")
+    return settings
+
+
+def get_user_settings(settings_path: Optional[Union[str, Path]] = None) -> Dict[str, List[str]]:
+    """Возвращает пользовательские настройки из user_settings.json (или из файла settings_path).
+    Настройки читаются один раз и перечитываются только при изменении файла."""
+    path = Path(settings_path) if settings_path else user_setting_path
+    version = get_settings_version(path)
+    with _settings_lock:
+        cached = _settings_cache.get(str(path))
+        if cached is not None and version is not None and cached[0] == version:
+            return cached[1]
+
+        with open(path, encoding="utf-8") as file:
+            settings = _validate_user_settings(json.load(file))
+        if version is not None:
+            _settings_cache[str(path)] = (version, settings)
+        logging.info(f"Загружены пользовательские настройки из {path}")
+        return settings
+
+
+def reload_user_settings(settings_path: Optional[Union[str, Path]] = None) -> None:
+    """Сбрасывает кэш настроек для указанного файла (или для всех файлов),
+    следующий вызов get_user_settings прочитает файл заново."""
+    with _settings_lock:
+        if settings_path is None:
+            _settings_cache.clear()
+        else:
+            _settings_cache.pop(str(Path(settings_path)), None)
 
-def load_user_currencies() -> List[str]:
+
+def load_user_currencies(settings_path: Optional[Union[str, Path]] = None) -> List[str]:
     """Загружает пользовательские валюты из файла user_settings.json."""
     try:
-        with open(user_setting_path, encoding="utf-8") as file:
-            content = json.load(file)
-        return [currency for currency in content.get("user_currencies", []) if isinstance(currency, str)]
+        return list(get_user_settings(settings_path)["user_currencies"])
     except Exception as e:
         logging.error(f"Ошибка при загрузке пользовательских валют: {e}")
         return []
 
 
-def load_user_stocks() -> List[str]:
+def load_user_stocks(settings_path: Optional[Union[str, Path]] = None) -> List[str]:
     """Загружает пользовательские акции из файла user_settings.json."""
     try:
-        with open(user_setting_path, encoding="utf-8") as file:
-            content = json.load(file)
-        return [stock for stock in content.get("user_stocks", []) if isinstance(stock, str)]
+        return list(get_user_settings(settings_path)["user_stocks"])
     except Exception as e:
         logging.error(f"Ошибка при загрузке пользовательских акций: {e}")
         return []
 
 
-def decorator_spending_by_category(report_filename: Optional[str] = None) -> Callable:
-    """Декоратор, который логирует результат функции в файл по умолчанию spending_by_category.json,
-    а также записывает сообщения в лог-файл."""
+_execution_cache: Dict[str, Tuple[Optional[Tuple[int, int]], Dict[str, Any]]] = {}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def load_execution_config(config_path: Optional[Union[str, Path]] = None) -> Dict[str, Any]:
+    """Возвращает настройки режима выполнения из секции "execution" файла config.json.
+    Некорректные и отсутствующие значения заменяются значениями по умолчанию."""
+    path = Path(config_path) if config_path else app_config_path
+    version = get_settings_version(path)
+    cached = _execution_cache.get(str(path))
+    if cached is not None and version is not None and cached[0] == version:
+        return cached[1]
+
+    execution = dict(DEFAULT_EXECUTION)
+    try:
+        with open(path, encoding="utf-8") as file:
+            execution.update(json.load(file).get("execution", {}))
+    except (OSError, ValueError, AttributeError) as e:
+        logging.warning(f"Не удалось прочитать режим выполнения из {path}: {e}")
+    if execution["mode"] not in EXECUTION_MODES:
+        logging.warning(f"Неизвестный режим выполнения: {execution['mode']}")
+        execution["mode"] = DEFAULT_EXECUTION["mode"]
+    if execution["partition"] not in PARTITIONS:
+        logging.warning(f"Неизвестный способ разбиения: {execution['partition']}")
+        execution["partition"] = DEFAULT_EXECUTION["partition"]
+    workers = execution["workers"]
+    if workers is not None and not (isinstance(workers, int) and not isinstance(workers, bool) and workers > 0):
+        logging.warning(f"Число процессов должно быть положительным целым числом: {workers}")
+        execution["workers"] = DEFAULT_EXECUTION["workers"]
+    if not _is_number(execution["min_rows"]) or execution["min_rows"] < 0:
+        logging.warning(f"Минимальный размер выписки должен быть неотрицательным числом: {execution['min_rows']}")
+        execution["min_rows"] = DEFAULT_EXECUTION["min_rows"]
+    _execution_cache[str(path)] = (version, execution)
+    return execution
+
+
+_cashback_cache: Dict[str, Tuple[Optional[Tuple[int, int]], List[Dict[str, Any]]]] = {}
+
+
+def _validate_cashback_rule(rule: Any) -> bool:
+    """Проверяет правило кешбэка: ставка и лимит - неотрицательные числа, категория - строка, MCC - число."""
+    if not isinstance(rule, dict) or not _is_number(rule.get("rate")) or rule["rate"] < 0:
+        return False
+    if "category" in rule and not isinstance(rule["category"], str):
+        return False
+    if "mcc" in rule and not _is_number(rule["mcc"]):
+        return False
+    return "cap" not in rule or rule["cap"] is None or (_is_number(rule["cap"]) and rule["cap"] >= 0)
+
+
+def load_cashback_rules(config_path: Optional[Union[str, Path]] = None) -> List[Dict[str, Any]]:
+    """Возвращает правила начисления кешбэка из секции "cashback_rules" файла config.json.
+    Некорректные правила пропускаются, без секции используются правила по умолчанию."""
+    path = Path(config_path) if config_path else app_config_path
+    version = get_settings_version(path)
+    cached = _cashback_cache.get(str(path))
+    if cached is not None and version is not None and cached[0] == version:
+        return cached[1]
+
+    rules = DEFAULT_CASHBACK_RULES
+    try:
+        with open(path, encoding="utf-8") as file:
+            content = json.load(file).get("cashback_rules", DEFAULT_CASHBACK_RULES)
+        if not isinstance(content, list):
+            raise ValueError(f"секция cashback_rules должна быть списком, получено: {content}")
+        rules = [rule for rule in content if _validate_cashback_rule(rule)]
+        if len(rules) != len(content):
+            logging.warning(f"В {path} пропущены некорректные правила кешбэка")
+    except (OSError, ValueError, AttributeError) as e:
+        logging.warning(f"Не удалось прочитать правила кешбэка из {path}: {e}")
+    _cashback_cache[str(path)] = (version, rules)
+    return rules
+
+
+class ReportWriter:
+    """Фоновая запись отчетов в файлы.
+    Отчет сериализуется в вызывающем потоке, поэтому последующие изменения результата на файл не влияют.
+    Запись выполняется в отдельном потоке атомарно (временный файл + переименование),
+    несколько записей одного и того же файла, ожидающих в очереди, объединяются в одну."""
+
+    def __init__(self) -> None:
+        self._pending: Dict[str, bytes] = {}
+        self._busy = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, filename: str, data: Any, compact: bool = False) -> bool:
+        """Ставит отчет в очередь на запись. Если файл с таким именем уже ждет записи,
+        в него будет записан только последний результат. Возвращает False, если отчет не удалось сериализовать."""
+        payload = _report_payload(filename, data, compact)
+        if payload is None:
+            return False
+        with self._condition:
+            self._pending[filename] = payload
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ожидает записи всех отчетов из очереди. Возвращает False, если время ожидания истекло."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout=timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: bool(self._pending))
+                filename = next(iter(self._pending))
+                payload = self._pending.pop(filename)
+                self._busy = True
+            try:
+                _write_payload(filename, payload)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+
+_umask_lock = threading.Lock()
+
+
+def _new_file_mode(filename: str) -> int:
+    """Права для записываемого файла: права существующего файла или 0o666 с учетом umask,
+    как у файла, созданного обычным open()."""
+    try:
+        return os.stat(filename).st_mode & 0o7777
+    except FileNotFoundError:
+        pass
+    # umask можно только прочитать, установив новое значение, поэтому чтение защищено блокировкой
+    with _umask_lock:
+        umask = os.umask(0o022)
+        os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _report_payload(filename: str, data: Any, compact: bool = False) -> Optional[bytes]:
+    """Сериализует отчет в JSON (для файлов .gz - сжатый gzip) или возвращает None при ошибке."""
+    try:
+        payload = dumps_bytes(data, indent=4, compact=compact)
+    except Exception as e:
+        logging.error(f"Произошла ошибка при записи в файл {filename}: {e}")
+        return None
+    return gzip.compress(payload) if filename.endswith(".gz") else payload
+
+
+def _write_payload(filename: str, payload: bytes) -> bool:
+    """Атомарно записывает сериализованный отчет в файл. Возвращает False при ошибке записи."""
+    try:
+        directory = os.path.dirname(os.path.abspath(filename))
+
+        mode = _new_file_mode(filename)
+        fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".report-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            # mkstemp создает файл с правами 0o600, os.replace их сохраняет
+            os.chmod(tmp_name, mode)
+            os.replace(tmp_name, filename)
+        except BaseException:
+            os.remove(tmp_name)
+            raise
+        logging.info(f"Отчет успешно записан в {filename}")
+        return True
+    except Exception as e:
+        logging.error(f"Произошла ошибка при записи в файл {filename}: {e}")
+        return False
+
+
+def write_report(filename: str, data: Any, compact: bool = False) -> bool:
+    """Атомарно записывает отчет в JSON-файл. Файлы с расширением .gz сжимаются gzip.
+    Возвращает True, если отчет записан, и False при ошибке записи."""
+    payload = _report_payload(filename, data, compact)
+    return payload is not None and _write_payload(filename, payload)
+
+
+report_writer = ReportWriter()
+atexit.register(report_writer.flush)
+
+
+def flush_reports(timeout: Optional[float] = None) -> bool:
+    """Дожидается записи всех отчетов, поставленных в очередь декоратором."""
+    return report_writer.flush(timeout)
+
+
+def decorator_spending_by_category(
+    report_filename: Optional[str] = None, compact: bool = False, use_gzip: bool = False, background: bool = True
+) -> Callable:
+    """Декоратор, который записывает результат функции в файл по умолчанию spending_by_category.json,
+    а также записывает сообщения в лог-файл.
+    По умолчанию запись выполняется в фоновом потоке, для ожидания записи используется flush_reports().
+    compact включает компактный JSON без отступов, use_gzip - сжатие (к имени файла добавляется .gz)."""
 
     def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
             result = func(*args, **kwargs)
             # Определяем имя файла для записи
             filename = report_filename if report_filename else "spending_by_category.json"
-            try:
-                with open(filename, "w", encoding="utf-8") as f:
-                    json.dump(result, f, ensure_ascii=False, indent=4)
-                logging.info(f"Результат функции {func.__name__} успешно записан в {filename}")
-            except Exception as e:
-                logging.error(f"Произошла ошибка при записи в файл: {e}")
+            if use_gzip and not filename.endswith(".gz"):
+                filename += ".gz"
+            if background:
+                if report_writer.submit(filename, result, compact):
+                    logging.info(f"Результат функции {func.__name__} поставлен в очередь на запись в {filename}")
+            else:
+                write_report(filename, result, compact)
             return result
 
         return wrapper
@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.config import DATA_DIR
+from src.utils import get_currency_rates, operation_dates
+
+logger = logging.getLogger(__name__)
+
+# Локальная история курсов: {"YYYY-MM-DD": {"USD": курс в рублях, ...}, ...}
+RATES_HISTORY_PATH = DATA_DIR / "currency_rates.json"
+
+BASE_CURRENCY = "RUB"
+
+# Столбцы сумм и соответствующие им столбцы валют
+AMOUNT_CURRENCY_COLUMNS = {
+    "Сумма платежа": "Валюта платежа",
+    "Сумма операции": "Валюта операции",
+    "Сумма операции с округлением": "Валюта платежа",
+}
+
+
+class RateTable:
+    """Таблица исторических курсов валют к рублю.
+    Курс на дату операции берется на эту дату или ближайшую предыдущую, а если более ранних
+    курсов нет - ближайший последующий."""
+
+    def __init__(self, rates: Optional[pd.DataFrame] = None) -> None:
+        if rates is None:
+            rates = pd.DataFrame({"date": pd.Series(dtype="datetime64[ns]"), "currency": [], "rate": []})
+        self._rates = self._normalize(rates)
+
+    @staticmethod
+    def _normalize(rates: pd.DataFrame) -> pd.DataFrame:
+        """Приводит таблицу к единым типам столбцов и сортирует ее по дате (требование merge_asof)."""
+        rates = rates.assign(date=pd.to_datetime(rates["date"]).dt.normalize().astype("datetime64[ns]"))
+        return rates.astype({"rate": "float64"}).sort_values("date", kind="stable").reset_index(drop=True)
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = RATES_HISTORY_PATH) -> "RateTable":
+        """Загружает историю курсов из JSON-файла. Если файла нет, возвращает пустую таблицу."""
+        if not os.path.isfile(path):
+            logger.warning(f"Файл истории курсов не найден: {path}")
+            return cls()
+        with open(path, encoding="utf-8") as file:
+            history = json.load(file)
+        rows = [(day, currency, rate) for day, rates in history.items() for currency, rate in rates.items()]
+        return cls(pd.DataFrame(rows, columns=["date", "currency", "rate"]))
+
+    def save(self, path: Union[str, Path] = RATES_HISTORY_PATH) -> None:
+        """Сохраняет историю курсов в JSON-файл."""
+        history: Dict[str, Dict[str, float]] = {}
+        for day, currency, rate in self._rates.itertuples(index=False):
+            history.setdefault(day.strftime("%Y-%m-%d"), {})[currency] = rate
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(history, file, ensure_ascii=False, indent=2)
+
+    def add_rates(self, day: Union[str, date, datetime], rates: Dict[str, float]) -> None:
+        """Добавляет курсы на дату, заменяя уже имеющиеся курсы этих валют на эту дату."""
+        new = self._normalize(pd.DataFrame({"date": day, "currency": list(rates), "rate": list(rates.values())}))
+        combined = pd.concat([self._rates, new], ignore_index=True) if len(self._rates) else new
+        self._rates = self._normalize(combined.drop_duplicates(["date", "currency"], keep="last"))
+
+    def rates_to_rub(self, currencies: pd.Series, dates: pd.Series) -> np.ndarray:
+        """Возвращает курсы к рублю для каждой пары (валюта, дата). Для рубля курс равен 1,
+        для валют без известного курса - NaN."""
+        left = pd.DataFrame(
+            {
+                "position": np.arange(len(currencies)),
+                "date": dates.to_numpy(dtype="datetime64[ns]"),
+                "currency": currencies.to_numpy(dtype=object),
+            }
+        )
+        result = np.full(len(left), np.nan)
+        result[(left["currency"] == BASE_CURRENCY).to_numpy()] = 1.0
+
+        lookup = left[(left["currency"] != BASE_CURRENCY) & left["date"].notna() & left["currency"].notna()]
+        if lookup.empty or self._rates.empty:
+            return result
+        lookup = lookup.sort_values("date")
+        rates = self._rates[self._rates["currency"].isin(lookup["currency"].unique())]
+        backward = pd.merge_asof(lookup, rates, on="date", by="currency", direction="backward")
+        forward = pd.merge_asof(lookup, rates, on="date", by="currency", direction="forward")
+        result[backward["position"].to_numpy()] = backward["rate"].fillna(forward["rate"]).to_numpy()
+        return result
+
+
+def convert_transactions(
+    df_transactions: pd.DataFrame, target_currency: str = BASE_CURRENCY, rate_table: Optional[RateTable] = None
+) -> pd.DataFrame:
+    """Возвращает копию транзакций, в которой все суммы переведены в target_currency
+    по курсам на дату операции. Пересчет выполняется для целых столбцов без циклов по строкам,
+    поэтому результат можно сразу передавать в get_expenses_cards, top_transaction и spending_by_category.
+    Если курс для строки не найден, ее сумма и валюта остаются исходными.
+    Без rate_table используется история курсов RATES_HISTORY_PATH; если файла нет, вызывается FileNotFoundError
+    (историю создает update_rates_history)."""
+    logger.info(f"Конвертация {len(df_transactions)} транзакций в {target_currency}")
+    if rate_table is None:
+        if not os.path.isfile(RATES_HISTORY_PATH):
+            raise FileNotFoundError(
+                f"Файл истории курсов не найден: {RATES_HISTORY_PATH}. "
+                "Создайте его функцией update_rates_history или передайте rate_table"
+            )
+        rate_table = RateTable.load()
+    dates = operation_dates(df_transactions)
+    converted = df_transactions.copy()
+
+    target_rates = rate_table.rates_to_rub(pd.Series(target_currency, index=df_transactions.index), dates)
+    rate_cache: Dict[str, np.ndarray] = {}
+    for amount_column, currency_column in AMOUNT_CURRENCY_COLUMNS.items():
+        if amount_column not in converted.columns or currency_column not in converted.columns:
+            continue
+        if currency_column not in rate_cache:
+            # Курс валюты столбца к target_currency: через курсы обеих валют к рублю
+            to_rub = rate_table.rates_to_rub(df_transactions[currency_column], dates)
+            rate_cache[currency_column] = to_rub / target_rates
+        amounts = pd.to_numeric(df_transactions[amount_column], errors="coerce").to_numpy(dtype="float64")
+        rates = rate_cache[currency_column]
+        converted[amount_column] = np.where(np.isnan(rates), amounts, np.round(amounts * rates, 2))
+
+    for currency_column, rates in rate_cache.items():
+        missing = np.isnan(rates)
+        if missing.any():
+            logger.warning(
+                f"Для {int(missing.sum())} транзакций не найден курс (столбец {currency_column}), "
+                "суммы и валюта оставлены без изменений"
+            )
+        converted[currency_column] = df_transactions[currency_column].where(missing, target_currency)
+    return converted
+
+
+def update_rates_history(
+    user_currencies: List[str], path: Union[str, Path] = RATES_HISTORY_PATH
+) -> Optional[RateTable]:
+    """Запрашивает текущие курсы через get_currency_rates и добавляет их в локальную историю курсов."""
+    rates = {rate["currency"]: rate["rate"] for rate in get_currency_rates(user_currencies) if rate["rate"]}
+    if not rates:
+        logger.error("Не удалось получить курсы валют для обновления истории")
+        return None
+    rate_table = RateTable.load(path)
+    rate_table.add_rates(date.today(), rates)
+    rate_table.save(path)
+    logger.info(f"История курсов обновлена: {rates}")
+    return rate_table
@@ -0,0 +1,393 @@
+"""Хранилище истории транзакций в базе SQLite.
+
+Выписка (operations.xlsx или operation.json) импортируется в таблицу transactions пакетной вставкой.
+Даты хранятся строками ISO 8601 "ГГГГ-ММ-ДДTЧЧ:ММ:СС", поэтому их порядок совпадает с порядком строк и
+по ним работают индексы. Индексы построены по дате операции, карте, категории и сумме платежа.
+Выборка за период, траты категории за окно, топ транзакций, суммы по картам и переводы физлицам
+выполняются запросами SQL, в pandas попадает только результат. Соединения с базой берутся
+из пула, поэтому базу можно использовать из нескольких потоков.
+"""
+
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.dates import parse_dates
+from src.features import TRANSFER_CATEGORY, TRANSFER_PATTERN
+from src.store import COLUMN_LAYOUT
+
+logger = logging.getLogger(__name__)
+
+DATABASE_VERSION = 1
+DATABASE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+TABLE = "transactions"
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+# Формат дат в ответах, как в выписке operations.xlsx
+STATEMENT_DATE_FORMATS = {"Дата операции": "%d.%m.%Y %H:%M:%S", "Дата платежа": "%d.%m.%Y"}
+INSERT_BATCH_SIZE = 50_000
+POOL_SIZE = 4
+
+# Тип хранения столбца -> тип SQLite
+SQL_TYPES = {"datetime": "TEXT", "date": "TEXT", "float": "REAL", "code": "TEXT"}
+# Имя индекса -> столбцы
+INDEXES = {
+    "idx_operation_date": ("operation_date",),
+    "idx_card_date": ("card", "operation_date"),
+    "idx_category_date": ("category", "operation_date"),
+    "idx_payment_amount": ("payment_amount",),
+}
+
+_open_databases: Dict[str, Tuple[float, "TransactionDatabase"]] = {}
+_open_databases_lock = threading.Lock()
+
+
+def is_database(path: Union[str, Path, None]) -> bool:
+    """Проверяет, является ли путь файлом базы SQLite с транзакциями."""
+    return path is not None and Path(path).suffix.lower() in DATABASE_SUFFIXES and Path(path).is_file()
+
+
+def _regexp(pattern: str, value: Any) -> bool:
+    """Функция REGEXP для SQLite: соответствие строки выражению с начала строки (re.match)."""
+    return isinstance(value, str) and re.match(pattern, value) is not None
+
+
+class ConnectionPool:
+    """Пул соединений с базой SQLite. Соединение выдается одному потоку на время блока with."""
+
+    def __init__(self, path: Union[str, Path], size: int = POOL_SIZE) -> None:
+        self.path = str(path)
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.create_function("REGEXP", 2, _regexp, deterministic=True)
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Выдает свободное соединение, при необходимости создает новое (не больше size)."""
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                self._created += create
+            connection = self._connect() if create else self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    def close(self) -> None:
+        """Закрывает свободные соединения пула."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+
+
+def _sql_value(value: Any) -> Optional[str]:
+    return None if pd.isna(value) else pd.Timestamp(value).strftime(DATE_FORMAT)
+
+
+def _to_sql_column(values: pd.Series, kind: str) -> List[Any]:
+    """Преобразует столбец выписки в список значений для вставки (пропуски - None)."""
+    if kind in ("datetime", "date"):
+        dates = parse_dates(values).to_numpy(dtype="datetime64[s]")
+        strings = np.datetime_as_string(dates, unit="s").astype(object)
+        strings[np.isnat(dates)] = None
+        dates_list: List[Any] = strings.tolist()
+        return dates_list
+    if kind == "float":
+        numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64").astype(object)
+        numbers[pd.isna(numbers)] = None
+        numbers_list: List[Any] = numbers.tolist()
+        return numbers_list
+    # Строки преобразуются один раз для каждого уникального значения; код -1 (пропуск) - последний элемент None
+    codes, uniques = pd.factorize(values)
+    strings_list: List[Any] = np.array([str(value) for value in uniques] + [None], dtype=object)[codes].tolist()
+    return strings_list
+
+
+def _sql_rows(df_transactions: pd.DataFrame, columns: List[str]) -> Iterator[Tuple[Any, ...]]:
+    """Строки для вставки в базу. Столбцы преобразуются порциями по INSERT_BATCH_SIZE строк,
+    поэтому в памяти одновременно находится только одна порция значений."""
+    for start in range(0, len(df_transactions), INSERT_BATCH_SIZE):
+        batch = df_transactions.iloc[start : start + INSERT_BATCH_SIZE]
+        yield from zip(*(_to_sql_column(batch[column], COLUMN_LAYOUT[column][1]) for column in columns))
+
+
+class TransactionDatabase:
+    """Транзакции в базе SQLite с индексированными запросами."""
+
+    def __init__(self, path: Union[str, Path], columns: List[str], pool_size: int = POOL_SIZE) -> None:
+        self.path = Path(path)
+        self.columns = columns
+        self.pool = ConnectionPool(self.path, pool_size)
+
+    @classmethod
+    def build(cls, df_transactions: pd.DataFrame, path: Union[str, Path]) -> "TransactionDatabase":
+        """Сохраняет датафрейм выписки в новую базу SQLite и открывает ее.
+        База создается во временном файле и заменяет существующую только после записи всех данных."""
+        path = Path(path)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        columns = [column for column in COLUMN_LAYOUT if column in df_transactions.columns]
+        names = [COLUMN_LAYOUT[column][0] for column in columns]
+
+        connection = sqlite3.connect(tmp_path)
+        try:
+            # База пишется один раз целиком, журнал и синхронизация на время импорта не нужны
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            definition = ", ".join(
+                f"{name} {SQL_TYPES[COLUMN_LAYOUT[column][1]]}" for column, name in zip(columns, names)
+            )
+            connection.execute(f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, {definition})")
+            insert = f"INSERT INTO {TABLE} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+            with connection:
+                connection.executemany(insert, _sql_rows(df_transactions, columns))
+            # Индексы строятся после вставки: так быстрее, чем обновлять их на каждой строке
+            for index_name, index_columns in INDEXES.items():
+                if set(index_columns) <= set(names):
+                    connection.execute(f"CREATE INDEX {index_name} ON {TABLE} ({', '.join(index_columns)})")
+            connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            meta = {"version": DATABASE_VERSION, "columns": columns}
+            connection.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in meta.items()])
+            connection.execute("ANALYZE")
+            connection.commit()
+        finally:
+            connection.close()
+        os.replace(tmp_path, path)
+        logger.info(f"Создана база транзакций {path}, строк: {len(df_transactions)}")
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: Union[str, Path], pool_size: int = POOL_SIZE) -> "TransactionDatabase":
+        """Открывает существующую базу транзакций."""
+        connection = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            meta = {key: json.loads(value) for key, value in connection.execute("SELECT key, value FROM meta")}
+        except sqlite3.DatabaseError as e:
+            raise ValueError(f"Файл {path} не является базой транзакций: {e}") from None
+        finally:
+            connection.close()
+        if meta.get("version") != DATABASE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия базы транзакций: {meta.get('version')}")
+        return cls(path, meta["columns"], pool_size)
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def __len__(self) -> int:
+        return int(self._scalar(f"SELECT COUNT(*) FROM {TABLE}"))
+
+    def _scalar(self, sql: str, params: Tuple[Any, ...] = ()) -> Any:
+        with self.pool.connection() as connection:
+            return connection.execute(sql, params).fetchone()[0]
+
+    def _query(self, sql: str, params: Tuple[Any, ...] = ()) -> pd.DataFrame:
+        with self.pool.connection() as connection:
+            cursor = connection.execute(sql, params)
+            names = [description[0] for description in cursor.description]
+            return pd.DataFrame.from_records(cursor.fetchall(), columns=names)
+
+    def _frame(self, sql: str, params: Tuple[Any, ...], columns: List[str]) -> pd.DataFrame:
+        """Выполняет запрос, выбирающий столбцы выписки columns, и восстанавливает их имена и типы."""
+        frame = self._query(sql, params)
+        frame.columns = columns
+        for column in columns:
+            kind = COLUMN_LAYOUT[column][1]
+            if kind in ("datetime", "date"):
+                frame[column] = pd.to_datetime(frame[column], format=DATE_FORMAT)
+            elif kind == "float":
+                frame[column] = frame[column].astype("float64")
+        return frame
+
+    @staticmethod
+    def _period(start: Any, end: Any) -> Tuple[str, Tuple[Any, ...]]:
+        """Условие на дату операции в интервале [start, end]; строки без даты в периоды не попадают."""
+        conditions, params = ["operation_date IS NOT NULL"], []
+        if start is not None:
+            conditions.append("operation_date >= ?")
+            params.append(_sql_value(start))
+        if end is not None:
+            conditions.append("operation_date <= ?")
+            params.append(_sql_value(end))
+        return " AND ".join(conditions), tuple(params)
+
+    def _select(self, columns: Optional[List[str]]) -> Tuple[List[str], str]:
+        columns = [column for column in (columns or self.columns) if column in self.columns]
+        return columns, ", ".join(COLUMN_LAYOUT[column][0] for column in columns)
+
+    def to_frame(self, start: Any = None, end: Any = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Возвращает транзакции за период [start, end] в порядке дат как датафрейм со столбцами выписки."""
+        columns, select = self._select(columns)
+        where, params = self._period(start, end)
+        return self._frame(f"SELECT {select} FROM {TABLE} WHERE {where} ORDER BY operation_date, id", params, columns)
+
+    def category_spending(self, category: str, start: Any, end: Any) -> pd.DataFrame:
+        """Траты категории за период: даты операций и положительные суммы операций с округлением."""
+        where, params = self._period(start, end)
+        sql = (
+            f"SELECT operation_date, rounded_amount FROM {TABLE} "
+            f"WHERE category = ? AND {where} AND rounded_amount > 0 ORDER BY id"
+        )
+        return self._frame(sql, (category, *params), ["Дата операции", "Сумма операции с округлением"])
+
+    def top_transactions(self, top_n: int = 5, start: Any = None, end: Any = None) -> pd.DataFrame:
+        """Топ top_n транзакций по сумме платежа за период (по умолчанию за всю историю)."""
+        columns, select = self._select(["Дата операции", "Сумма платежа", "Категория", "Описание"])
+        where, params = self._period(start, end)
+        sql = (
+            f"SELECT {select} FROM {TABLE} WHERE {where} AND payment_amount IS NOT NULL "
+            "ORDER BY payment_amount DESC, id LIMIT ?"
+        )
+        return self._frame(sql, (*params, top_n), columns)
+
+    def card_totals(
+        self, by_month: bool, rules: List[Dict[str, Any]], start: Any = None, end: Any = None
+    ) -> Tuple[pd.DataFrame, pd.Series]:
+        """Суммы по картам (и месяцам): расходы, доходы и число операций, а также кешбэк
+        в разрезе карта[, месяц] × правило кешбэка - для ограничения лимитами правил."""
+        keys = ["card", "month"] if by_month else ["card"]
+        rate_sql, rate_params = self._cashback_case(rules, "rate")
+        rule_sql, rule_params = self._cashback_case(rules, "rule")
+        # Как в _aggregate_cards: без даты операции строка не попадает только в помесячный разрез и в периоды
+        where, params = "card IS NOT NULL", ()
+        if by_month or start is not None or end is not None:
+            period, params = self._period(start, end)
+            where = f"{where} AND {period}"
+        amount = "COALESCE(payment_amount, 0.0)"
+        month = ", substr(operation_date, 1, 7) AS month" if by_month else ""
+        sql = (
+            f"SELECT card{month}, {rule_sql} AS rule, SUM(MAX(-{amount}, 0)) AS total_spent, "
+            f"SUM(MAX({amount}, 0)) AS income, COUNT(*) AS transactions, "
+            f"SUM(MAX(-{amount}, 0) * {rate_sql}) AS cashback "
+            f"FROM {TABLE} WHERE {where} GROUP BY {', '.join(keys)}, rule"
+        )
+        grouped = self._query(sql, (*rule_params, *rate_params, *params)).set_index(keys + ["rule"])
+        totals = grouped.groupby(level=keys)[["total_spent", "income", "transactions"]].sum()
+        return totals, grouped["cashback"]
+
+    def _cashback_case(self, rules: List[Dict[str, Any]], value: str) -> Tuple[str, List[Any]]:
+        """Выражение SQL со ставкой кешбэка (value="rate") или номером правила (value="rule")
+        по тем же правилам, что и src.cashback.cashback_rates: MCC имеет приоритет над категорией."""
+        default: Dict[str, Any] = {"rate": 0.0, "rule": -1}
+        category_rules: Dict[Any, Dict[str, Any]] = {}
+        mcc_rules: Dict[Any, Dict[str, Any]] = {}
+        for rule_id, rule in enumerate(rules):
+            matched = {"rate": rule["rate"], "rule": rule_id}
+            if "mcc" in rule:
+                mcc_rules[float(rule["mcc"])] = matched
+            elif "category" in rule:
+                category_rules[rule["category"]] = matched
+            else:
+                default = matched
+
+        whens, params = [], []
+        for column, name, column_rules in (("MCC", "mcc", mcc_rules), ("Категория", "category", category_rules)):
+            if column not in self.columns:
+                continue
+            for key, matched in column_rules.items():
+                whens.append(f"WHEN {name} = ? THEN ?")
+                params += [key, matched[value]]
+        if not whens:
+            return "?", [default[value]]
+        return f"(CASE {' '.join(whens)} ELSE ? END)", params + [default[value]]
+
+    def transfers_to_individuals(self, pattern: str = TRANSFER_PATTERN) -> pd.DataFrame:
+        """Переводы физлицам: категория "Переводы" и описание, соответствующее pattern.
+        Даты возвращаются строками в формате выписки operations.xlsx."""
+        columns, select = self._select(None)
+        frame = self._frame(
+            f"SELECT {select} FROM {TABLE} WHERE category = ? AND description REGEXP ? ORDER BY id",
+            (TRANSFER_CATEGORY, pattern),
+            columns,
+        )
+        for column, date_format in STATEMENT_DATE_FORMATS.items():
+            if column in frame.columns:
+                frame[column] = frame[column].dt.strftime(date_format).astype(object).where(frame[column].notna())
+        return frame
+
+
+def read_operations_json(path: Union[str, Path]) -> pd.DataFrame:
+    """Читает операции в формате operation.json и приводит их к столбцам выписки operations.xlsx.
+    Операции - списания со счета или карты "from", поэтому суммы записываются со знаком минус.
+    Номер карты берется из "from", если списание было с карты; категорий в этом формате нет."""
+    with open(path, encoding="utf-8") as file:
+        operations = [operation for operation in json.load(file) if operation]
+
+    def card(source: Optional[str]) -> Optional[str]:
+        if not source or source.startswith("Счет"):
+            return None
+        return "*" + source.split()[-1][-4:]
+
+    amounts = np.array([-float(operation["operationAmount"]["amount"]) for operation in operations])
+    currencies = [operation["operationAmount"]["currency"]["code"] for operation in operations]
+    return pd.DataFrame(
+        {
+            "Дата операции": pd.to_datetime([operation["date"] for operation in operations], format="ISO8601"),
+            "Номер карты": [card(operation.get("from")) for operation in operations],
+            "Статус": ["OK" if operation.get("state") == "EXECUTED" else "FAILED" for operation in operations],
+            "Сумма операции": amounts,
+            "Валюта операции": currencies,
+            "Сумма платежа": amounts,
+            "Валюта платежа": currencies,
+            "Описание": [operation.get("description") for operation in operations],
+        }
+    )
+
+
+def import_statement(source: Union[str, Path], path: Union[str, Path]) -> TransactionDatabase:
+    """Импортирует выписку operations.xlsx или операции operation.json в базу SQLite path."""
+    source = Path(source)
+    df_transactions = read_operations_json(source) if source.suffix.lower() == ".json" else pd.read_excel(source)
+    logger.info(f"Импорт {len(df_transactions)} транзакций из {source} в {path}")
+    return TransactionDatabase.build(df_transactions, path)
+
+
+def open_database(path: Union[str, Path]) -> TransactionDatabase:
+    """Открывает базу транзакций с кэшированием в пределах процесса.
+    База открывается заново, если файл был пересоздан. Прежний объект базы не закрывается:
+    его могут использовать другие потоки; соединения закрываются, когда на него не остается ссылок."""
+    key = str(Path(path).resolve())
+    mtime = os.stat(key).st_mtime
+    with _open_databases_lock:
+        cached = _open_databases.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        database = TransactionDatabase.open(key)
+        _open_databases[key] = (mtime, database)
+        return database
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Пример: python -m src.database data/operations.xlsx data/transactions.db
+    if len(sys.argv) != 3:
+        print("Использование: python -m src.database <выписка.xlsx|operation.json> <файл базы .db>")
+        sys.exit(1)
+    created = import_statement(sys.argv[1], sys.argv[2])
+    print(f"База {created.path} создана, строк: {len(created)}")
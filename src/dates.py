@@ -0,0 +1,138 @@
+"""Быстрый разбор дат выписки ("Дата операции", "Дата платежа").
+
+Банковская выписка содержит даты в фиксированных форматах "dd.mm.yyyy HH:MM:SS" и "dd.mm.yyyy",
+а одни и те же значения в ней многократно повторяются. Поэтому разбираются только уникальные строки:
+они переводятся в матрицу кодов символов, цифры извлекаются срезами столбцов и собираются в int64-метки
+времени без цикла по строкам. Разобранные значения кэшируются между вызовами, а строки другого
+формата разбираются через pd.to_datetime.
+"""
+
+import logging
+import threading
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Максимальное количество строк в кэше разобранных дат
+CACHE_MAX_SIZE = 200_000
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_DAY = 86_400 * NS_PER_SECOND
+NAT_VALUE = np.iinfo(np.int64).min
+
+# Длина строки формата -> позиции разделителей и их значения
+_LAYOUTS: Dict[int, Dict[int, str]] = {
+    19: {2: ".", 5: ".", 10: " ", 13: ":", 16: ":"},  # dd.mm.yyyy HH:MM:SS
+    10: {2: ".", 5: "."},  # dd.mm.yyyy
+}
+MIN_YEAR, MAX_YEAR = pd.Timestamp.min.year, pd.Timestamp.max.year
+
+_cache = pd.Series(dtype="int64")
+_cache_lock = threading.Lock()
+
+
+def _number(digits: np.ndarray, start: int, width: int) -> np.ndarray:
+    """Собирает число из столбцов цифр [start, start + width) матрицы."""
+    result = np.zeros(len(digits), dtype=np.int64)
+    for position in range(start, start + width):
+        result = result * 10 + digits[:, position]
+    return result
+
+
+def _parse_layout(matrix: np.ndarray, separators: Dict[int, str]) -> np.ndarray:
+    """Разбирает строки одного фиксированного формата, заданные матрицей кодов символов.
+    Возвращает метки времени в наносекундах, для строк другого формата - NAT_VALUE."""
+    length = matrix.shape[1]
+    digits = matrix.astype(np.int64) - ord("0")
+
+    digit_columns = [position for position in range(length) if position not in separators]
+    valid = ((digits[:, digit_columns] >= 0) & (digits[:, digit_columns] <= 9)).all(axis=1)
+    for position, separator in separators.items():
+        valid &= matrix[:, position] == ord(separator)
+
+    day, month, year = _number(digits, 0, 2), _number(digits, 3, 2), _number(digits, 6, 4)
+    seconds = np.zeros(len(matrix), dtype=np.int64)
+    if length == 19:
+        hour, minute, second = _number(digits, 11, 2), _number(digits, 14, 2), _number(digits, 17, 2)
+        valid &= (hour < 24) & (minute < 60) & (second < 60)
+        seconds = hour * 3600 + minute * 60 + second
+    # Годы за пределами диапазона datetime64[ns] разбираются (и отбрасываются) через pandas
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (year > MIN_YEAR) & (year < MAX_YEAR)
+
+    # Номер месяца от эпохи -> номер первого дня месяца; день проверяется по длине месяца
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype("datetime64[M]")
+    first_day = months.astype("datetime64[D]").astype(np.int64)
+    month_length = (months + 1).astype("datetime64[D]").astype(np.int64) - first_day
+    valid &= day <= month_length
+
+    timestamps = (first_day + day - 1) * NS_PER_DAY + seconds * NS_PER_SECOND
+    return np.where(valid, timestamps, NAT_VALUE)
+
+
+def _parse_unique(strings: np.ndarray) -> np.ndarray:
+    """Разбирает массив уникальных строк в метки времени (int64, наносекунды)."""
+    result = np.full(len(strings), NAT_VALUE, dtype=np.int64)
+    unicode = strings.astype(str)
+    width = unicode.dtype.itemsize // 4
+    if len(strings) and width:
+        # Матрица кодов символов UTF-32: строка выписки -> строка матрицы
+        codepoints = unicode.view(np.uint32).reshape(len(strings), width)
+        lengths = np.char.str_len(unicode)
+        for length, separators in _LAYOUTS.items():
+            rows = np.flatnonzero(lengths == length)
+            if len(rows):
+                result[rows] = _parse_layout(codepoints[rows, :length], separators)
+
+    fallback = np.flatnonzero(result == NAT_VALUE)
+    if len(fallback):
+        logger.info(f"Строк дат нестандартного формата: {len(fallback)}")
+        parsed = pd.to_datetime(pd.Series(strings[fallback]), format="mixed", dayfirst=True, errors="coerce").to_numpy(
+            dtype="datetime64[ns]"
+        )
+        result[fallback] = parsed.view(np.int64)
+    return result
+
+
+def _cached_timestamps(strings: np.ndarray) -> np.ndarray:
+    """Возвращает метки времени уникальных строк, разбирая только отсутствующие в кэше."""
+    global _cache
+    cache = _cache
+    positions = cache.index.get_indexer(strings)
+    missing = positions == -1
+    result = np.empty(len(strings), dtype=np.int64)
+    result[~missing] = cache.to_numpy()[positions[~missing]]
+    if missing.any():
+        parsed = _parse_unique(strings[missing])
+        result[missing] = parsed
+        with _cache_lock:
+            if len(_cache) + len(parsed) > CACHE_MAX_SIZE:
+                _cache = pd.Series(dtype="int64")
+            if len(parsed) <= CACHE_MAX_SIZE:
+                new = pd.Series(parsed, index=strings[missing])
+                # Другой поток мог уже добавить эти строки в кэш, пока он читался без блокировки
+                new = new[~new.index.isin(_cache.index)]
+                _cache = pd.concat([_cache, new]) if len(_cache) else new
+    return result
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Преобразует столбец дат выписки в datetime64[ns].
+    Уже разобранные даты возвращаются как есть, пропуски и нераспознанные строки становятся NaT."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    codes, uniques = pd.factorize(values)
+    strings = np.array([str(value) for value in uniques], dtype=object)
+    timestamps = np.append(_cached_timestamps(strings), NAT_VALUE)
+    # Код -1 (пропуск) указывает на последний элемент - NaT
+    return pd.Series(timestamps[codes].view("datetime64[ns]"), index=values.index, name=values.name)
+
+
+def clear_cache() -> None:
+    """Очищает кэш разобранных дат."""
+    global _cache
+    with _cache_lock:
+        _cache = pd.Series(dtype="int64")
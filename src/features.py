@@ -0,0 +1,98 @@
+"""Признаки транзакций, вычисляемые один раз при загрузке выписки.
+
+Сервисы (поиск переводов физлицам, поиск по телефонам, категории кешбэка) многократно проверяют
+"Описание" и "Категория" каждой строки. add_features добавляет к выписке столбцы-признаки,
+после чего любой сервис сводится к выборке по булевой маске. Регулярные выражения применяются
+только к уникальным описаниям. FeatureMasks хранит булевы признаки упакованными в биты.
+"""
+
+import logging
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.dates import parse_dates
+
+logger = logging.getLogger(__name__)
+
+# Правило get_transactions_ind: описание вида "Имя Ф." в категории "Переводы"
+TRANSFER_PATTERN = r"\b[А-Я][а-я]+\s[А-Я]\."
+TRANSFER_CATEGORY = "Переводы"
+CASH_CATEGORY = "Наличные"
+PHONE_PATTERN = r"(?:\+7|\b8)[\s-]?\(?\d{3}\)?[\s-]?\d{2,3}[\s-]?\d{2}[\s-]?\d{2}\b"
+
+BOOL_FEATURES = ["is_transfer_to_individual", "has_phone", "is_expense", "is_cash"]
+# month - месяц операции в виде YYYYMM, weekday - день недели (0 - понедельник); -1 - дата неизвестна
+INT_FEATURES = ["month", "weekday"]
+FEATURE_COLUMNS = BOOL_FEATURES + INT_FEATURES
+
+
+def _match_unique(values: pd.Series, pattern: str, search: bool = False) -> np.ndarray:
+    """Применяет регулярное выражение к уникальным строкам столбца и возвращает маску для всех строк."""
+    codes, uniques = pd.factorize(values)
+    strings = pd.Series(uniques, dtype=object).astype(str)
+    matched = strings.str.contains(pattern, regex=True) if search else strings.str.match(pattern)
+    # Код -1 (пропуск) указывает на последний элемент - False
+    return np.asarray(np.append(matched.to_numpy(dtype=bool), False)[codes], dtype=bool)
+
+
+def compute_features(df_transactions: pd.DataFrame, transfer_pattern: str = TRANSFER_PATTERN) -> pd.DataFrame:
+    """Вычисляет признаки транзакций. Возвращает датафрейм с индексом выписки и столбцами FEATURE_COLUMNS."""
+    n_rows = len(df_transactions)
+    empty = pd.Series([np.nan] * n_rows, index=df_transactions.index, dtype=object)
+    descriptions = df_transactions["Описание"] if "Описание" in df_transactions.columns else empty
+    categories = df_transactions["Категория"] if "Категория" in df_transactions.columns else empty
+    amounts = pd.to_numeric(df_transactions.get("Сумма платежа", empty), errors="coerce").to_numpy(dtype="float64")
+    dates = parse_dates(df_transactions.get("Дата операции", empty.astype("datetime64[ns]")))
+
+    is_transfer_category = (categories == TRANSFER_CATEGORY).to_numpy()
+    features = pd.DataFrame(
+        {
+            "is_transfer_to_individual": is_transfer_category & _match_unique(descriptions, transfer_pattern),
+            "has_phone": _match_unique(descriptions, PHONE_PATTERN, search=True),
+            "is_expense": amounts < 0,
+            "is_cash": (categories == CASH_CATEGORY).to_numpy(),
+            "month": (dates.dt.year * 100 + dates.dt.month).fillna(-1).astype(np.int32),
+            "weekday": dates.dt.weekday.fillna(-1).astype(np.int8),
+        },
+        index=df_transactions.index,
+    )
+    logger.info(f"Вычислены признаки для {n_rows} транзакций")
+    return features
+
+
+def add_features(df_transactions: pd.DataFrame, transfer_pattern: str = TRANSFER_PATTERN) -> pd.DataFrame:
+    """Возвращает копию выписки со столбцами признаков. Уже посчитанные признаки не пересчитываются."""
+    if all(column in df_transactions.columns for column in FEATURE_COLUMNS):
+        return df_transactions
+    features = compute_features(df_transactions, transfer_pattern)
+    return df_transactions.assign(**{column: features[column] for column in FEATURE_COLUMNS})
+
+
+class FeatureMasks:
+    """Булевы признаки транзакций, упакованные в биты (np.packbits): 1 бит на строку вместо байта."""
+
+    def __init__(self, n_rows: int, packed: Dict[str, np.ndarray]) -> None:
+        self.n_rows = n_rows
+        self._packed = packed
+
+    @classmethod
+    def from_frame(cls, df_transactions: pd.DataFrame) -> "FeatureMasks":
+        """Упаковывает булевы признаки выписки. Если признаков нет, они вычисляются."""
+        has_features = all(name in df_transactions.columns for name in BOOL_FEATURES)
+        features = df_transactions if has_features else compute_features(df_transactions)
+        packed = {name: np.packbits(features[name].to_numpy(dtype=bool)) for name in BOOL_FEATURES}
+        return cls(len(df_transactions), packed)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._packed)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(packed.nbytes for packed in self._packed.values())
+
+    def mask(self, name: str) -> np.ndarray:
+        """Возвращает булеву маску признака для всех строк выписки."""
+        return np.unpackbits(self._packed[name], count=self.n_rows).astype(bool)
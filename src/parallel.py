@@ -0,0 +1,174 @@
+"""Параллельное выполнение агрегаций по картам для больших историй операций.
+
+Столбцы, нужные агрегации (коды карт, месяцы, суммы, ставки и правила кешбэка), один раз
+копируются в блоки общей памяти (multiprocessing.shared_memory). Рабочие процессы подключаются
+к ним по имени без копирования, каждый считает частичные суммы для своей части строк -
+карт или месяцев с заданным остатком от деления кода на число частей. Основной процесс
+складывает частичные суммы, применяет лимиты кешбэка и формирует ответ get_expenses_cards.
+Режим выбирается секцией "execution" файла src/config.json.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.cashback import capped_cashback, cashback_rates, format_cards
+from src.config import PARTITIONS, load_cashback_rules
+from src.dates import parse_dates
+from src.store import TransactionStore
+
+logger = logging.getLogger(__name__)
+
+# Имя блока общей памяти, форма и тип массива
+ArraySpec = Tuple[str, Tuple[int, ...], str]
+
+SUM_COLUMNS = ["spent", "income", "transactions", "cashback"]
+
+
+def _share(arrays: Dict[str, np.ndarray]) -> Tuple[List[SharedMemory], Dict[str, ArraySpec]]:
+    """Копирует массивы в блоки общей памяти и возвращает блоки и их описания для рабочих процессов."""
+    handles, specs = [], {}
+    try:
+        for name, array in arrays.items():
+            shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+            handles.append(shm)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+            specs[name] = (shm.name, array.shape, array.dtype.str)
+    except BaseException:
+        _release(handles)
+        raise
+    return handles, specs
+
+
+def _release(handles: List[SharedMemory]) -> None:
+    for shm in handles:
+        shm.close()
+        shm.unlink()
+
+
+def _partial_cards(
+    specs: Dict[str, ArraySpec], partition: str, n_partitions: int, part: int, by_month: bool
+) -> pd.DataFrame:
+    """Рабочий процесс: частичные суммы по (карта[, месяц], правило) для своей части строк."""
+    handles = {name: SharedMemory(name=spec[0]) for name, spec in specs.items()}
+    try:
+        arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=handles[name].buf) for name, (_, shape, dtype) in specs.items()
+        }
+        rows = np.flatnonzero(arrays[partition] % n_partitions == part)
+        # Индексирование по номерам строк копирует данные, поэтому после выхода общая память не используется
+        cards, months = arrays["card"][rows], arrays["month"][rows]
+        amounts, rates, rules = arrays["amount"][rows], arrays["rate"][rows], arrays["rule"][rows]
+        del arrays
+    finally:
+        for shm in handles.values():
+            shm.close()
+
+    amounts = np.nan_to_num(amounts, nan=0.0)
+    spent = np.clip(-amounts, 0, None)
+    frame = pd.DataFrame(
+        {
+            "card": cards,
+            "month": months if by_month else np.zeros(len(rows), dtype=months.dtype),
+            "rule": rules,
+            "spent": spent,
+            "income": np.clip(amounts, 0, None),
+            "transactions": np.ones(len(rows), dtype=np.int64),
+            "cashback": spent * rates,
+        }
+    )
+    # Строки без карты (и без даты в помесячном разрезе) в агрегаты не попадают
+    valid = (cards >= 0) & (months >= 0) if by_month else cards >= 0
+    return frame[valid].groupby(["card", "month", "rule"], sort=False)[SUM_COLUMNS].sum().reset_index()
+
+
+def _prepare_arrays(
+    transactions: Union[pd.DataFrame, TransactionStore], rules: List[Dict[str, Any]], with_months: bool
+) -> Tuple[Dict[str, np.ndarray], List[Any]]:
+    """Готовит числовые столбцы агрегации и возвращает их вместе со словарем карт.
+    Даты разбираются, только если with_months (нужен помесячный разрез или разбиение по месяцам)."""
+    if isinstance(transactions, TransactionStore):
+        card_codes = np.asarray(transactions.column("Номер карты"), dtype=np.int32)
+        cards: List[Any] = list(transactions.dictionary("Номер карты"))
+        amounts = np.asarray(transactions.column("Сумма платежа"), dtype=np.float64)
+        dates = np.asarray(transactions.column("Дата операции")).view("datetime64[ns]") if with_months else None
+        # to_frame отбрасывает строки без даты, поэтому столбцы правил кешбэка берутся по всем строкам
+        rate_frame = pd.DataFrame(index=pd.RangeIndex(len(card_codes)))
+        if "Категория" in transactions.columns:
+            lookup = np.array(list(transactions.dictionary("Категория")) + [np.nan], dtype=object)
+            rate_frame["Категория"] = lookup[transactions.column("Категория")]
+        if "MCC" in transactions.columns:
+            rate_frame["MCC"] = transactions.column("MCC")
+    else:
+        codes, uniques = pd.factorize(transactions["Номер карты"])
+        card_codes, cards = codes.astype(np.int32), list(uniques)
+        amounts = pd.to_numeric(transactions["Сумма платежа"], errors="coerce").to_numpy(dtype=np.float64)
+        dates = parse_dates(transactions["Дата операции"]).to_numpy(dtype="datetime64[ns]") if with_months else None
+        rate_frame = transactions
+
+    rates, rule_ids = cashback_rates(rate_frame, rules)
+    # Месяц - номер месяца от эпохи, -1 - дата неизвестна
+    if dates is None:
+        months = np.zeros(len(card_codes), dtype=np.int32)
+    else:
+        months = np.where(np.isnat(dates), -1, dates.astype("datetime64[M]").astype(np.int64)).astype(np.int32)
+    arrays: Dict[str, np.ndarray] = {
+        "card": card_codes,
+        "month": months,
+        "amount": amounts,
+        "rate": rates,
+        "rule": rule_ids,
+    }
+    return arrays, cards
+
+
+def aggregate_cards_parallel(
+    transactions: Union[pd.DataFrame, TransactionStore],
+    by_month: bool = False,
+    cashback_rules: Optional[List[Dict[str, Any]]] = None,
+    partition: str = "card",
+    workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Считает агрегаты get_expenses_cards (или get_expenses_cards_by_month при by_month=True)
+    в пуле процессов. partition - способ разбиения строк между процессами: "card" или "month"."""
+    if partition not in PARTITIONS:
+        raise ValueError(f"Неизвестный способ разбиения: {partition}")
+    rules = load_cashback_rules() if cashback_rules is None else cashback_rules
+    workers = workers or os.cpu_count() or 1
+
+    arrays, cards = _prepare_arrays(transactions, rules, with_months=by_month or partition == "month")
+    logger.info(f"Параллельная агрегация по картам: строк {len(arrays['card'])}, процессов {workers}")
+    handles, specs = _share(arrays)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = list(
+                executor.map(
+                    _partial_cards,
+                    [specs] * workers,
+                    [partition] * workers,
+                    [workers] * workers,
+                    range(workers),
+                    [by_month] * workers,
+                )
+            )
+    finally:
+        _release(handles)
+
+    keys = ["card", "month"] if by_month else ["card"]
+    merged = pd.concat(partials, ignore_index=True).groupby(keys + ["rule"])[SUM_COLUMNS].sum()
+    totals = merged.groupby(level=keys)[["spent", "income", "transactions"]].sum()
+    totals.columns = ["total_spent", "income", "transactions"]
+    totals["cashback"] = capped_cashback(merged["cashback"], keys, rules)
+
+    # Коды карт и месяцев заменяются значениями, порядок - как у groupby в однопроцессном режиме
+    labels = [np.asarray(cards, dtype=object)[totals.index.get_level_values("card")]]
+    if by_month:
+        month_codes = totals.index.get_level_values("month").to_numpy().astype("datetime64[M]")
+        labels.append(np.datetime_as_string(month_codes, unit="M"))
+    totals.index = pd.MultiIndex.from_arrays(labels, names=keys) if by_month else pd.Index(labels[0], name="card")
+    return format_cards(totals.sort_index(), by_month)
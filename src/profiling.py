@@ -0,0 +1,178 @@
+import cProfile
+import functools
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from src.config import LOG_DIR
+
+logger = logging.getLogger(__name__)
+
+# Переменная окружения для включения профилирования этапов: "cprofile", "tracemalloc" или оба через запятую
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+# Директория для файлов статистики cProfile
+PROFILE_DIR = LOG_DIR / "profiles"
+
+# Список для замеров текущего вызова, если включен их сбор
+_current_timings: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("current_timings", default=None)
+# Признак того, что cProfile уже запущен во внешнем этапе этого потока
+_profiler_active = threading.local()
+# Пиковая память этапов этого потока, измеряемых через tracemalloc, от внешнего к вложенному
+_memory_stack = threading.local()
+
+# Накопленная статистика по этапам для выгрузки в формате Prometheus
+_stage_totals: Dict[str, Dict[str, float]] = {}
+_totals_lock = threading.Lock()
+
+
+def _profile_modes() -> Set[str]:
+    """Возвращает включенные режимы профилирования из переменной окружения."""
+    return {mode.strip().lower() for mode in os.environ.get(PROFILE_ENV, "").split(",") if mode.strip()}
+
+
+def _start_memory_tracking() -> None:
+    """Начинает замер пиковой памяти этапа. Пик внешнего этапа, накопленный до сброса,
+    сохраняется в стеке, так как tracemalloc.reset_peak() сбрасывает общий пик."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if not hasattr(_memory_stack, "peaks"):
+        _memory_stack.peaks = []
+    stack: List[int] = _memory_stack.peaks
+    if stack:
+        stack[-1] = max(stack[-1], tracemalloc.get_traced_memory()[1])
+    stack.append(0)
+    tracemalloc.reset_peak()
+
+
+def _stop_memory_tracking() -> int:
+    """Завершает замер пиковой памяти этапа и учитывает ее в пике внешнего этапа."""
+    stack: List[int] = _memory_stack.peaks
+    peak = max(stack.pop(), tracemalloc.get_traced_memory()[1])
+    if stack:
+        stack[-1] = max(stack[-1], peak)
+    return peak
+
+
+def _record_totals(record: Dict[str, Any]) -> None:
+    with _totals_lock:
+        totals = _stage_totals.setdefault(record["stage"], {"calls": 0, "seconds": 0.0, "rows": 0, "peak_memory": 0})
+        totals["calls"] += 1
+        totals["seconds"] += record["seconds"]
+        totals["rows"] += record["rows"] or 0
+        totals["peak_memory"] = max(totals["peak_memory"], record["peak_memory"] or 0)
+
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Контекстный менеджер замера этапа: время выполнения, число обработанных строк и пиковая память.
+    Число строк можно указать заранее или записать в record["rows"] внутри блока.
+    Пиковая память измеряется только в режиме tracemalloc, иначе record["peak_memory"] равен None."""
+    record: Dict[str, Any] = {"stage": name, "rows": rows}
+    modes = _profile_modes()
+
+    use_tracemalloc = "tracemalloc" in modes
+    if use_tracemalloc:
+        _start_memory_tracking()
+
+    profiler = None
+    if "cprofile" in modes and not getattr(_profiler_active, "value", False):
+        profiler = cProfile.Profile()
+        _profiler_active.value = True
+        profiler.enable()
+
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            _profiler_active.value = False
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profile_file = PROFILE_DIR / f"{name}-{datetime.now():%Y%m%d-%H%M%S-%f}.prof"
+            profiler.dump_stats(str(profile_file))
+            logger.info(f"Профиль этапа {name} записан в {profile_file}")
+        record["peak_memory"] = _stop_memory_tracking() if use_tracemalloc else None
+
+        _record_totals(record)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.append(record)
+        logger.debug(f"Этап {name}: {record['seconds']:.4f} с, строк: {record['rows']}")
+
+
+def timed_stage(name: Optional[str] = None) -> Callable:
+    """Декоратор, замеряющий выполнение функции как этапа. Если функция возвращает датафрейм
+    или список, его длина записывается как число обработанных строк."""
+
+    def decorator(func: Callable) -> Callable:
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(stage_name) as record:
+                result = func(*args, **kwargs)
+                if hasattr(result, "__len__") and not isinstance(result, (str, bytes, dict)):
+                    record["rows"] = len(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def collect_timings() -> Iterator[List[Dict[str, Any]]]:
+    """Собирает замеры всех этапов, выполненных внутри блока, в список."""
+    timings: List[Dict[str, Any]] = []
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def format_timings(timings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Округляет замеры для вывода в ответе."""
+    return [
+        {
+            "stage": record["stage"],
+            "seconds": round(record["seconds"], 6),
+            "rows": record["rows"],
+            "peak_memory": record["peak_memory"],
+        }
+        for record in timings
+    ]
+
+
+def render_prometheus() -> str:
+    """Возвращает накопленную статистику этапов в текстовом формате Prometheus."""
+    metrics = [
+        ("pipeline_stage_calls_total", "counter", "Количество выполнений этапа", "calls"),
+        ("pipeline_stage_seconds_total", "counter", "Суммарное время выполнения этапа в секундах", "seconds"),
+        ("pipeline_stage_rows_total", "counter", "Суммарное число обработанных строк", "rows"),
+        ("pipeline_stage_peak_memory_bytes", "gauge", "Максимальная пиковая память этапа в байтах", "peak_memory"),
+    ]
+    with _totals_lock:
+        totals = {name: dict(values) for name, values in _stage_totals.items()}
+
+    lines = []
+    for metric, metric_type, description, key in metrics:
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for stage_name, values in sorted(totals.items()):
+            lines.append(f'{metric}{{stage="{stage_name}"}} {float(values[key])}')
+    return "\n".join(lines) + "\n"
+
+
+def reset_stage_totals() -> None:
+    """Сбрасывает накопленную статистику этапов."""
+    with _totals_lock:
+        _stage_totals.clear()
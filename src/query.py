@@ -0,0 +1,298 @@
+"""Составные условия отбора транзакций.
+
+Пример:
+    query = Q.category("Переводы") & Q.date_between(start, end) & Q.description_matches(pattern)
+    transfers = query.apply(df_transactions)
+
+Условие компилируется в одну булеву маску. Для условий по дате, категории и словам описания
+используется индекс выписки (TransactionIndex): отсортированные даты, группы строк по категориям
+и инвертированный индекс слов описания. В конъюнкции сначала выполняются условия с индексом,
+начиная с самого избирательного, а остальные условия проверяются только на отобранных строках.
+"""
+
+import logging
+import re
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.dates import parse_dates
+
+logger = logging.getLogger(__name__)
+
+DATE_COLUMN = "Дата операции"
+CATEGORY_COLUMN = "Категория"
+DESCRIPTION_COLUMN = "Описание"
+AMOUNT_COLUMN = "Сумма платежа"
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class _GroupIndex:
+    """Позиции строк для каждого значения столбца: строки отсортированы по коду значения."""
+
+    def __init__(self, values: pd.Series) -> None:
+        codes, uniques = pd.factorize(values)
+        self.codes = codes
+        self.uniques = pd.Index(uniques)
+        self._order = np.argsort(codes, kind="stable")
+        self._bounds = np.searchsorted(codes[self._order], np.arange(len(uniques) + 1))
+
+    def count(self, codes: Iterable[int]) -> int:
+        return int(sum(self._bounds[code + 1] - self._bounds[code] for code in codes))
+
+    def positions(self, codes: Iterable[int]) -> np.ndarray:
+        """Отсортированные позиции строк с любым из кодов значений."""
+        parts = [self._order[self._bounds[code] : self._bounds[code + 1]] for code in codes]
+        return np.sort(np.concatenate(parts)) if parts else np.array([], dtype=np.intp)
+
+    def codes_of(self, values: Iterable[Hashable]) -> List[int]:
+        indexer = self.uniques.get_indexer(list(values))
+        return [int(code) for code in indexer if code != -1]
+
+
+class TransactionIndex:
+    """Индекс выписки для условий Q. Части индекса строятся при первом обращении."""
+
+    def __init__(self, df_transactions: pd.DataFrame) -> None:
+        self.df = df_transactions
+        self._dates: Optional[np.ndarray] = None
+        self._date_order: Optional[np.ndarray] = None
+        self._groups: Dict[str, _GroupIndex] = {}
+        self._tokens: Optional[Dict[str, List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Даты операций в виде datetime64[ns]."""
+        if self._dates is None:
+            self._dates = parse_dates(self.df[DATE_COLUMN]).to_numpy(dtype="datetime64[ns]")
+        return self._dates
+
+    def date_range(self, start: Any, end: Any) -> np.ndarray:
+        """Отсортированные позиции строк с датой в интервале [start, end]."""
+        if self._date_order is None:
+            # NaT при сортировке оказывается в конце и в интервалы не попадает
+            self._date_order = np.argsort(self.dates, kind="stable")
+        sorted_dates = self.dates[self._date_order]
+        left = 0 if start is None else int(np.searchsorted(sorted_dates, np.datetime64(pd.Timestamp(start), "ns")))
+        right = (
+            int(np.searchsorted(sorted_dates, np.datetime64("NaT"), side="left"))
+            if end is None
+            else int(np.searchsorted(sorted_dates, np.datetime64(pd.Timestamp(end), "ns"), side="right"))
+        )
+        return np.sort(self._date_order[left : max(left, right)])
+
+    def groups(self, column: str) -> _GroupIndex:
+        if column not in self._groups:
+            self._groups[column] = _GroupIndex(self.df[column])
+        return self._groups[column]
+
+    def token_codes(self, token: str) -> List[int]:
+        """Коды описаний, содержащих слово token (инвертированный индекс по уникальным описаниям)."""
+        if self._tokens is None:
+            self._tokens = {}
+            for code, description in enumerate(self.groups(DESCRIPTION_COLUMN).uniques):
+                for word in set(_TOKEN_PATTERN.findall(str(description).lower())):
+                    self._tokens.setdefault(word, []).append(code)
+        return self._tokens.get(token.lower(), [])
+
+
+Source = Union[pd.DataFrame, TransactionIndex]
+
+
+class Q:
+    """Условие отбора транзакций. Условия объединяются операторами &, | и ~."""
+
+    def __init__(self, op: str, *args: Any) -> None:
+        self.op = op
+        self.args = args
+
+    def __repr__(self) -> str:
+        return f"Q.{self.op}{self.args!r}"
+
+    def __and__(self, other: "Q") -> "Q":
+        return Q("and", *self._flatten("and"), *other._flatten("and"))
+
+    def __or__(self, other: "Q") -> "Q":
+        return Q("or", *self._flatten("or"), *other._flatten("or"))
+
+    def __invert__(self) -> "Q":
+        return Q("not", self)
+
+    def _flatten(self, op: str) -> Tuple["Q", ...]:
+        return self.args if self.op == op else (self,)
+
+    # Условия
+
+    @classmethod
+    def category(cls, *categories: str) -> "Q":
+        """Категория - одна из перечисленных."""
+        return cls("category", *categories)
+
+    @classmethod
+    def equals(cls, column: str, value: Any) -> "Q":
+        """Значение столбца равно value."""
+        return cls("equals", column, value)
+
+    @classmethod
+    def status(cls, status: str) -> "Q":
+        return cls.equals("Статус", status)
+
+    @classmethod
+    def date_between(cls, start: Any = None, end: Any = None) -> "Q":
+        """Дата операции в интервале [start, end], None - без ограничения."""
+        return cls("date_between", start, end)
+
+    @classmethod
+    def amount_between(
+        cls, low: Optional[float] = None, high: Optional[float] = None, column: str = AMOUNT_COLUMN
+    ) -> "Q":
+        """Сумма в интервале [low, high], None - без ограничения."""
+        return cls("amount_between", column, low, high)
+
+    @classmethod
+    def amount_positive(cls, column: str = AMOUNT_COLUMN) -> "Q":
+        return cls("amount_positive", column)
+
+    @classmethod
+    def amount_negative(cls, column: str = AMOUNT_COLUMN) -> "Q":
+        return cls("amount_negative", column)
+
+    @classmethod
+    def description_matches(cls, pattern: str) -> "Q":
+        """Описание соответствует регулярному выражению с начала строки (re.match)."""
+        return cls("description_matches", pattern)
+
+    @classmethod
+    def description_contains(cls, word: str) -> "Q":
+        """Описание содержит слово (без учета регистра)."""
+        return cls("description_contains", word)
+
+    @classmethod
+    def flag(cls, column: str) -> "Q":
+        """Булев столбец, например признак из src.features."""
+        return cls("flag", column)
+
+    # Выполнение
+
+    def mask(self, source: Source) -> np.ndarray:
+        """Возвращает булеву маску строк выписки, удовлетворяющих условию."""
+        index = source if isinstance(source, TransactionIndex) else TransactionIndex(source)
+        return self._mask(index, np.arange(len(index)))
+
+    def apply(self, source: Source) -> pd.DataFrame:
+        """Возвращает строки выписки, удовлетворяющие условию."""
+        index = source if isinstance(source, TransactionIndex) else TransactionIndex(source)
+        return index.df[self.mask(index)]
+
+    def _indexed(self, index: TransactionIndex) -> Optional[Tuple[int, Any]]:
+        """Для условий с индексом возвращает (оценку числа строк, способ получить позиции), иначе None."""
+        if self.op == "date_between" and DATE_COLUMN in index.df.columns:
+            positions = index.date_range(*self.args)
+            return len(positions), positions
+        if self.op == "category" and CATEGORY_COLUMN in index.df.columns:
+            groups = index.groups(CATEGORY_COLUMN)
+            codes = groups.codes_of(self.args)
+            return groups.count(codes), (groups, codes)
+        if self.op == "description_contains" and DESCRIPTION_COLUMN in index.df.columns:
+            groups = index.groups(DESCRIPTION_COLUMN)
+            codes = index.token_codes(self.args[0])
+            return groups.count(codes), (groups, codes)
+        return None
+
+    @staticmethod
+    def _positions(plan: Any) -> np.ndarray:
+        if isinstance(plan, np.ndarray):
+            return plan
+        groups, codes = plan
+        return np.asarray(groups.positions(codes))
+
+    def _mask(self, index: TransactionIndex, rows: np.ndarray) -> np.ndarray:
+        """Вычисляет маску условия для строк rows (позиции в выписке)."""
+        if self.op == "and":
+            return self._and_mask(index, rows)
+        if self.op == "or":
+            result = np.zeros(len(rows), dtype=bool)
+            for condition in self.args:
+                result |= condition._mask(index, rows)
+            return result
+        if self.op == "not":
+            return np.asarray(~self.args[0]._mask(index, rows), dtype=bool)
+        return self._leaf_mask(index, rows)
+
+    def _and_mask(self, index: TransactionIndex, rows: np.ndarray) -> np.ndarray:
+        plans = [(condition, condition._indexed(index)) for condition in self.args]
+        indexed = sorted((plan for plan in plans if plan[1] is not None), key=lambda plan: plan[1][0])
+        # Условия с индексом: пересечение позиций, начиная с самого избирательного
+        candidates = rows
+        for _, (_, plan) in indexed:
+            candidates = np.intersect1d(candidates, self._positions(plan), assume_unique=True)
+            if not len(candidates):
+                break
+        # Остальные условия проверяются только на отобранных строках
+        for condition, plan in plans:
+            if plan is None and len(candidates):
+                candidates = candidates[condition._mask(index, candidates)]
+        result = np.zeros(len(rows), dtype=bool)
+        result[np.searchsorted(rows, candidates)] = True
+        return result
+
+    def _leaf_mask(self, index: TransactionIndex, rows: np.ndarray) -> np.ndarray:
+        df = index.df
+        if self.op == "date_between":
+            if DATE_COLUMN not in df.columns:
+                return np.zeros(len(rows), dtype=bool)
+            dates = index.dates[rows]
+            start, end = self.args
+            result = ~np.isnat(dates)
+            if start is not None:
+                result &= dates >= np.datetime64(pd.Timestamp(start), "ns")
+            if end is not None:
+                result &= dates <= np.datetime64(pd.Timestamp(end), "ns")
+            return np.asarray(result, dtype=bool)
+        if self.op in ("category", "description_contains"):
+            column = CATEGORY_COLUMN if self.op == "category" else DESCRIPTION_COLUMN
+            if column not in df.columns:
+                return np.zeros(len(rows), dtype=bool)
+            groups = index.groups(column)
+            codes = groups.codes_of(self.args) if self.op == "category" else index.token_codes(self.args[0])
+            return np.isin(groups.codes[rows], codes)
+        if self.op == "description_matches":
+            if DESCRIPTION_COLUMN not in df.columns:
+                return np.zeros(len(rows), dtype=bool)
+            # Регулярное выражение применяется к уникальным описаниям
+            groups = index.groups(DESCRIPTION_COLUMN)
+            matched = np.fromiter(
+                (isinstance(value, str) and re.match(self.args[0], value) is not None for value in groups.uniques),
+                dtype=bool,
+                count=len(groups.uniques),
+            )
+            # Код -1 (пропуск) указывает на последний элемент - False
+            return np.asarray(np.append(matched, False)[groups.codes[rows]], dtype=bool)
+
+        column = self.args[0]
+        if column not in df.columns:
+            return np.zeros(len(rows), dtype=bool)
+        values = df[column].to_numpy()[rows]
+        if self.op == "equals":
+            return np.asarray(values == self.args[1], dtype=bool)
+        if self.op == "flag":
+            return np.asarray(values, dtype=bool)
+        amounts = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64")
+        if self.op == "amount_positive":
+            return np.asarray(amounts > 0, dtype=bool)
+        if self.op == "amount_negative":
+            return np.asarray(amounts < 0, dtype=bool)
+        if self.op == "amount_between":
+            _, low, high = self.args
+            result = ~np.isnan(amounts)
+            if low is not None:
+                result &= amounts >= low
+            if high is not None:
+                result &= amounts <= high
+            return np.asarray(result, dtype=bool)
+        raise ValueError(f"Неизвестное условие: {self.op}")
@@ -0,0 +1,117 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.dates import parse_dates
+from src.store import TransactionStore
+
+logger = logging.getLogger(__name__)
+
+DateLike = Union[str, datetime, pd.Timestamp]
+
+
+class SpendingReportEngine:
+    """Отчеты по тратам за произвольные окна: скользящие суммы за 7/30/90 дней,
+    изменения месяц к месяцу и дневные ряды по категориям или картам.
+
+    При создании транзакции один раз сворачиваются в таблицу "день × группа" и ее накопленные суммы.
+    Сумма за любое окно для всех групп сразу считается как разность двух строк накопленных сумм.
+    Посчитанные результаты кэшируются по ключу (вид отчета, окно, конечная дата)."""
+
+    def __init__(
+        self,
+        transactions: Union[pd.DataFrame, TransactionStore],
+        by: str = "Категория",
+        amount_column: str = "Сумма операции с округлением",
+    ) -> None:
+        if isinstance(transactions, TransactionStore):
+            transactions = transactions.to_frame(columns=["Дата операции", by, amount_column])
+        self.by = by
+
+        dates = parse_dates(transactions["Дата операции"])
+        amounts = pd.to_numeric(transactions[amount_column], errors="coerce")
+        # Как и в spending_by_category, учитываются операции с положительной суммой
+        mask = dates.notna() & transactions[by].notna() & (amounts > 0)
+        frame = pd.DataFrame(
+            {"day": dates[mask].dt.normalize(), "group": transactions[by][mask], "amount": amounts[mask]}
+        )
+
+        daily = frame.groupby(["day", "group"], observed=True)["amount"].sum().unstack(fill_value=0.0)
+        if not daily.empty:
+            daily = daily.asfreq("D", fill_value=0.0)
+        daily.columns.name = by
+        self._daily = daily
+        # Накопленные суммы с нулевой строкой в начале: сумма дней (i, j] = cumsum[j] - cumsum[i]
+        self._cumsum = np.vstack([np.zeros((1, daily.shape[1])), daily.to_numpy().cumsum(axis=0)])
+        self._cache: Dict[Tuple[Hashable, ...], Any] = {}
+        logger.info(f"Построен отчетный движок: дней {len(daily)}, групп {daily.shape[1]}")
+
+    @property
+    def groups(self) -> List[Any]:
+        return list(self._daily.columns)
+
+    def _day_position(self, date: Optional[DateLike]) -> Tuple[pd.Timestamp, int]:
+        """Возвращает день и число дней ряда, не превышающих его (позицию в накопленных суммах)."""
+        day = pd.Timestamp.now().normalize() if date is None else pd.Timestamp(date).normalize()
+        return day, int(self._daily.index.searchsorted(day, side="right"))
+
+    def daily_series(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> pd.DataFrame:
+        """Дневные суммы трат: строки - дни, столбцы - группы."""
+        return self._daily.loc[start:end]  # type: ignore[misc]
+
+    def window_totals(self, window_days: int, end_date: Optional[DateLike] = None) -> pd.Series:
+        """Суммы трат всех групп за window_days дней, заканчивающихся end_date (включительно)."""
+        day, right = self._day_position(end_date)
+        key = ("window", window_days, day)
+        if key not in self._cache:
+            _, left = self._day_position(day - pd.Timedelta(days=window_days))
+            self._cache[key] = pd.Series(self._cumsum[right] - self._cumsum[left], index=self._daily.columns)
+        return self._cache[key]
+
+    def rolling(self, window_days: int) -> pd.DataFrame:
+        """Скользящие суммы трат за window_days дней на каждый день ряда для всех групп."""
+        key = ("rolling", window_days, None)
+        if key not in self._cache:
+            cumsum = self._cumsum[1:]
+            shifted = np.vstack([np.zeros((min(window_days, len(cumsum)), cumsum.shape[1])), cumsum])[: len(cumsum)]
+            self._cache[key] = pd.DataFrame(cumsum - shifted, index=self._daily.index, columns=self._daily.columns)
+        return self._cache[key]
+
+    def month_over_month(self, end_date: Optional[DateLike] = None) -> pd.DataFrame:
+        """Траты по месяцам с изменением относительно предыдущего месяца.
+        Возвращает таблицу со столбцами month, группа, amount, delta, delta_pct."""
+        day = None if end_date is None else pd.Timestamp(end_date).normalize()
+        key = ("month_over_month", None, day)
+        if key not in self._cache:
+            monthly = self._daily.loc[:day].resample("MS").sum()
+            result = pd.DataFrame(
+                {
+                    "amount": monthly.stack(),
+                    "delta": monthly.diff().stack(),
+                    "delta_pct": (monthly.pct_change(fill_method=None) * 100)
+                    .replace([np.inf, -np.inf], np.nan)
+                    .stack(),
+                }
+            ).reset_index()
+            result = result.rename(columns={"day": "month"})
+            result["month"] = result["month"].dt.strftime("%Y-%m")
+            self._cache[key] = result
+        return self._cache[key]
+
+    def report(
+        self, windows: Iterable[int] = (7, 30, 90), end_date: Optional[DateLike] = None
+    ) -> List[Dict[str, Any]]:
+        """Сводный отчет: для каждой группы суммы трат за каждое из окон, заканчивающихся end_date."""
+        windows = list(windows)
+        totals = {window: self.window_totals(window, end_date) for window in windows}
+        return [
+            {self.by: group, **{f"{window}d": round(float(totals[window][group]), 2) for window in windows}}
+            for group in self.groups
+        ]
+
+    def clear_cache(self) -> None:
+        """Очищает кэш посчитанных отчетов."""
+        self._cache.clear()
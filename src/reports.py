@@ -1,12 +1,14 @@
-import json
 import logging
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 import pandas as pd
 
 from src.config import decorator_spending_by_category
+from src.database import TransactionDatabase
+from src.query import Q, TransactionIndex
+from src.serialization import dumps
 from src.utils import get_dict_transaction
 
 # Определяем пути
@@ -33,13 +35,20 @@ spending_by_category_logger = logging.getLogger()
 
 
 @decorator_spending_by_category(report_filename="custom_report.json")
-def spending_by_category(transactions: pd.DataFrame, category: str, date: Optional[str] = None) -> str:
-    """Функция возвращающая траты за последние 90 дней по заданной категории."""
+def spending_by_category(
+    transactions: Union[pd.DataFrame, TransactionDatabase],
+    category: str,
+    date: Optional[str] = None,
+    days: int = 90,
+    compact: bool = False,
+) -> str:
+    """Функция возвращающая траты за последние days (по умолчанию 90) дней по заданной категории.
+    Скользящие суммы и ряды по всем категориям сразу строит SpendingReportEngine из src.report_engine.
+    transactions - датафрейм выписки или база SQLite (src.database), для базы отбор выполняет запрос по индексу.
+    compact=True - компактный JSON без отступов."""
 
     logger.info(f"Запуск функции spending_by_category для категории: {category} и даты: {date}")
 
-    final_list = []
-
     # Определяем конечную дату
     if date is None:
         date_end = pd.Timestamp.now()  # Используем Pandas Timestamp для согласованности
@@ -52,47 +61,42 @@ def spending_by_category(transactions: pd.DataFrame, category: str, date: Option
             raise ValueError(f"Неверный формат даты: {date}")
         date_end = date_end_temp  # Присваиваем только если дата корректна
 
-    # Начальная дата - 90 дней назад от конечной даты
+    # Начальная дата - days дней назад от конечной даты
     if date_end is not None:
-        date_start = date_end - pd.Timedelta(days=90)
+        date_start = date_end - pd.Timedelta(days=days)
     else:
         raise ValueError("date_end должен быть корректной временной меткой.")
 
-    # Преобразуем даты операций и удаляем записи без дат
-    transactions["Дата операции"] = pd.to_datetime(
-        transactions["Дата операции"], format="%d.%m.%Y %H:%M:%S", errors="coerce"
-    )
-
-    # Приводим тип к Timestamp
-    transactions["Дата операции"] = transactions["Дата операции"].astype("datetime64[ns]")
-
-    # Удаляем записи с NaT
-    transactions = transactions.dropna(subset=["Дата операции"])
-
-    filtered_transactions = transactions[
-        (transactions["Категория"] == category)
-        & (pd.notna(transactions["Дата операции"]) & transactions["Дата операции"].between(date_start, date_end))
-        & (transactions["Сумма операции с округлением"] > 0)
-    ]
+    # Отбираем траты категории за период; записи без даты в период не попадают
+    if isinstance(transactions, TransactionDatabase):
+        filtered_transactions = transactions.category_spending(category, date_start, date_end)
+        operation_dates = filtered_transactions["Дата операции"]
+    else:
+        index = TransactionIndex(transactions)
+        query = (
+            Q.category(category)
+            & Q.date_between(date_start, date_end)
+            & Q.amount_positive("Сумма операции с округлением")
+        )
+        mask = query.mask(index)
+        filtered_transactions = transactions[mask]
+        operation_dates = pd.Series(index.dates[mask])
 
     logger.info(
         f"Найдено {len(filtered_transactions)} транзакций для категории '{category}' "
         f"за период с {date_start} по {date_end}."
     )
 
-    # Формируем результирующий список
-    for _, transaction in filtered_transactions.iterrows():
-        final_list.append(
-            {
-                "date": transaction["Дата операции"].strftime("%d.%m.%Y %H:%M:%S"),
-                "amount": transaction["Сумма операции с округлением"],
-            }
-        )
+    # Формируем результирующий список целыми столбцами, без перебора строк
+    dates = operation_dates.dt.strftime("%d.%m.%Y %H:%M:%S").tolist()
+    amounts = filtered_transactions["Сумма операции с округлением"].tolist()
+    final_list = [{"date": day, "amount": amount} for day, amount in zip(dates, amounts)]
 
-    logger.info(f"Возвращаемый результат: {json.dumps(final_list, indent=4, ensure_ascii=False)}")
+    result = dumps(final_list, indent=4, compact=compact)
+    logger.info(f"Возвращаемый результат: {result}")
 
     # Возвращаем результат в формате JSON
-    return json.dumps(final_list, indent=4, ensure_ascii=False)
+    return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+"""Сериализация JSON-ответов.
+
+Форматированный вывод (indent) всегда строится стандартным модулем json, чтобы ответы не менялись.
+Компактный вывод для машинных потребителей строится библиотекой orjson, если она установлена:
+она работает быстрее и сама сериализует скаляры и массивы NumPy и даты. В компактном режиме
+orjson записывает NaN как null. Выбрать модуль можно переменной окружения JSON_SERIALIZER ("orjson" или "json").
+"""
+
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import Any, Optional
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязательная зависимость
+    orjson = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+SERIALIZER_ENV = "JSON_SERIALIZER"
+BACKENDS = ("orjson", "json")
+
+
+def get_backend() -> str:
+    """Возвращает модуль компактной сериализации: из JSON_SERIALIZER, иначе orjson, если он установлен."""
+    backend = os.environ.get(SERIALIZER_ENV, "").strip().lower()
+    if backend not in BACKENDS:
+        backend = "orjson"
+    if backend == "orjson" and orjson is None:
+        return "json"
+    return backend
+
+
+def _default(value: Any) -> Any:
+    """Преобразует объекты NumPy и pandas, которые не сериализует стандартный модуль json."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Объект типа {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps_bytes(
+    data: Any, indent: Optional[int] = None, compact: bool = False, backend: Optional[str] = None
+) -> bytes:
+    """Сериализует данные в JSON в кодировке UTF-8."""
+    if compact and (backend or get_backend()) == "orjson" and orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return dumps(data, indent, compact, backend="json").encode("utf-8")
+
+
+def dumps(data: Any, indent: Optional[int] = None, compact: bool = False, backend: Optional[str] = None) -> str:
+    """Сериализует данные в JSON-строку без экранирования кириллицы.
+    compact=True - без пробелов и переносов строк (indent игнорируется)."""
+    if compact:
+        if (backend or get_backend()) == "orjson" and orjson is not None:
+            return dumps_bytes(data, compact=True, backend="orjson").decode("utf-8")
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default)
+    return json.dumps(data, ensure_ascii=False, indent=indent, default=_default)
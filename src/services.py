@@ -1,7 +1,17 @@
-import json
 import logging
 import re
+from typing import Any, Dict, List, Optional, Sequence, Union
 
+import numpy as np
+import pandas as pd
+
+from src.cashback import capped_cashback, cashback_rates
+from src.config import load_cashback_rules
+from src.database import TransactionDatabase
+from src.dates import parse_dates
+from src.features import FEATURE_COLUMNS, add_features
+from src.query import Q
+from src.serialization import dumps
 from src.utils import get_dict_transaction
 
 # Настройка логирования
@@ -13,8 +23,9 @@ file_handler.setFormatter(file_formatter)
 logger.addHandler(file_handler)
 
 
-def get_transactions_ind(dict_transaction: list[dict], pattern: str) -> str:
-    """Функция возвращает JSON со всеми транзакциями, которые относятся к переводам физлицам."""
+def get_transactions_ind(dict_transaction: list[dict], pattern: str, compact: bool = False) -> str:
+    """Функция возвращает JSON со всеми транзакциями, которые относятся к переводам физлицам.
+    compact=True - компактный JSON без отступов."""
     logger.info("Вызвана функция get_transactions_ind")
     list_transactions_fl = []
 
@@ -26,7 +37,7 @@ def get_transactions_ind(dict_transaction: list[dict], pattern: str) -> str:
     logger.info(f"Найдено {len(list_transactions_fl)} транзакций, соответствующих паттерну и категории 'Переводы'")
 
     if list_transactions_fl:
-        list_transactions_fl_json = json.dumps(list_transactions_fl, ensure_ascii=False, indent=2)
+        list_transactions_fl_json = dumps(list_transactions_fl, indent=2, compact=compact)
         logger.info(f"Возвращен JSON со {len(list_transactions_fl)} транзакциями")
         return list_transactions_fl_json
     else:
@@ -34,6 +45,148 @@ def get_transactions_ind(dict_transaction: list[dict], pattern: str) -> str:
         return "[]"
 
 
+def _records_json(df_transactions: pd.DataFrame, compact: bool = False) -> str:
+    """Возвращает транзакции в JSON-формате get_transactions_ind, без столбцов признаков."""
+    records = df_transactions.drop(columns=FEATURE_COLUMNS, errors="ignore").to_dict(orient="records")
+    return dumps(records, indent=2, compact=compact) if records else "[]"
+
+
+def get_transfers_to_individuals(
+    df_transactions: Union[pd.DataFrame, TransactionDatabase], compact: bool = False
+) -> str:
+    """Возвращает JSON с переводами физлицам по правилу get_transactions_ind.
+    Использует признак is_transfer_to_individual, вычисляемый один раз при загрузке выписки.
+    Для базы SQLite переводы отбираются запросом по индексу категории."""
+    if isinstance(df_transactions, TransactionDatabase):
+        transfers = df_transactions.transfers_to_individuals()
+        logger.info(f"Найдено {len(transfers)} переводов физлицам")
+        return _records_json(transfers, compact)
+    df_transactions = add_features(df_transactions)
+    transfers = Q.flag("is_transfer_to_individual").apply(df_transactions)
+    logger.info(f"Найдено {len(transfers)} переводов физлицам")
+    return _records_json(transfers, compact)
+
+
+def search_by_phone(df_transactions: pd.DataFrame, compact: bool = False) -> str:
+    """Возвращает JSON с транзакциями, в описании которых есть номер телефона."""
+    df_transactions = add_features(df_transactions)
+    found = Q.flag("has_phone").apply(df_transactions)
+    logger.info(f"Найдено {len(found)} транзакций с номером телефона")
+    return _records_json(found, compact)
+
+
+def profitable_cashback_categories(
+    df_transactions: pd.DataFrame,
+    year: int,
+    month: int,
+    compact: bool = False,
+    cashback_rules: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """Возвращает JSON с кешбэком, который можно получить в каждой категории за месяц.
+    Кешбэк считается по правилам cashback_rules (по умолчанию из config.json), как в get_expenses_cards:
+    лимит правила действует в пределах карты и делится между категориями пропорционально их кешбэку.
+    Снятие наличных и переводы не учитываются. Категории отсортированы по убыванию кешбэка."""
+    rules = load_cashback_rules() if cashback_rules is None else cashback_rules
+    df_transactions = add_features(df_transactions)
+    query = Q.equals("month", year * 100 + month) & Q.flag("is_expense") & ~Q.flag("is_cash") & ~Q.category("Переводы")
+    expenses = query.apply(df_transactions)
+    rates, rule_ids = cashback_rates(expenses, rules)
+    frame = pd.DataFrame(
+        {
+            "card": expenses["Номер карты"].fillna("") if "Номер карты" in expenses.columns else "",
+            "category": expenses["Категория"],
+            "rule": rule_ids,
+            "cashback": -expenses["Сумма платежа"].to_numpy(dtype="float64") * rates,
+        }
+    )
+    cashback = frame.groupby(["card", "category", "rule"])["cashback"].sum()
+    # Доля кешбэка, остающаяся после применения лимита правила по карте
+    by_rule = cashback.groupby(level=["card", "rule"]).sum()
+    share = (capped_cashback(by_rule, ["card", "rule"], rules) / by_rule).fillna(0.0)
+    cashback = cashback * share.reindex(cashback.index.droplevel("category")).to_numpy()
+    by_category = cashback.groupby(level="category").sum()
+    result = {category: round(float(value), 2) for category, value in by_category.sort_values(ascending=False).items()}
+    logger.info(f"Кешбэк по категориям за {month:02d}.{year}: {result}")
+    return dumps(result, indent=2, compact=compact)
+
+
+# Ключи повторного списания: одна карта, одна сумма, одно описание
+DUPLICATE_KEYS = ["Номер карты", "Сумма платежа", "Описание"]
+# Коэффициент, приводящий MAD к стандартному отклонению нормального распределения
+MAD_SCALE = 0.6745
+# Коэффициент, приводящий среднее абсолютное отклонение к стандартному отклонению нормального распределения
+MEAN_AD_SCALE = 1.2533
+
+
+def _charges(df_transactions: pd.DataFrame) -> pd.DataFrame:
+    """Списания: сумма платежа отрицательна, операция не отклонена, дата операции известна."""
+    query = Q.amount_negative() & Q.date_between()
+    if "Статус" in df_transactions.columns:
+        query = query & ~Q.status("FAILED")
+    return query.apply(df_transactions)
+
+
+def find_duplicate_charges(df_transactions: pd.DataFrame, window_minutes: int = 10, compact: bool = False) -> str:
+    """Возвращает JSON с повторными списаниями: списания с одной карты на одну сумму с одинаковым описанием,
+    между которыми прошло не больше window_minutes минут. Списания одной серии получают общий номер
+    duplicate_group. Строки сортируются по (карта, сумма, описание, время) и сравниваются с предыдущей,
+    поэтому поиск выполняется за O(n log n) без попарного сравнения."""
+    logger.info(f"Поиск повторных списаний, окно {window_minutes} мин.")
+    charges = _charges(df_transactions)
+    keys = [column for column in DUPLICATE_KEYS if column in charges.columns]
+    key_codes = charges.groupby(keys, dropna=False, sort=False).ngroup().to_numpy()
+    times = parse_dates(charges["Дата операции"]).to_numpy(dtype="datetime64[ns]")
+
+    order = np.lexsort((times, key_codes))
+    sorted_keys, sorted_times = key_codes[order], times[order]
+    # Строка продолжает серию предыдущей строки с тем же ключом, если между ними не больше окна
+    linked = np.zeros(len(order), dtype=bool)
+    linked[1:] = (sorted_keys[1:] == sorted_keys[:-1]) & (np.diff(sorted_times) <= np.timedelta64(window_minutes, "m"))
+    groups = np.cumsum(~linked)
+    in_series = linked | np.append(linked[1:], False)
+
+    duplicates = charges.iloc[order[in_series]].assign(duplicate_group=groups[in_series])
+    # Нумерация серий по порядку, начиная с 1
+    duplicates["duplicate_group"] = pd.factorize(duplicates["duplicate_group"])[0] + 1
+    logger.info(f"Найдено повторных списаний: {len(duplicates)}, серий: {duplicates['duplicate_group'].nunique()}")
+    return _records_json(duplicates, compact)
+
+
+def find_anomalous_payments(
+    df_transactions: pd.DataFrame,
+    by: Sequence[str] = ("Категория",),
+    threshold: float = 3.5,
+    min_transactions: int = 5,
+    compact: bool = False,
+) -> str:
+    """Возвращает JSON с необычно крупными списаниями. Для каждой группы by (категории или, например,
+    карты и категории) считаются медиана и MAD сумм списаний, и отбираются списания с робастной
+    z-оценкой 0.6745 * (сумма - медиана) / MAD больше threshold. Если больше половины списаний группы
+    совпадают по сумме (MAD равен 0), вместо MAD используется среднее абсолютное отклонение от медианы:
+    z = (сумма - медиана) / (1.2533 * MeanAD). Группы меньше min_transactions списаний не рассматриваются.
+    Статистики считаются для всех групп сразу через groupby."""
+    logger.info(f"Поиск необычных списаний по группам {list(by)}, порог {threshold}")
+    charges = _charges(df_transactions)
+    keys = [charges[column] for column in by]
+    amounts = -pd.to_numeric(charges["Сумма платежа"], errors="coerce")
+
+    grouped = amounts.groupby(keys, dropna=False)
+    median = grouped.transform("median")
+    deviations = (amounts - median).abs().groupby(keys, dropna=False)
+    mad = deviations.transform("median")
+    mean_ad = deviations.transform("mean")
+    size = grouped.transform("size")
+    robust_z = (MAD_SCALE * (amounts - median) / mad.where(mad > 0)).fillna(
+        (amounts - median) / (MEAN_AD_SCALE * mean_ad.where(mean_ad > 0))
+    )
+
+    mask = (robust_z > threshold) & (size >= min_transactions)
+    anomalies = charges[mask.to_numpy()].assign(median_amount=median[mask].round(2), robust_z=robust_z[mask].round(2))
+    anomalies = anomalies.sort_values("robust_z", ascending=False)
+    logger.info(f"Найдено необычных списаний: {len(anomalies)}")
+    return _records_json(anomalies, compact)
+
+
 if __name__ == "__main__":
     try:
         # Вызываем функцию, передавая данные и паттерн для поиска физических лиц
@@ -0,0 +1,228 @@
+"""Бинарное хранилище истории транзакций с доступом через np.memmap.
+
+Каждый столбец выписки хранится отдельным .npy-файлом фиксированной ширины: даты - int64 (наносекунды),
+суммы - float64, строковые столбцы - int32-коды со словарем строк в meta.json. Строки отсортированы
+по дате операции, поэтому выборка за период - это срез массивов без копирования. Файлы открываются
+в режиме только для чтения, и несколько процессов используют одну копию данных из кэша страниц ОС.
+
+Файлы массивов никогда не перезаписываются: при пересоздании хранилища массивы пишутся в новые файлы
+с номером поколения в имени, а затем атомарно заменяется meta.json. Процессы, открывшие хранилище раньше,
+продолжают читать старые файлы; файлы предыдущего поколения сохраняются до следующего пересоздания.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.dates import parse_dates
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 2
+META_FILE = "meta.json"
+
+# Столбец выписки -> (имя файла, тип хранения)
+COLUMN_LAYOUT: Dict[str, Tuple[str, str]] = {
+    "Дата операции": ("operation_date", "datetime"),
+    "Дата платежа": ("payment_date", "date"),
+    "Номер карты": ("card", "code"),
+    "Статус": ("status", "code"),
+    "Сумма операции": ("operation_amount", "float"),
+    "Валюта операции": ("operation_currency", "code"),
+    "Сумма платежа": ("payment_amount", "float"),
+    "Валюта платежа": ("payment_currency", "code"),
+    "Кэшбэк": ("cashback", "float"),
+    "Категория": ("category", "code"),
+    "MCC": ("mcc", "float"),
+    "Описание": ("description", "code"),
+    "Бонусы (включая кэшбэк)": ("bonuses", "float"),
+    "Округление на инвесткопилку": ("investment_rounding", "float"),
+    "Сумма операции с округлением": ("rounded_amount", "float"),
+}
+
+# Значение int64, которым хранится отсутствующая дата (NaT)
+NAT_VALUE = np.iinfo(np.int64).min
+
+_open_stores: Dict[str, Tuple[float, "TransactionStore"]] = {}
+_open_stores_lock = threading.Lock()
+
+
+def is_store(path: Union[str, Path, None]) -> bool:
+    """Проверяет, является ли путь директорией бинарного хранилища."""
+    return path is not None and (Path(path) / META_FILE).is_file()
+
+
+def _read_meta(directory: Path) -> Dict[str, Any]:
+    with open(directory / META_FILE, encoding="utf-8") as file:
+        meta: Dict[str, Any] = json.load(file)
+    return meta
+
+
+def _remove_stale_arrays(directory: Path, keep: Set[str]) -> None:
+    """Удаляет файлы массивов, не относящиеся к текущему и предыдущему поколениям хранилища.
+    Отображения в память уже открытых файлов при удалении остаются действительными."""
+    for path in directory.glob("*.npy"):
+        if path.name not in keep:
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Не удалось удалить устаревший файл хранилища {path}: {e}")
+
+
+class TransactionStore:
+    """Хранилище транзакций на основе массивов NumPy, отображаемых в память."""
+
+    def __init__(self, directory: Path, arrays: Dict[str, np.ndarray], dictionaries: Dict[str, List[str]]) -> None:
+        self.directory = directory
+        self._arrays = arrays
+        self._dictionaries = dictionaries
+
+    @classmethod
+    def build(cls, df_transactions: pd.DataFrame, directory: Union[str, Path]) -> "TransactionStore":
+        """Сохраняет датафрейм выписки в формате хранилища и открывает его.
+        Существующее хранилище в той же директории заменяется атомарно (см. описание модуля)."""
+        directory = Path(directory)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            previous: Dict[str, str] = _read_meta(directory).get("files", {})
+        except (OSError, ValueError):
+            previous = {}
+        generation = uuid.uuid4().hex[:12]
+
+        dates = parse_dates(df_transactions["Дата операции"])
+        timestamps = dates.to_numpy(dtype="datetime64[ns]").view("int64")
+        order = np.argsort(timestamps, kind="stable")
+
+        dictionaries: Dict[str, List[str]] = {}
+        columns = []
+        files: Dict[str, str] = {}
+        for column, (name, kind) in COLUMN_LAYOUT.items():
+            if column not in df_transactions.columns:
+                continue
+            values = df_transactions[column]
+            if kind == "datetime":
+                data = timestamps
+            elif kind == "date":
+                data = parse_dates(values).to_numpy(dtype="datetime64[ns]").view("int64")
+            elif kind == "float":
+                data = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64")
+            else:
+                codes, uniques = pd.factorize(values)
+                data = codes.astype("int32")
+                dictionaries[column] = [str(value) for value in uniques]
+            files[column] = f"{name}-{generation}.npy"
+            np.save(directory / files[column], np.ascontiguousarray(data[order]))
+            columns.append(column)
+
+        meta = {
+            "version": STORE_VERSION,
+            "rows": len(df_transactions),
+            "columns": columns,
+            "files": files,
+            "dictionaries": dictionaries,
+        }
+        # meta.json заменяется последним: до этого момента читатели видят предыдущее поколение целиком
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False, suffix=".tmp") as file:
+            json.dump(meta, file, ensure_ascii=False)
+        os.replace(file.name, directory / META_FILE)
+        _remove_stale_arrays(directory, set(files.values()) | set(previous.values()))
+        logger.info(f"Создано хранилище транзакций {directory}, строк: {len(df_transactions)}")
+        return cls.open(directory)
+
+    @classmethod
+    def open(cls, directory: Union[str, Path]) -> "TransactionStore":
+        """Открывает хранилище: массивы отображаются в память только для чтения."""
+        directory = Path(directory)
+        meta = _read_meta(directory)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия хранилища: {meta.get('version')}")
+
+        arrays = {column: np.load(directory / meta["files"][column], mmap_mode="r") for column in meta["columns"]}
+        return cls(directory, arrays, meta["dictionaries"])
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._arrays)
+
+    def __len__(self) -> int:
+        return len(self._arrays["Дата операции"])
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Отсортированные даты операций в наносекундах (int64)."""
+        return self._arrays["Дата операции"]
+
+    def period_slice(self, start: Any = None, end: Any = None) -> slice:
+        """Возвращает срез строк с датой операции в интервале [start, end] (границы включаются)."""
+        timestamps = self.timestamps
+        # Строки без даты хранятся в начале массива и в периоды не попадают
+        first = int(np.searchsorted(timestamps, NAT_VALUE, side="right"))
+        left = first if start is None else max(first, int(np.searchsorted(timestamps, pd.Timestamp(start).value)))
+        right = len(timestamps) if end is None else int(np.searchsorted(timestamps, pd.Timestamp(end).value, "right"))
+        return slice(left, max(left, right))
+
+    def column(self, column: str, rows: slice = slice(None)) -> np.ndarray:
+        """Возвращает массив столбца (для строковых столбцов - коды) как представление без копирования."""
+        return self._arrays[column][rows]
+
+    def dictionary(self, column: str) -> List[str]:
+        """Возвращает словарь строк для закодированного столбца."""
+        return self._dictionaries[column]
+
+    def to_frame(
+        self, start: Any = None, end: Any = None, columns: Optional[List[str]] = None, categorical: bool = False
+    ) -> pd.DataFrame:
+        """Возвращает транзакции за период как датафрейм со столбцами выписки.
+        Числовые столбцы и даты - представления массивов хранилища без копирования.
+        Строковые столбцы по умолчанию восстанавливаются в строки, при categorical=True
+        возвращаются категориальными на основе кодов."""
+        rows = self.period_slice(start, end)
+        data: Dict[str, Any] = {}
+        for column in columns or self.columns:
+            kind = COLUMN_LAYOUT[column][1]
+            values = self._arrays[column][rows]
+            if kind in ("datetime", "date"):
+                data[column] = values.view("datetime64[ns]")
+            elif kind == "float":
+                data[column] = values
+            else:
+                categories = self._dictionaries[column]
+                if categorical:
+                    data[column] = pd.Categorical.from_codes(values, categories=pd.Index(categories))
+                else:
+                    lookup = np.array(categories + [np.nan], dtype=object)
+                    data[column] = lookup[values]  # Код -1 (пропуск) указывает на последний элемент - NaN
+        return pd.DataFrame(data, copy=False)
+
+
+def open_store(directory: Union[str, Path]) -> TransactionStore:
+    """Открывает хранилище с кэшированием в пределах процесса.
+    Хранилище открывается заново, если оно было пересоздано."""
+    key = str(Path(directory).resolve())
+    mtime = os.stat(Path(key) / META_FILE).st_mtime
+    with _open_stores_lock:
+        cached = _open_stores.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        store = TransactionStore.open(key)
+        _open_stores[key] = (mtime, store)
+        return store
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Пример: python -m src.store data/operations.xlsx data/store
+    if len(sys.argv) != 3:
+        print("Использование: python -m src.store <выписка.xlsx> <директория хранилища>")
+        sys.exit(1)
+    created = TransactionStore.build(pd.read_excel(sys.argv[1]), sys.argv[2])
+    print(f"Хранилище {created.directory} создано, строк: {len(created)}")
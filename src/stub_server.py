@@ -0,0 +1,170 @@
+"""Локальный сервер-заглушка API курсов валют и акций для нагрузочного тестирования без сети.
+
+Сервер отвечает в форматах openexchangerates.org (/latest.json) и alphavantage.co (/query)
+фиксированными котировками. Задержка ответа (latency, jitter) и доля ответов с ошибкой 500
+(error_rate) настраиваются; случайные величины берутся из генератора с заданным seed,
+поэтому при одинаковой последовательности запросов поведение сервера повторяется.
+
+Пример:
+    with StubQuoteServer(latency=0.05, error_rate=0.1) as server:
+        os.environ.update(server.environ())
+        form_main_page_info("2021-12-20 00:00:00")
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Курсы валют относительно USD, как в ответе openexchangerates.org
+DEFAULT_RATES: Dict[str, float] = {"USD": 1.0, "RUB": 73.21, "EUR": 0.88, "GBP": 0.75, "CNY": 6.37}
+# Цены акций; для остальных тикеров цена вычисляется по тикеру
+DEFAULT_PRICES: Dict[str, float] = {"AAPL": 150.12, "AMZN": 3173.18, "GOOGL": 2742.39, "MSFT": 296.71, "TSLA": 1007.0}
+
+
+def _default_price(symbol: str) -> float:
+    """Детерминированная цена для тикера, которого нет в таблице цен."""
+    return round(10 + sum(ord(char) for char in symbol) % 990 + len(symbol) / 100, 2)
+
+
+class _QuoteHandler(BaseHTTPRequestHandler):
+    server: "_QuoteHTTPServer"
+
+    def do_GET(self) -> None:
+        stub = self.server.stub
+        stub.wait()
+        if stub.should_fail():
+            self._send(500, {"error": "Внутренняя ошибка сервера-заглушки"})
+            return
+
+        parts = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        if parts.path.endswith("/latest.json"):
+            self._send(200, {"base": "USD", "timestamp": 0, "rates": stub.rates})
+        elif parts.path.endswith("/query") and params.get("function") == "GLOBAL_QUOTE":
+            symbol = params.get("symbol", "")
+            price = stub.prices.get(symbol, _default_price(symbol))
+            self._send(200, {"Global Quote": {"01. symbol": symbol, "05. price": f"{price:.4f}"}})
+        else:
+            self._send(404, {"error": f"Неизвестный запрос: {parts.path}"})
+
+    def _send(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+class _QuoteHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubQuoteServer"
+
+
+class StubQuoteServer:
+    """Сервер-заглушка котировок, работающий в фоновом потоке.
+    port=0 - свободный порт, выбранный системой (фактический адрес - свойство url)."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        rates: Optional[Dict[str, float]] = None,
+        prices: Optional[Dict[str, float]] = None,
+    ) -> None:
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError(f"Доля ошибок должна быть в интервале [0, 1]: {error_rate}")
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.prices = dict(DEFAULT_PRICES if prices is None else prices)
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _QuoteHTTPServer((host, port), _QuoteHandler)
+        self._httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"http://{host}:{port}"
+
+    def environ(self) -> Dict[str, str]:
+        """Переменные окружения, направляющие запросы src.utils на этот сервер."""
+        return {"CURRENCY_API_URL": f"{self.url}/api", "STOCK_API_URL": self.url}
+
+    def wait(self) -> None:
+        """Задержка ответа: latency плюс равномерно распределенная добавка до jitter секунд."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def start(self) -> "StubQuoteServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, name="stub-quote-server", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Сервер-заглушка котировок запущен: {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        logger.info("Сервер-заглушка котировок остановлен")
+
+    def __enter__(self) -> "StubQuoteServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    # Пример: python -m src.stub_server --port 8765 --latency 0.05 --error-rate 0.1
+    parser = argparse.ArgumentParser(description="Сервер-заглушка API курсов валют и акций")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, секунд")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, до секунд")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов с ошибкой 500")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubQuoteServer(args.host, args.port, args.latency, args.jitter, args.error_rate, args.seed)
+    print("Переменные окружения для перенаправления запросов:")
+    for name, value in server.environ().items():
+        print(f"{name}={value}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,15 +1,23 @@
 import datetime as dt
+import functools
 import logging
 import os
+import re
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
-import requests
 from dotenv import load_dotenv
 
-from src.config import DATA_DIR
+from src.api_client import api_get, currency_api_url, get_api_mode, stock_api_url
+from src.cashback import capped_cashback, cashback_rates, format_cards
+from src.config import DATA_DIR, load_cashback_rules, load_execution_config
+from src.database import TransactionDatabase
+from src.dates import parse_dates
+from src.features import add_features
+from src.parallel import aggregate_cards_parallel
 
 load_dotenv("..\\.env")
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -41,11 +49,29 @@ def greeting_by_time_of_day() -> str:
         return "Доброй ночи"
 
 
-def get_data(data: str) -> Tuple[datetime, datetime]:
-    """Функция преобразования даты"""
+# Поддерживаемые форматы дат: шаблон строки (цифры заменены нулями) -> формат strptime
+DATE_FORMATS = {
+    "00.00.0000 00:00:00": "%d.%m.%Y %H:%M:%S",
+    "00.00.0000": "%d.%m.%Y",
+    "0000-00-00 00:00:00": "%Y-%m-%d %H:%M:%S",
+    "0000-00-00": "%Y-%m-%d",
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def _detect_date_format(value: str) -> Optional[str]:
+    """Определяет формат строки даты по ее шаблону. Результат кэшируется для каждой строки,
+    поэтому при повторных вызовах с той же датой шаблон заново не строится."""
+    return DATE_FORMATS.get(re.sub(r"\d", "0", value.strip()))
+
+
+def get_data(data: str, date_format: Optional[str] = None) -> Tuple[datetime, datetime]:
+    """Функция преобразования даты. Формат можно указать явно, иначе он определяется
+    по виду строки (по умолчанию "%d.%m.%Y %H:%M:%S")."""
     logger.info(f"Получена строка даты: {data}")
     try:
-        data_obj = datetime.strptime(data, "%d.%m.%Y %H:%M:%S")
+        date_format = date_format or _detect_date_format(data) or "%d.%m.%Y %H:%M:%S"
+        data_obj = datetime.strptime(data, date_format)
         logger.info(f"Преобразована в объект datetime: {data_obj}")
         start_date = data_obj.replace(day=1, hour=0, minute=0, second=0)
         fin_date = data_obj
@@ -55,85 +81,186 @@ def get_data(data: str) -> Tuple[datetime, datetime]:
         raise e
 
 
-def top_transaction(df_transactions: pd.DataFrame) -> List[Dict[str, Any]]:
-    """Функция вывода топ 5 транзакций по сумме платежа."""
-    logger.info("Начало работы функции top_transaction")
+def _prepare_top_frame(df_transactions: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """Готовит транзакции к отбору топа: даты и суммы приводятся к нужным типам,
+    некорректные строки отбрасываются. Исходный датафрейм не изменяется."""
+    if "Сумма платежа" not in df_transactions.columns:
+        logger.error("Столбец 'Сумма платежа' отсутствует в данных.")
+        return None
 
-    df_transactions.loc[:, "Дата операции"] = pd.to_datetime(
-        df_transactions["Дата операции"], dayfirst=True, errors="coerce"
+    prepared = df_transactions.assign(
+        **{
+            "Дата операции": parse_dates(df_transactions["Дата операции"]),
+            "Сумма платежа": pd.to_numeric(df_transactions["Сумма платежа"], errors="coerce"),
+        }
     )
+    return prepared.dropna(subset=["Дата операции", "Сумма платежа"])
+
+
+def _format_top_records(top_transactions: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Преобразует отобранные транзакции в список словарей для ответа."""
+    return [
+        {"date": date, "amount": amount, "category": category, "description": description}
+        for date, amount, category, description in zip(
+            top_transactions["Дата операции"].dt.strftime("%d.%m.%Y").tolist(),
+            top_transactions["Сумма платежа"].tolist(),
+            top_transactions["Категория"].tolist(),
+            top_transactions["Описание"].tolist(),
+        )
+    ]
 
-    df_transactions = df_transactions.dropna(subset=["Дата операции"])
 
-    if "Сумма платежа" not in df_transactions.columns:
-        logger.error("Столбец 'Сумма платежа' отсутствует в данных.")
+def top_transaction(df_transactions: Union[pd.DataFrame, TransactionDatabase], top_n: int = 5) -> List[Dict[str, Any]]:
+    """Функция вывода топ N (по умолчанию 5) транзакций по сумме платежа.
+    Отбор выполняется через nlargest за O(n) без полной сортировки, для базы SQLite - запросом по индексу суммы."""
+    logger.info("Начало работы функции top_transaction")
+
+    if isinstance(df_transactions, TransactionDatabase):
+        return _format_top_records(df_transactions.top_transactions(top_n))
+
+    prepared = _prepare_top_frame(df_transactions)
+    if prepared is None:
         return []
 
-    df_transactions["Сумма платежа"] = pd.to_numeric(df_transactions["Сумма платежа"], errors="coerce")
-    df_transactions = df_transactions.dropna(subset=["Сумма платежа"])
-
-    top_transactions = df_transactions.sort_values(by="Сумма платежа", ascending=False).head(5)
-    logger.info("Получен топ 5 транзакций по сумме платежа")
-
-    result_top_transaction = top_transactions.to_dict(orient="records")
-    top_transaction_list = []
-
-    for transaction in result_top_transaction:
-        if isinstance(transaction["Дата операции"], dt.datetime):
-            top_transaction_list.append(
-                {
-                    "date": transaction["Дата операции"].strftime("%d.%m.%Y"),
-                    "amount": transaction["Сумма платежа"],  # Здесь сохраняем сумму
-                    "category": transaction["Категория"],
-                    "description": transaction["Описание"],
-                }
-            )
-        else:
-            logger.warning(f"Неверный формат даты: {transaction['Дата операции']}")
+    top_transactions = prepared.nlargest(top_n, "Сумма платежа")
+    logger.info(f"Получен топ {top_n} транзакций по сумме платежа")
 
-    logger.info("Сформирован список топ 5 транзакций")
+    top_transaction_list = _format_top_records(top_transactions)
+    logger.info(f"Сформирован список топ {top_n} транзакций")
 
     return top_transaction_list
 
 
-def get_expenses_cards(df_transactions: pd.DataFrame) -> List[Dict[str, Any]]:
-    """Функция, возвращающая расходы по каждой карте"""
-    logger.info("Начало выполнения функции get_expenses_cards")
+def top_transactions_by_group(
+    df_transactions: pd.DataFrame, by: str = "Номер карты", top_n: int = 5
+) -> Dict[Any, List[Dict[str, Any]]]:
+    """Функция вывода топ N транзакций по сумме платежа отдельно для каждой карты или категории.
+    Все группы обрабатываются за один проход groupby."""
+    logger.info(f"Начало работы функции top_transactions_by_group, группировка по '{by}'")
 
-    # Фильтруем расходы только на платежи
-    filtered_expenses = df_transactions[df_transactions["Сумма платежа"] < 0]
+    prepared = _prepare_top_frame(df_transactions)
+    if prepared is None:
+        return {}
+    if by not in prepared.columns:
+        logger.error(f"Столбец '{by}' отсутствует в данных.")
+        return {}
 
-    # Группировка и суммирование расходов
-    cards_dict = (
-        filtered_expenses.loc[filtered_expenses["Сумма платежа"] < 0]
-        .groupby(by="Номер карты")["Сумма платежа"]
-        .sum()
-        .to_dict()
+    prepared = prepared.dropna(subset=[by])
+    top_index = (
+        prepared.groupby(by, sort=False, observed=True)["Сумма платежа"].nlargest(top_n).index.get_level_values(-1)
+    )
+    top_transactions = prepared.loc[top_index]
+
+    result = {
+        group: _format_top_records(group_df)
+        for group, group_df in top_transactions.groupby(by, sort=False, observed=True)
+    }
+    logger.info(f"Сформирован топ {top_n} транзакций для {len(result)} групп")
+    return result
+
+
+class TopTransactions:
+    """Поддерживаемый инкрементально топ N транзакций по сумме платежа.
+    При добавлении новых строк заново отбирается топ только среди текущего топа и новых строк."""
+
+    def __init__(self, top_n: int = 5) -> None:
+        self.top_n = top_n
+        self._top: Optional[pd.DataFrame] = None
+
+    def update(self, df_transactions: pd.DataFrame) -> None:
+        """Добавляет новые транзакции и обновляет топ."""
+        prepared = _prepare_top_frame(df_transactions)
+        if prepared is None or prepared.empty:
+            return
+        candidates = prepared if self._top is None else pd.concat([self._top, prepared], ignore_index=True)
+        self._top = candidates.nlargest(self.top_n, "Сумма платежа").reset_index(drop=True)
+        logger.debug(f"Топ транзакций обновлен, добавлено строк: {len(prepared)}")
+
+    def result(self) -> List[Dict[str, Any]]:
+        """Возвращает текущий топ в том же формате, что и top_transaction."""
+        return [] if self._top is None else _format_top_records(self._top)
+
+
+def _aggregate_cards(
+    df_transactions: pd.DataFrame, by_month: bool, cashback_rules: Optional[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Считает за один проход groupby расходы, доходы, количество операций и кешбэк по картам."""
+    rules = load_cashback_rules() if cashback_rules is None else cashback_rules
+    amounts = pd.to_numeric(df_transactions["Сумма платежа"], errors="coerce").fillna(0.0)
+    spent = (-amounts).clip(lower=0)
+    rates, rule_ids = cashback_rates(df_transactions, rules)
+
+    frame = pd.DataFrame(
+        {
+            "card": df_transactions["Номер карты"],
+            "spent": spent,
+            "income": amounts.clip(lower=0),
+            "cashback": spent * rates,
+            "rule": rule_ids,
+        }
+    )
+    keys = ["card"]
+    if by_month:
+        dates = parse_dates(df_transactions["Дата операции"])
+        frame["month"] = dates.dt.strftime("%Y-%m")
+        keys.append("month")
+    frame = frame.dropna(subset=keys)
+
+    totals = frame.groupby(keys, observed=True).agg(
+        total_spent=("spent", "sum"), income=("income", "sum"), transactions=("spent", "size")
     )
-    logger.debug(f"Получен словарь расходов по картам: {cards_dict}")
-
-    expenses_cards = []
-    for card, expenses in cards_dict.items():
-        expenses_cards.append(
-            {
-                "last_digits": card[-4:],
-                "total_spent": round(abs(expenses), 2),
-                "cashback": round(abs(expenses) * 0.01, 2),  # Расчет кэшбэка
-            }
+    cashback = frame.groupby(keys + ["rule"], observed=True)["cashback"].sum()
+    totals["cashback"] = capped_cashback(cashback, keys, rules)
+    return format_cards(totals, by_month)
+
+
+def _expenses_cards(
+    df_transactions: Union[pd.DataFrame, TransactionDatabase],
+    by_month: bool,
+    cashback_rules: Optional[List[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """Выбирает режим выполнения агрегаций по картам по настройке execution из config.json.
+    Для базы SQLite суммы считаются запросом GROUP BY, в pandas применяются только лимиты кешбэка."""
+    if isinstance(df_transactions, TransactionDatabase):
+        rules = load_cashback_rules() if cashback_rules is None else cashback_rules
+        totals, cashback = df_transactions.card_totals(by_month, rules)
+        totals["cashback"] = capped_cashback(cashback, ["card", "month"] if by_month else ["card"], rules)
+        return format_cards(totals, by_month)
+
+    execution = load_execution_config()
+    if execution["mode"] == "parallel" and len(df_transactions) >= execution["min_rows"]:
+        return aggregate_cards_parallel(
+            df_transactions, by_month, cashback_rules, execution["partition"], execution["workers"]
         )
-        logger.info(f"Добавлен расход по карте {card}: {abs(expenses)}")
+    return _aggregate_cards(df_transactions, by_month=by_month, cashback_rules=cashback_rules)
 
-    # Добавлено: Проверка на уникальность карт
-    unique_cards = {card[-4:] for card in cards_dict.keys()}
-    logger.info(f"Уникальные карты: {unique_cards}")
 
-    # Обновлено: Возвращаем только уникальные карты
-    expenses_cards = [card for card in expenses_cards if card["last_digits"] in unique_cards]
+def get_expenses_cards(
+    df_transactions: Union[pd.DataFrame, TransactionDatabase], cashback_rules: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """Функция, возвращающая по каждой карте расходы, кешбэк, количество операций и поступления.
+    Кешбэк считается по правилам cashback_rules (по умолчанию секция cashback_rules из config.json)."""
+    logger.info("Начало выполнения функции get_expenses_cards")
+
+    expenses_cards = _expenses_cards(df_transactions, by_month=False, cashback_rules=cashback_rules)
+    logger.debug(f"Получены агрегаты по картам: {expenses_cards}")
 
     logger.info("Завершение выполнения функции get_expenses_cards")
     return expenses_cards
 
 
+def get_expenses_cards_by_month(
+    df_transactions: Union[pd.DataFrame, TransactionDatabase], cashback_rules: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """Функция, возвращающая агрегаты get_expenses_cards в разрезе карта × месяц за один вызов."""
+    logger.info("Начало выполнения функции get_expenses_cards_by_month")
+
+    expenses_cards = _expenses_cards(df_transactions, by_month=True, cashback_rules=cashback_rules)
+
+    logger.info(f"Завершение выполнения функции get_expenses_cards_by_month, записей: {len(expenses_cards)}")
+    return expenses_cards
+
+
 def get_dict_transaction(file_path: str) -> list[dict]:
     """Функция преобразовывающая датафрейм в словарь Python"""
     if not os.path.isfile(file_path):
@@ -143,7 +270,7 @@ def get_dict_transaction(file_path: str) -> list[dict]:
     try:
         df = pd.read_excel(file_path)
         logger.info(f"Файл {file_path} прочитан")
-        dict_transaction = df.to_dict(orient="records")
+        dict_transaction: list[dict] = df.to_dict(orient="records")
         logger.info("Датафрейм преобразован в список словарей")
         return dict_transaction
     except Exception as e:
@@ -159,27 +286,64 @@ if __name__ == "__main__":
         logger.error(e)
 
 
-def transaction_currency(df_transactions: pd.DataFrame, data: str) -> pd.DataFrame:
-    """Функция, формирующая расходы в заданном интервале"""
+def operation_dates(df_transactions: pd.DataFrame) -> pd.Series:
+    """Возвращает столбец "Дата операции" в виде datetime.
+    Уже разобранные даты возвращаются как есть, строки разбираются быстрым разборщиком parse_dates."""
+    return parse_dates(df_transactions["Дата операции"])
+
+
+def _period_slice(df_transactions: pd.DataFrame, dates: pd.Series, start: datetime, end: datetime) -> pd.DataFrame:
+    """Выбирает транзакции с датой в интервале [start, end].
+    Если даты отсортированы (по возрастанию или убыванию, как в выписке банка), интервал
+    находится бинарным поиском и возвращается срез строк, иначе используется маска."""
+    values = dates.to_numpy(dtype="datetime64[ns]")
+    start_value, end_value = np.datetime64(start, "ns"), np.datetime64(end, "ns")
+    if dates.is_monotonic_increasing:
+        left = int(np.searchsorted(values, start_value, side="left"))
+        right = int(np.searchsorted(values, end_value, side="right"))
+        return df_transactions.iloc[left : max(left, right)]
+    if dates.is_monotonic_decreasing:
+        ascending = values[::-1]
+        left = len(values) - int(np.searchsorted(ascending, end_value, side="right"))
+        right = len(values) - int(np.searchsorted(ascending, start_value, side="left"))
+        return df_transactions.iloc[left : max(left, right)]
+    return df_transactions.loc[(dates >= start) & (dates <= end)]
+
+
+def transaction_currency(
+    df_transactions: Union[pd.DataFrame, TransactionDatabase],
+    data: Union[str, List[str]],
+    date_format: Optional[str] = None,
+) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """Функция, формирующая расходы в интервале с начала месяца до заданной даты.
+    Если передан список дат, возвращает словарь дата -> транзакции, даты операций при этом разбираются один раз.
+    Для базы SQLite каждый период выбирается запросом по индексу даты."""
     logger.info(f"Вызвана функция transaction_currency с аргументами: data={data}")
-    start_date, fin_date = get_data(data)  # Распаковка значений
-    logger.debug(f"Получены начальная дата: {start_date}, конечная дата: {fin_date}")
-
-    transaction_currency = df_transactions.loc[
-        (pd.to_datetime(df_transactions["Дата операции"], dayfirst=True) <= fin_date)
-        & (pd.to_datetime(df_transactions["Дата операции"], dayfirst=True) >= start_date)
-    ]
-    logger.info(f"Получен DataFrame transaction_currency: {transaction_currency}")
+    database = df_transactions if isinstance(df_transactions, TransactionDatabase) else None
+    dates = operation_dates(df_transactions) if database is None else None
+
+    results = {}
+    for date_str in [data] if isinstance(data, str) else data:
+        start_date, fin_date = get_data(date_str, date_format)  # Распаковка значений
+        logger.debug(f"Получены начальная дата: {start_date}, конечная дата: {fin_date}")
+        if database is not None:
+            results[date_str] = database.to_frame(start_date, fin_date)
+        else:
+            results[date_str] = _period_slice(df_transactions, dates, start_date, fin_date)
+        logger.info(f"Получено транзакций с {start_date} по {fin_date}: {len(results[date_str])}")
 
-    return transaction_currency if not transaction_currency.empty else pd.DataFrame(columns=df_transactions.columns)
+    return results[data] if isinstance(data, str) else results
 
 
-def reader_transaction_excel(file_path: str) -> pd.DataFrame:
-    """Функция принимает на вход путь до файла и возвращает датафрейм"""
+def reader_transaction_excel(file_path: str, with_features: bool = False) -> pd.DataFrame:
+    """Функция принимает на вход путь до файла и возвращает датафрейм.
+    При with_features=True к выписке добавляются столбцы признаков (src.features)."""
     logger.info(f"Вызвана функция получения транзакций из файла {file_path}")
     try:
         df_transactions = pd.read_excel(file_path)
         logger.info(f"Файл {file_path} найден, данные о транзакциях получены")
+        if with_features:
+            df_transactions = add_features(df_transactions)
 
         return df_transactions
     except FileNotFoundError:
@@ -188,20 +352,21 @@ def reader_transaction_excel(file_path: str) -> pd.DataFrame:
 
 
 def get_currency_rates(user_currencies: list) -> list:
-    """Возвращает курсы валют относительно RUB."""
+    """Возвращает курсы валют относительно RUB.
+    Адрес API задает переменная окружения CURRENCY_API_URL, режим записи и воспроизведения - API_MODE."""
     logger.info("Поиск курсов валют")
 
     result_currencies: list[Any] = []
     api_key = os.environ.get("API_KEY")  # Получаем API ключ из переменных окружения
 
-    # Проверка наличия API ключа
-    if not api_key:
+    # Проверка наличия API ключа (при воспроизведении записанных ответов ключ не нужен)
+    if not api_key and get_api_mode() != "replay":
         logger.error("API ключ отсутствует. Убедитесь, что он установлен в переменных окружения.")
         return []
 
     # Получаем курс всех валют относительно USD
 
-    response = requests.get(f"https://openexchangerates.org/api/latest.json?app_id={api_key}&base=USD")
+    response = api_get(f"{currency_api_url()}/latest.json?app_id={api_key}&base=USD")
     # Проверка успешности запроса
     if response.status_code != 200:
         logger.error("Ошибка при получении данных с API: %s", response.text)
@@ -234,15 +399,16 @@ def get_currency_rates(user_currencies: list) -> list:
 
 
 def get_stock_price(user_stocks: list) -> list[dict]:
-    """Функция, возвращающая курсы акций"""
+    """Функция, возвращающая курсы акций.
+    Адрес API задает переменная окружения STOCK_API_URL, режим записи и воспроизведения - API_MODE."""
     logger.info("Вызвана функция возвращающая курсы акций")
 
     api_key_stock = os.environ.get("API_KEY_STOCK")
     stock_price = []
 
     for stock in user_stocks:
-        url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={stock}&apikey={api_key_stock}"
-        response = requests.get(url)
+        url = f"{stock_api_url()}/query?function=GLOBAL_QUOTE&symbol={stock}&apikey={api_key_stock}"
+        response = api_get(url)
 
         if response.status_code != 200:
             logger.error(f"Запрос не был успешным. Возможная причина: {response.reason}")
@@ -1,14 +1,29 @@
+import asyncio
+import contextvars
+import copy
+import functools
 import json
 import logging
 import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Any, Dict, List, Union
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import pandas as pd
 
-from src.config import file_path, load_user_currencies, load_user_stocks
+from src.config import app_config_path, file_path, get_settings_version, load_user_currencies, load_user_stocks
+from src.database import is_database, open_database
+from src.profiling import collect_timings, format_timings, stage
+from src.query import Q, TransactionIndex
+from src.serialization import dumps
+from src.store import is_store, open_store
 from src.utils import get_currency_rates, get_expenses_cards, get_stock_price, greeting_by_time_of_day, top_transaction
 
+PathLike = Union[str, Path]
+
 # Настройка логирования
 log_directory = "../logs"
 
@@ -27,87 +42,376 @@ if not logger.hasHandlers():
     logger.addHandler(file_handler)
 
 
-def form_main_page_info(some_param: Union[str, dict], return_json: bool = False) -> Union[str, Dict[str, Any]]:
-    """Принимает дату в формате строки YYYY-MM-DD HH:MM:SS и возвращает общую информацию в формате
-    json о банковских транзакциях за период с начала месяца до этой даты"""
-    logger.info(f"Запуск функции main с параметром: {some_param}")
-
-    currencies = load_user_currencies()  # Загружаем валюты
-    stocks = load_user_stocks()  # Загружаем акции
-    date_obj = None
-
+def _parse_date_param(some_param: Union[str, dict]) -> Union[datetime, str]:
+    """Разбирает входной параметр с датой. Возвращает объект datetime либо JSON-строку с ошибкой."""
     # Проверка типа входного аргумента
     if isinstance(some_param, str):
         # Обработка строки
-        try:
-            date_obj = datetime.strptime(some_param, "%Y-%m-%d %H:%M:%S")
-        except ValueError as e:
-            logger.error(f"Ошибка преобразования даты: {e}")
-            return json.dumps({"error": "Некорректный формат даты."}, ensure_ascii=False)
+        date_str = some_param
     elif isinstance(some_param, dict) and "date" in some_param:
         # Обработка JSON объекта
-        try:
-            date_obj = datetime.strptime(some_param["date"], "%Y-%m-%d %H:%M:%S")
-        except ValueError as e:
-            logger.error(f"Ошибка преобразования даты: {e}")
-            return json.dumps({"error": "Некорректный формат даты."}, ensure_ascii=False)
+        date_str = some_param["date"]
     else:
-        return json.dumps({"error": "Некорректный тип параметра. Ожидается строка или JSON."}, ensure_ascii=False)
+        return dumps({"error": "Некорректный тип параметра. Ожидается строка или JSON."})
 
     try:
-        data = pd.read_excel(file_path)
-        # Преобразование DataFrame
-        data_df = pd.DataFrame(data)
-        logger.info(f"Исходный DataFrame: {data_df}")  # контроль
-        data_df["datetime"] = pd.to_datetime(
-            data_df["Дата операции"], format="%d.%m.%Y %H:%M:%S", dayfirst=True, errors="coerce"
-        )
-    except Exception as e:
-        logger.error(f"Ошибка при чтении файла: {e}")
-        return json.dumps({"error": "Не удалось прочитать данные."}, ensure_ascii=False)
+        return datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
+    except ValueError as e:
+        logger.error(f"Ошибка преобразования даты: {e}")
+        return dumps({"error": "Некорректный формат даты."})
 
+
+def _read_period_transactions(date_obj: datetime, statement_path: Optional[PathLike] = None) -> pd.DataFrame:
+    """Читает файл операций (по умолчанию data/operations.xlsx), бинарное хранилище транзакций
+    или базу SQLite и возвращает транзакции с начала месяца до указанной даты."""
     # Определяем диапазон дат
     start_date = date_obj.replace(day=1, hour=0, minute=0, second=0)
     fin_date = date_obj
     logger.debug(f"Диапазон дат: с {start_date} по {fin_date}")  # контроль
 
-    json_data = data_df[data_df["datetime"].between(start_date, fin_date)]
+    if is_store(statement_path):
+        # В хранилище строки отсортированы по дате, период выбирается срезом без чтения всей истории
+        with stage("read_store") as record:
+            json_data = open_store(statement_path).to_frame(start_date, fin_date)  # type: ignore[arg-type]
+            json_data["datetime"] = json_data["Дата операции"]
+            record["rows"] = len(json_data)
+        logger.info(f"Количество транзакций за период: {len(json_data)}")
+        return json_data
+
+    if is_database(statement_path):
+        # В базе период выбирается запросом по индексу даты операции
+        with stage("read_database") as record:
+            json_data = open_database(statement_path).to_frame(start_date, fin_date)  # type: ignore[arg-type]
+            json_data["datetime"] = json_data["Дата операции"]
+            record["rows"] = len(json_data)
+        logger.info(f"Количество транзакций за период: {len(json_data)}")
+        return json_data
+
+    with stage("read_excel") as record:
+        data = pd.read_excel(statement_path or file_path)
+        # Преобразование DataFrame
+        data_df = pd.DataFrame(data)
+        record["rows"] = len(data_df)
+    logger.info(f"Исходный DataFrame: {data_df}")  # контроль
+    with stage("parse_dates", rows=len(data_df)):
+        index = TransactionIndex(data_df)
+        data_df["datetime"] = index.dates
+
+    with stage("filter_period", rows=len(data_df)):
+        json_data = Q.date_between(start_date, fin_date).apply(index)
     logger.info(f"Количество транзакций за период: {len(json_data)}")
+    return json_data
+
+
+def _form_transactions_info(json_data: pd.DataFrame) -> Dict[str, Any]:
+    """Считает данные страницы, зависящие только от транзакций: карты и топ транзакций."""
+    with stage("cards", rows=len(json_data)):
+        cards = get_expenses_cards(json_data) if not json_data.empty else []
+    with stage("top_transactions", rows=len(json_data)):
+        top_transactions = top_transaction(json_data) if not json_data.empty else []
+    return {"cards": cards, "top_transactions": top_transactions}
+
+
+def _compute_period_info(date_obj: datetime, statement_path: Optional[PathLike] = None) -> Tuple[bool, Dict[str, Any]]:
+    """Читает данные за период и считает карты и топ транзакций.
+    Возвращает признак пустого периода и словарь с результатами."""
+    json_data = _read_period_transactions(date_obj, statement_path)
+    logger.info(f"Filtered transactions: {json_data}")
+    return json_data.empty, _form_transactions_info(json_data)
+
+
+class PageDataCache:
+    """LRU-кэш данных главной страницы, зависящих только от транзакций (карты и топ транзакций).
+    Ключ - (начало и конец периода, версия файла данных, версия файла настроек), поэтому после
+    изменения выписки или настроек данные пересчитываются. Приветствие и котировки не кэшируются.
+    Размер ограничивается числом записей и примерным объемом данных в байтах.
+    Значения копируются при записи и чтении, поэтому изменение ответа не меняет кэш."""
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[int, Tuple[bool, Dict[str, Any]]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: Tuple[Any, ...], value: Tuple[bool, Dict[str, Any]]) -> None:
+        size = len(json.dumps(value, ensure_ascii=False, default=str))
+        value = copy.deepcopy(value)
+        with self._lock:
+            if size > self.max_bytes or self.max_entries <= 0:
+                return
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[0]
+            self._entries[key] = (size, value)
+            self._size += size
+            # Вытесняем давно не использованные записи
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._size -= self._entries.popitem(last=False)[1][0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+page_cache = PageDataCache()
+
+
+def _data_version(statement_path: Optional[PathLike]) -> Optional[Tuple[int, int]]:
+    """Версия данных: время изменения и размер файла выписки (для хранилища - его meta.json)."""
+    path = Path(statement_path or file_path)
+    if is_store(path):
+        path = path / "meta.json"
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cached_period_info(
+    date_obj: datetime, statement_path: Optional[PathLike] = None, settings_path: Optional[PathLike] = None
+) -> Tuple[bool, Dict[str, Any]]:
+    """Возвращает данные периода из кэша page_cache или считает и сохраняет их."""
+    data_version = _data_version(statement_path)
+    if data_version is None:
+        return _compute_period_info(date_obj, statement_path)
+
+    start_date = date_obj.replace(day=1, hour=0, minute=0, second=0)
+    key = (
+        start_date,
+        date_obj,
+        str(statement_path or file_path),
+        data_version,
+        get_settings_version(settings_path),
+        get_settings_version(app_config_path),
+    )
+    cached = page_cache.get(key)
+    if cached is not None:
+        logger.info(f"Данные страницы за период с {start_date} по {date_obj} взяты из кэша")
+        return cached
+
+    result = _compute_period_info(date_obj, statement_path)
+    page_cache.put(key, result)
+    return result
+
 
-    # Получаем приветствие
-    greeting = greeting_by_time_of_day()
+def clear_page_cache() -> None:
+    """Очищает кэш данных главной страницы."""
+    page_cache.clear()
 
+
+def _assemble_response(
+    period_info: Dict[str, Any],
+    is_empty: bool,
+    currency_rates: List[Dict[str, Any]],
+    stock_prices: List[Dict[str, Any]],
+    return_json: bool,
+    timings: Optional[List[Dict[str, Any]]] = None,
+    compact: bool = False,
+) -> Union[str, Dict[str, Any]]:
+    """Собирает итоговый ответ главной страницы."""
     # Формируем итоговый словарь
     agg_dict = {
-        "greeting": greeting,
-        "cards": get_expenses_cards(json_data) if not json_data.empty else [],
-        "top_transactions": top_transaction(json_data) if not json_data.empty else [],
-        "currency_rates": get_currency_rates(currencies),
-        "stock_prices": get_stock_price(stocks),
+        "greeting": greeting_by_time_of_day(),
+        "cards": period_info["cards"],
+        "top_transactions": period_info["top_transactions"],
+        "currency_rates": currency_rates,
+        "stock_prices": stock_prices,
     }
-    logger.info(f"Filtered transactions: {json_data}")
     logger.info(f"Agg dict before serialization: {agg_dict}")
 
     # Если нет транзакций, добавляем сообщение об ошибке
-    if json_data.empty:
+    if is_empty:
         logger.warning("Нет транзакций за указанный период.")
         agg_dict["error"] = "Нет транзакций за указанный период."
 
-    return json.dumps(agg_dict, ensure_ascii=False, indent=2) if return_json else agg_dict
+    if timings is not None:
+        agg_dict["timings"] = format_timings(timings)
+    if not return_json:
+        return agg_dict
+
+    with stage("serialize"):
+        return dumps(agg_dict, indent=2, compact=compact)
+
+
+def _fetch_currency_rates(currencies: List[str]) -> List[Dict[str, Any]]:
+    with stage("currency_rates", rows=len(currencies)):
+        return get_currency_rates(currencies)
+
+
+def _fetch_stock_prices(stocks: List[str]) -> List[Dict[str, Any]]:
+    with stage("stock_prices", rows=len(stocks)):
+        return get_stock_price(stocks)
+
+
+def form_main_page_info(
+    some_param: Union[str, dict],
+    return_json: bool = False,
+    with_timings: bool = False,
+    statement_path: Optional[PathLike] = None,
+    settings_path: Optional[PathLike] = None,
+    currency_rates: Optional[List[Dict[str, Any]]] = None,
+    stock_prices: Optional[List[Dict[str, Any]]] = None,
+    compact: bool = False,
+) -> Union[str, Dict[str, Any]]:
+    """Принимает дату в формате строки YYYY-MM-DD HH:MM:SS и возвращает общую информацию в формате
+    json о банковских транзакциях за период с начала месяца до этой даты.
+    При with_timings=True в ответ добавляется разбивка времени по этапам (ключ "timings").
+    statement_path и settings_path задают выписку и настройки конкретного пользователя,
+    а currency_rates и stock_prices - уже полученные котировки, тогда запросы к API не выполняются.
+    compact=True вместе с return_json=True возвращает компактный JSON (src.serialization)."""
+    args = (statement_path, settings_path, currency_rates, stock_prices, compact)
+    with _optional_timings(with_timings) as timings:
+        return _form_main_page_info(some_param, return_json, timings, *args)
+
+
+async def form_main_page_info_async(
+    some_param: Union[str, dict],
+    return_json: bool = False,
+    with_timings: bool = False,
+    statement_path: Optional[PathLike] = None,
+    settings_path: Optional[PathLike] = None,
+    currency_rates: Optional[List[Dict[str, Any]]] = None,
+    stock_prices: Optional[List[Dict[str, Any]]] = None,
+    compact: bool = False,
+) -> Union[str, Dict[str, Any]]:
+    """Асинхронный вариант form_main_page_info с теми же параметрами.
+    Запросы курсов валют и акций запускаются сразу, а чтение и обработка транзакций
+    параллельно выполняются в пуле потоков, поэтому время ответа равно максимуму, а не сумме."""
+    args = (statement_path, settings_path, currency_rates, stock_prices, compact)
+    with _optional_timings(with_timings) as timings:
+        return await _form_main_page_info_async(some_param, return_json, timings, *args)
+
+
+@contextmanager
+def _optional_timings(with_timings: bool) -> Iterator[Optional[List[Dict[str, Any]]]]:
+    """Собирает замеры этапов, только если они запрошены."""
+    if not with_timings:
+        yield None
+        return
+    with collect_timings() as timings:
+        yield timings
+
+
+def _read_error_response(error: BaseException) -> str:
+    logger.error(f"Ошибка при чтении файла: {error}")
+    return dumps({"error": "Не удалось прочитать данные."})
+
+
+def _form_main_page_info(
+    some_param: Union[str, dict],
+    return_json: bool,
+    timings: Optional[List[Dict[str, Any]]],
+    statement_path: Optional[PathLike],
+    settings_path: Optional[PathLike],
+    currency_rates: Optional[List[Dict[str, Any]]],
+    stock_prices: Optional[List[Dict[str, Any]]],
+    compact: bool = False,
+) -> Union[str, Dict[str, Any]]:
+    logger.info(f"Запуск функции main с параметром: {some_param}")
+
+    currencies = load_user_currencies(settings_path)  # Загружаем валюты
+    stocks = load_user_stocks(settings_path)  # Загружаем акции
+
+    date_obj = _parse_date_param(some_param)
+    if isinstance(date_obj, str):
+        return date_obj
+
+    try:
+        is_empty, period_info = _cached_period_info(date_obj, statement_path, settings_path)
+    except Exception as e:
+        return _read_error_response(e)
+
+    if currency_rates is None:
+        currency_rates = _fetch_currency_rates(currencies)
+    if stock_prices is None:
+        stock_prices = _fetch_stock_prices(stocks)
+    return _assemble_response(period_info, is_empty, currency_rates, stock_prices, return_json, timings, compact)
+
+
+async def _form_main_page_info_async(
+    some_param: Union[str, dict],
+    return_json: bool,
+    timings: Optional[List[Dict[str, Any]]],
+    statement_path: Optional[PathLike],
+    settings_path: Optional[PathLike],
+    currency_rates: Optional[List[Dict[str, Any]]],
+    stock_prices: Optional[List[Dict[str, Any]]],
+    compact: bool = False,
+) -> Union[str, Dict[str, Any]]:
+    logger.info(f"Запуск асинхронной функции main с параметром: {some_param}")
+
+    currencies = load_user_currencies(settings_path)  # Загружаем валюты
+    stocks = load_user_stocks(settings_path)  # Загружаем акции
+
+    date_obj = _parse_date_param(some_param)
+    if isinstance(date_obj, str):
+        return date_obj
+
+    loop = asyncio.get_running_loop()
+
+    def run_in_thread(func: Callable, *args: Any) -> asyncio.Future:
+        # Контекст копируется, чтобы замеры этапов из потоков попадали в текущий вызов
+        return loop.run_in_executor(None, functools.partial(contextvars.copy_context().run, func, *args))
+
+    # Сетевые запросы только для котировок, которые не переданы: курсы валют и по запросу на каждую акцию
+    quote_futures = []
+    if currency_rates is None:
+        quote_futures.append(run_in_thread(_fetch_currency_rates, currencies))
+    if stock_prices is None:
+        quote_futures.extend(run_in_thread(_fetch_stock_prices, [stock]) for stock in stocks)
+    # Обработка данных выписки
+    period_future = run_in_thread(_cached_period_info, date_obj, statement_path, settings_path)
+
+    period_result, *quote_results = await asyncio.gather(period_future, *quote_futures, return_exceptions=True)
+
+    if isinstance(period_result, BaseException):
+        return _read_error_response(period_result)
+
+    quotes: List[List[Dict[str, Any]]] = []
+    for result in quote_results:
+        if isinstance(result, BaseException):
+            raise result
+        quotes.append(result)
+    if currency_rates is None:
+        currency_rates = quotes.pop(0)
+    if stock_prices is None:
+        stock_prices = [price for prices in quotes for price in prices]
+
+    is_empty, period_info = period_result
+    return _assemble_response(period_info, is_empty, currency_rates, stock_prices, return_json, timings, compact)
 
 
-def create_json_response(expenses_cards: List[Dict], top_transactions: List[Dict]) -> str:
+def create_json_response(expenses_cards: List[Dict], top_transactions: List[Dict], compact: bool = False) -> str:
     """
     Формирует JSON-ответ на основе карт расходов и топ-транзакций.
 
     :param expenses_cards: Список словарей с данными о расходах по картам.
     :param top_transactions: Список словарей с данными о топ-транзакциях.
+    :param compact: Компактный JSON без отступов для машинных потребителей.
     :return: JSON-строка с ответом.
     """
     response = {"expenses_cards": expenses_cards, "top_transactions": top_transactions}
 
     # Преобразуем словарь в JSON-строку
-    json_response = json.dumps(response, ensure_ascii=False, indent=4)
+    json_response = dumps(response, indent=4, compact=compact)
 
     return json_response
 
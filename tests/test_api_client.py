@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.api_client import api_get, currency_api_url, get_api_mode, recording_path, stock_api_url
+from src.utils import get_currency_rates, get_stock_price
+
+rates_response = {"rates": {"RUB": 73.21, "EUR": 0.88, "USD": 1.0}}
+
+
+@pytest.fixture
+def recordings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("API_RECORDINGS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_default_base_urls(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("CURRENCY_API_URL", raising=False)
+    monkeypatch.delenv("STOCK_API_URL", raising=False)
+    assert currency_api_url() == "https://openexchangerates.org/api"
+    assert stock_api_url() == "https://www.alphavantage.co"
+
+
+def test_configurable_base_urls(mocker: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("CURRENCY_API_URL", "http://localhost:8000/api/")
+    monkeypatch.setenv("STOCK_API_URL", "http://localhost:8000")
+    monkeypatch.setenv("API_KEY", "key")
+    get = mocker.patch(
+        "src.api_client.requests.get", return_value=MagicMock(status_code=200, json=lambda: rates_response)
+    )
+
+    get_currency_rates(["EUR"])
+    assert get.call_args.args[0] == "http://localhost:8000/api/latest.json?app_id=key&base=USD"
+    get_stock_price(["AAPL"])
+    assert get.call_args.args[0].startswith("http://localhost:8000/query?function=GLOBAL_QUOTE&symbol=AAPL")
+
+
+@pytest.mark.parametrize(
+    "value, expected", [(None, "live"), ("REPLAY", "replay"), ("record", "record"), ("x", "live")]
+)
+def test_get_api_mode(monkeypatch: pytest.MonkeyPatch, value: str, expected: str) -> None:
+    if value is None:
+        monkeypatch.delenv("API_MODE", raising=False)
+    else:
+        monkeypatch.setenv("API_MODE", value)
+    assert get_api_mode() == expected
+
+
+def test_recording_path_ignores_api_keys(recordings: Path) -> None:
+    first = recording_path("https://openexchangerates.org/api/latest.json?app_id=one&base=USD")
+    second = recording_path("https://openexchangerates.org/api/latest.json?base=USD&app_id=two")
+    assert first == second
+    assert first.parent == recordings
+    assert first.name.startswith("openexchangerates.org_")
+
+
+def test_record_and_replay(mocker: Any, monkeypatch: pytest.MonkeyPatch, recordings: Path) -> None:
+    monkeypatch.setenv("API_KEY", "secret")
+    monkeypatch.setenv("API_MODE", "record")
+    response = MagicMock(status_code=200, reason="OK", text=json.dumps(rates_response), json=lambda: rates_response)
+    mocker.patch("src.api_client.requests.get", return_value=response)
+    recorded = get_currency_rates(["EUR", "USD"])
+
+    # Ключ API в запись не попадает
+    files = list(recordings.glob("*.json"))
+    assert len(files) == 1
+    assert "secret" not in files[0].read_text(encoding="utf-8")
+
+    # Воспроизведение работает без сети и без ключа API
+    monkeypatch.setenv("API_MODE", "replay")
+    monkeypatch.delenv("API_KEY")
+    get = mocker.patch("src.api_client.requests.get", side_effect=AssertionError("запрос к сети"))
+    assert get_currency_rates(["EUR", "USD"]) == recorded
+    get.assert_not_called()
+
+
+def test_replay_missing_recording(monkeypatch: pytest.MonkeyPatch, recordings: Path) -> None:
+    monkeypatch.setenv("API_MODE", "replay")
+    response = api_get("https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol=AAPL&apikey=key")
+    assert response.status_code == 404
+    assert get_stock_price(["AAPL"]) == []
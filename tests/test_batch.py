@@ -0,0 +1,91 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.batch import BatchTask, load_manifest, render_user_page, run_batch, select_user_quotes
+
+quotes = {
+    "currency_rates": {"USD": {"currency": "USD", "rate": 73.0}, "EUR": {"currency": "EUR", "rate": 87.0}},
+    "stock_prices": {"AAPL": {"stock": "AAPL", "price": 150.0}, "TSLA": {"stock": "TSLA", "price": 700.0}},
+}
+
+
+@pytest.fixture
+def manifest(tmp_path: Path) -> List[Dict[str, Any]]:
+    statement = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["10.12.2021 16:02:10", "15.12.2021 13:01:22"],
+            "Сумма платежа": [-200.0, -300.0],
+            "Номер карты": ["*7197", "*5091"],
+            "Категория": ["Еда", "Транспорт"],
+            "Описание": ["Ужин", "Такси"],
+        }
+    ).to_excel(statement, index=False)
+
+    tasks = []
+    for user, stocks in (("alice", ["AAPL"]), ("bob", ["TSLA", "AAPL"])):
+        settings = tmp_path / f"{user}_settings.json"
+        settings.write_text(json.dumps({"user_currencies": ["EUR"], "user_stocks": stocks}), encoding="utf-8")
+        tasks.append(
+            {"user": user, "statement": str(statement), "settings": str(settings), "date": "2021-12-20 12:00:00"}
+        )
+    return tasks
+
+
+def test_select_user_quotes() -> None:
+    result = select_user_quotes(quotes, ["EUR", "USD"], ["TSLA", "MSFT"])
+    assert [rate["currency"] for rate in result["currency_rates"]] == ["USD", "EUR"]
+    assert result["stock_prices"] == [{"stock": "TSLA", "price": 700.0}]
+
+
+def test_load_manifest_csv(tmp_path: Path) -> None:
+    manifest_file = tmp_path / "manifest.csv"
+    manifest_file.write_text(
+        "user,statement,settings,date\nalice,a.xlsx,a.json,2021-12-20 12:00:00\n", encoding="utf-8"
+    )
+    assert load_manifest(manifest_file) == [
+        {"user": "alice", "statement": "a.xlsx", "settings": "a.json", "date": "2021-12-20 12:00:00"}
+    ]
+
+
+def test_load_manifest_missing_fields(tmp_path: Path) -> None:
+    manifest_file = tmp_path / "manifest.json"
+    manifest_file.write_text(json.dumps([{"user": "alice"}]), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_manifest(manifest_file)
+
+
+def test_run_batch(manifest: List[Dict[str, Any]], tmp_path: Path) -> None:
+    output_dir = tmp_path / "output"
+    with (
+        patch("src.batch.get_currency_rates", return_value=list(quotes["currency_rates"].values())) as mock_rates,
+        patch("src.batch.get_stock_price", return_value=list(quotes["stock_prices"].values())) as mock_stocks,
+    ):
+        summary = run_batch(manifest, output_dir, workers=2, chunksize=1)
+
+    # Котировки запрашиваются один раз на весь пакет
+    mock_rates.assert_called_once_with(["EUR"])
+    mock_stocks.assert_called_once_with(["AAPL", "TSLA"])
+    assert summary["users"] == 2
+    assert summary["failed"] == []
+
+    bob = json.loads((output_dir / "bob.json").read_text(encoding="utf-8"))
+    assert [price["stock"] for price in bob["stock_prices"]] == ["TSLA", "AAPL"]
+    assert len(bob["cards"]) == 2
+
+
+def test_render_user_page_write_failure(tmp_path: Path) -> None:
+    task = BatchTask(user="alice", statement="a.xlsx", settings="a.json", date="2021-12-20", currencies=[], stocks=[])
+    with (
+        patch("src.batch.form_main_page_info", return_value={"cards": []}),
+        patch("src.batch.write_report", return_value=False),
+        patch.dict("src.batch._worker_quotes", {"currency_rates": {}, "stock_prices": {}}),
+    ):
+        result = render_user_page(task, str(tmp_path))
+    # Страница сформирована, но не записана
+    assert result["status"] == "error"
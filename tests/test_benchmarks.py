@@ -0,0 +1,33 @@
+import pytest
+
+from benchmarks.generator import COLUMNS, generate_transactions
+from benchmarks.run_benchmarks import compare_results, time_benchmark
+
+
+def test_generate_transactions() -> None:
+    """Сгенерированная выписка имеет формат operations.xlsx и отсортирована по убыванию даты."""
+    df = generate_transactions(1000, seed=1)
+    assert list(df.columns) == COLUMNS
+    assert len(df) == 1000
+    dates = df["Дата операции"].map(lambda value: value[6:10] + value[3:5] + value[0:2] + value[11:])
+    assert dates.is_monotonic_decreasing
+    assert set(df["Статус"]) <= {"OK", "FAILED"}
+    assert (df.loc[df["Категория"] == "Пополнения", "Сумма платежа"] > 0).all()
+
+
+def test_generate_transactions_reproducible() -> None:
+    assert generate_transactions(100, seed=5).equals(generate_transactions(100, seed=5))
+
+
+def test_time_benchmark() -> None:
+    stats = time_benchmark(lambda: (3,), lambda value: value * 2, repeat=3)
+    assert stats["repeat"] == 3
+    assert stats["min"] <= stats["median"]
+
+
+def test_compare_results() -> None:
+    baseline = {"results": {"a[10]": {"median": 1.0}, "b[10]": {"median": 1.0}}}
+    current = {"results": {"a[10]": {"median": 1.1}, "b[10]": {"median": 1.5}, "c[10]": {"median": 9.0}}}
+    regressions = compare_results(current, baseline, threshold=0.2)
+    assert [regression["name"] for regression in regressions] == ["b[10]"]
+    assert regressions[0]["ratio"] == pytest.approx(1.5)
@@ -0,0 +1,45 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.cashback import capped_cashback, cashback_rates, format_cards
+
+rules: List[Dict[str, Any]] = [
+    {"category": "Супермаркеты", "rate": 0.05, "cap": 10},
+    {"mcc": 5812, "rate": 0.1},
+    {"rate": 0.01},
+]
+
+
+def test_cashback_rates() -> None:
+    df = pd.DataFrame(
+        {"Категория": ["Супермаркеты", "Рестораны", "Супермаркеты", "Такси"], "MCC": [5411, 5812, 5812, None]}
+    )
+    rates, rule_ids = cashback_rates(df, rules)
+    # MCC имеет приоритет над категорией
+    assert rates.tolist() == [0.05, 0.1, 0.1, 0.01]
+    assert rule_ids.tolist() == [0, 1, 1, 2]
+
+
+def test_cashback_rates_without_rules() -> None:
+    rates, rule_ids = cashback_rates(pd.DataFrame({"Категория": ["Такси"]}), [])
+    assert rates.tolist() == [0.0]
+    assert rule_ids.tolist() == [-1]
+
+
+def test_capped_cashback() -> None:
+    index = pd.MultiIndex.from_tuples([("*1", 0), ("*1", 2), ("*2", 0)], names=["card", "rule"])
+    cashback = pd.Series([25.0, 3.0, 4.0], index=index)
+    # Лимит правила 0 применяется отдельно к каждой карте
+    assert capped_cashback(cashback, ["card"], rules).to_dict() == {"*1": 13.0, "*2": 4.0}
+
+
+def test_format_cards() -> None:
+    totals = pd.DataFrame(
+        {"total_spent": [100.456], "income": [0.0], "transactions": [np.int64(2)], "cashback": [1.004]},
+        index=pd.Index(["*7197"], name="card"),
+    )
+    assert format_cards(totals, by_month=False) == [
+        {"last_digits": "7197", "total_spent": 100.46, "cashback": 1.0, "transactions": 2, "income": 0.0}
+    ]
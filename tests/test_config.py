@@ -1,3 +1,4 @@
+import gzip
 import json
 import os
 from pathlib import Path
@@ -7,7 +8,8 @@ from unittest.mock import mock_open, patch
 import pandas as pd
 import pytest
 
-from src.config import decorator_spending_by_category, load_user_currencies, load_user_stocks, user_setting_path
+from src import config
+from src.config import ReportWriter, decorator_spending_by_category, flush_reports, write_report
 
 # Тестовые данные
 mock_user_settings = {"user_currencies": ["USD", "EUR"], "user_stocks": ["AAPL", "GOOGL"]}
@@ -24,21 +26,65 @@ def transactions() -> pd.DataFrame:
 
 def test_load_user_currencies() -> None:
     """Тестирование функции загрузки пользовательских валют."""
+    config.reload_user_settings()
     with patch("builtins.open", mock_open(read_data=json.dumps(mock_user_settings))):
-        currencies = load_user_currencies()
+        currencies = config.load_user_currencies()
         assert currencies == mock_user_settings["user_currencies"], "Должны получить корректный список валют"
 
 
 def test_load_user_stocks() -> None:
     """Тестирование функции загрузки пользовательских акций."""
+    config.reload_user_settings()
     with patch("builtins.open", mock_open(read_data=json.dumps(mock_user_settings))):
-        stocks = load_user_stocks()
+        stocks = config.load_user_stocks()
         assert stocks == mock_user_settings["user_stocks"], "Должны получить корректный список акций"
 
 
+def test_user_settings_cached_until_file_changes(tmp_path: Path) -> None:
+    """Настройки читаются один раз и перечитываются после изменения файла."""
+    settings_file = tmp_path / "settings.json"
+    settings_file.write_text(json.dumps(mock_user_settings), encoding="utf-8")
+    assert config.load_user_stocks(settings_file) == ["AAPL", "GOOGL"]
+
+    with patch("builtins.open", side_effect=AssertionError("Файл не должен читаться повторно")):
+        assert config.load_user_currencies(settings_file) == ["USD", "EUR"]
+
+    settings_file.write_text(json.dumps({"user_currencies": ["CNY", 1], "user_stocks": "AAPL"}), encoding="utf-8")
+    os.utime(settings_file, ns=(0, 0))
+    assert config.get_user_settings(settings_file) == {"user_currencies": ["CNY"], "user_stocks": []}
+
+
+def test_reload_user_settings(tmp_path: Path) -> None:
+    """Явный сброс кэша приводит к повторному чтению файла."""
+    settings_file = tmp_path / "settings.json"
+    settings_file.write_text(json.dumps(mock_user_settings), encoding="utf-8")
+    assert config.load_user_currencies(settings_file) == ["USD", "EUR"]
+
+    config.reload_user_settings(settings_file)
+    with patch("builtins.open", mock_open(read_data=json.dumps({"user_currencies": ["JPY"]}))):
+        assert config.load_user_currencies(settings_file) == ["JPY"]
+
+
+def test_load_cashback_rules(tmp_path: Path) -> None:
+    """Правила кешбэка читаются из config.json, некорректные правила пропускаются."""
+    config_file = tmp_path / "config.json"
+    rules = [{"rate": 0.05, "category": "Супермаркеты", "cap": 300}, {"rate": -1}, {"rate": 0.01, "mcc": "5411"}]
+    config_file.write_text(json.dumps({"cashback_rules": rules}), encoding="utf-8")
+    assert config.load_cashback_rules(config_file) == rules[:1]
+
+    with patch("builtins.open", side_effect=AssertionError("Файл не должен читаться повторно")):
+        assert config.load_cashback_rules(config_file) == rules[:1]
+
+    config_file.write_text(json.dumps({"cashback_rules": {"rate": 0.02}}), encoding="utf-8")
+    os.utime(config_file, ns=(0, 0))
+    assert config.load_cashback_rules(config_file) == config.DEFAULT_CASHBACK_RULES
+    assert config.load_cashback_rules(tmp_path / "missing.json") == config.DEFAULT_CASHBACK_RULES
+    assert config.load_cashback_rules() == [{"rate": 0.01}]
+
+
 def test_user_setting_path() -> None:
     """Проверка корректности пути к файлу с пользовательскими настройками."""
-    assert user_setting_path.is_file(), "Путь к файлу user_settings.json должен существовать"
+    assert config.user_setting_path.is_file(), "Путь к файлу user_settings.json должен существовать"
 
 
 def test_data_directory() -> None:
@@ -60,6 +106,7 @@ def test_spending_by_category_default_filename(transactions: pd.DataFrame) -> No
         return transactions[transactions["category"] == category].to_dict(orient="records")
 
     result = spending_by_category(transactions, "food")
+    assert flush_reports(timeout=5)
     assert result == [{"category": "food", "amount": 10.0}, {"category": "food", "amount": 15.0}]
 
     # Проверяем, что файл был создан
@@ -81,6 +128,7 @@ def test_spending_by_category_custom_filename(transactions: pd.DataFrame) -> Non
         return transactions[transactions["category"] == category].to_dict(orient="records")
 
     result = spending_by_category(transactions, "clothing")
+    assert flush_reports(timeout=5)
     assert result == [{"category": "clothing", "amount": 5.0}]
 
     # Проверяем, что файл был создан с нужным именем
@@ -95,5 +143,71 @@ def test_spending_by_category_custom_filename(transactions: pd.DataFrame) -> Non
     os.remove("test_report.json")
 
 
+def test_spending_by_category_compact_gzip(transactions: pd.DataFrame, tmp_path: Path) -> None:
+    report_file = tmp_path / "report.json"
+
+    @decorator_spending_by_category(str(report_file), compact=True, use_gzip=True, background=False)
+    def spending_by_category(transactions: pd.DataFrame, category: str) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = transactions[transactions["category"] == category].to_dict(orient="records")
+        return records
+
+    result = spending_by_category(transactions, "clothing")
+    with gzip.open(str(report_file) + ".gz", "rt", encoding="utf-8") as f:
+        assert f.read() == '[{"category":"clothing","amount":5.0}]'
+    assert json.loads(gzip.decompress((tmp_path / "report.json.gz").read_bytes())) == result
+
+
+def test_report_writer_coalesces_writes(tmp_path: Path) -> None:
+    writer = ReportWriter()
+    report_file = str(tmp_path / "report.json")
+    with patch("src.config._write_payload") as mock_write:
+        with writer._condition:  # Пока поток записи ждет, накапливаем несколько версий отчета
+            for version in range(5):
+                writer.submit(report_file, {"version": version})
+        assert writer.flush(timeout=5)
+
+    written = [json.loads(call.args[1])["version"] for call in mock_write.call_args_list]
+    assert written == [4]
+    # Временные файлы не остаются в директории
+    assert os.listdir(tmp_path) == []
+
+
+def test_report_writer_snapshots_result(tmp_path: Path) -> None:
+    """В файл записывается результат на момент постановки в очередь, а не после его изменения."""
+    writer = ReportWriter()
+    report_file = tmp_path / "report.json"
+    result: Dict[str, Any] = {"total": 1}
+    with writer._condition:
+        assert writer.submit(str(report_file), result)
+        result["total"] = 2
+        result.update({str(key): key for key in range(100)})
+    assert writer.flush(timeout=5)
+    assert json.loads(report_file.read_text(encoding="utf-8")) == {"total": 1}
+    assert not writer.submit(str(report_file), {"a": object()})
+
+
+def test_write_report_file_mode(tmp_path: Path) -> None:
+    report_file = tmp_path / "report.json"
+    old_umask = os.umask(0o027)
+    try:
+        assert write_report(str(report_file), {"a": 1})
+    finally:
+        os.umask(old_umask)
+    # Права нового файла определяются umask, а не правами временного файла mkstemp
+    assert report_file.stat().st_mode & 0o777 == 0o640
+
+    # При перезаписи сохраняются права существующего файла
+    os.chmod(report_file, 0o644)
+    assert write_report(str(report_file), {"a": 2})
+    assert report_file.stat().st_mode & 0o777 == 0o644
+    assert json.loads(report_file.read_text(encoding="utf-8")) == {"a": 2}
+
+
+def test_write_report_failure(tmp_path: Path) -> None:
+    assert not write_report(str(tmp_path / "missing" / "report.json"), {"a": 1})
+    assert not write_report(str(tmp_path / "report.json"), {"a": object()})
+    assert os.listdir(tmp_path) == []
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,115 @@
+import json
+from datetime import date
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.currency import RateTable, convert_transactions, update_rates_history
+from src.utils import get_expenses_cards
+
+
+@pytest.fixture
+def rate_table() -> RateTable:
+    table = RateTable()
+    table.add_rates("2022-01-01", {"USD": 70.0, "EUR": 80.0})
+    table.add_rates("2022-02-01", {"USD": 75.0, "EUR": 85.0})
+    return table
+
+
+@pytest.fixture
+def transactions() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": [
+                "10.01.2022 10:00:00",
+                "15.02.2022 12:00:00",
+                "20.02.2022 09:00:00",
+                "31.12.2021 18:00:00",
+            ],
+            "Номер карты": ["*1111", "*1111", "*2222", "*2222"],
+            "Сумма операции": [-10.0, -20.0, -700.0, -5.0],
+            "Валюта операции": ["USD", "EUR", "RUB", "GBP"],
+            "Сумма платежа": [-10.0, -20.0, -700.0, -5.0],
+            "Валюта платежа": ["USD", "EUR", "RUB", "GBP"],
+            "Сумма операции с округлением": [10.0, 20.0, 700.0, 5.0],
+        }
+    )
+
+
+def test_rates_to_rub_uses_rate_on_or_before_date(rate_table: RateTable) -> None:
+    dates = pd.to_datetime(pd.Series(["2022-01-31", "2022-02-01", "2021-12-01", "2022-03-01"]))
+    rates = rate_table.rates_to_rub(pd.Series(["USD", "EUR", "USD", "RUB"]), dates)
+
+    # Для даты раньше всей истории берется ближайший последующий курс
+    np.testing.assert_array_equal(rates, [70.0, 85.0, 70.0, 1.0])
+
+
+def test_convert_transactions_to_rub(transactions: pd.DataFrame, rate_table: RateTable) -> None:
+    result = convert_transactions(transactions, rate_table=rate_table)
+
+    assert result["Сумма операции"].tolist()[:3] == [-700.0, -1700.0, -700.0]
+    assert result["Сумма операции с округлением"].tolist()[:3] == [700.0, 1700.0, 700.0]
+    # Курса GBP нет в таблице: сумма и валюта остаются исходными
+    assert result["Сумма платежа"].iloc[3] == -5.0
+    assert result["Валюта платежа"].tolist() == ["RUB", "RUB", "RUB", "GBP"]
+    assert result["Валюта операции"].tolist() == ["RUB", "RUB", "RUB", "GBP"]
+    # Исходный датафрейм не меняется
+    assert transactions["Валюта платежа"].tolist() == ["USD", "EUR", "RUB", "GBP"]
+
+
+def test_convert_transactions_to_target_currency(transactions: pd.DataFrame, rate_table: RateTable) -> None:
+    result = convert_transactions(transactions.iloc[:3], "USD", rate_table)
+
+    assert result["Сумма платежа"].tolist() == [-10.0, -22.67, -9.33]
+    assert set(result["Валюта операции"]) == {"USD"}
+
+
+def test_convert_transactions_without_rates_history(
+    transactions: pd.DataFrame, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("src.currency.RATES_HISTORY_PATH", tmp_path / "missing.json")
+    with pytest.raises(FileNotFoundError):
+        convert_transactions(transactions)
+
+
+def test_converted_transactions_in_reports(transactions: pd.DataFrame, rate_table: RateTable) -> None:
+    result = get_expenses_cards(convert_transactions(transactions.iloc[:3], rate_table=rate_table))
+
+    assert [card["total_spent"] for card in result] == [2400.0, 700.0]
+
+
+def test_rate_table_save_and_load(tmp_path: Path, rate_table: RateTable) -> None:
+    path = tmp_path / "rates.json"
+    rate_table.save(path)
+
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file)["2022-02-01"] == {"USD": 75.0, "EUR": 85.0}
+    loaded = RateTable.load(path)
+    dates = pd.to_datetime(pd.Series(["2022-01-15"]))
+    assert loaded.rates_to_rub(pd.Series(["EUR"]), dates).tolist() == [80.0]
+
+
+def test_rate_table_load_missing_file(tmp_path: Path) -> None:
+    table = RateTable.load(tmp_path / "missing.json")
+
+    assert np.isnan(table.rates_to_rub(pd.Series(["USD"]), pd.to_datetime(pd.Series(["2022-01-01"])))).all()
+
+
+@patch("src.currency.get_currency_rates")
+def test_update_rates_history(mock_rates: MagicMock, tmp_path: Path) -> None:
+    mock_rates.return_value = [{"currency": "USD", "rate": 90.0}, {"currency": "EUR", "rate": None}]
+    path = tmp_path / "rates.json"
+
+    update_rates_history(["USD", "EUR"], path)
+
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file) == {date.today().strftime("%Y-%m-%d"): {"USD": 90.0}}
+
+
+@patch("src.currency.get_currency_rates", return_value=[])
+def test_update_rates_history_no_rates(mock_rates: MagicMock, tmp_path: Path) -> None:
+    assert update_rates_history(["USD"], tmp_path / "rates.json") is None
+    assert not (tmp_path / "rates.json").exists()
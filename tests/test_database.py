@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.database import TransactionDatabase, import_statement, is_database, open_database, read_operations_json
+from src.reports import spending_by_category
+from src.services import get_transfers_to_individuals
+from src.utils import get_expenses_cards, get_expenses_cards_by_month, top_transaction, transaction_currency
+from src.views import form_main_page_info
+
+transactions = pd.DataFrame(
+    {
+        "Дата операции": [
+            "15.12.2021 13:01:22",
+            "10.12.2021 16:02:10",
+            None,
+            "26.11.2021 01:12:25",
+            "02.12.2021 09:00:00",
+        ],
+        "Дата платежа": ["15.12.2021", "10.12.2021", "01.12.2021", "26.11.2021", "02.12.2021"],
+        "Номер карты": ["*7197", "*5091", "*7197", np.nan, "*5091"],
+        "Сумма платежа": [-300.0, -200.0, -50.0, 1000.0, -900.0],
+        "Категория": ["Транспорт", "Супермаркеты", "Супермаркеты", "Пополнения", "Переводы"],
+        "MCC": [4121.0, 5411.0, 5411.0, np.nan, np.nan],
+        "Описание": ["Такси", "Ужин", "Обед", "Пополнение счета", "Иван П."],
+        "Сумма операции с округлением": [300.0, 200.0, 50.0, 1000.0, 900.0],
+    }
+)
+
+rules = [{"category": "Супермаркеты", "rate": 0.05, "cap": 5}, {"mcc": 4121, "rate": 0.1}, {"rate": 0.01}]
+
+
+@pytest.fixture
+def database(tmp_path: Path) -> TransactionDatabase:
+    return TransactionDatabase.build(transactions, tmp_path / "transactions.db")
+
+
+def test_build_and_open(database: TransactionDatabase) -> None:
+    assert is_database(database.path)
+    assert not is_database(database.path.with_suffix(".xlsx"))
+    assert len(database) == 5
+    assert database.columns == [
+        "Дата операции",
+        "Дата платежа",
+        "Номер карты",
+        "Сумма платежа",
+        "Категория",
+        "MCC",
+        "Описание",
+        "Сумма операции с округлением",
+    ]
+    assert open_database(database.path) is open_database(database.path)
+
+
+def test_build_in_batches(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    expected = TransactionDatabase.build(transactions, tmp_path / "single.db").to_frame()
+    monkeypatch.setattr("src.database.INSERT_BATCH_SIZE", 2)
+    batched = TransactionDatabase.build(transactions, tmp_path / "batched.db")
+    pd.testing.assert_frame_equal(batched.to_frame(), expected)
+
+
+def test_indexes(database: TransactionDatabase) -> None:
+    with database.pool.connection() as connection:
+        plan = connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM transactions WHERE category = ? AND operation_date >= ?", ("a", "b")
+        ).fetchall()
+    assert "idx_category_date" in str(plan)
+
+
+def test_to_frame(database: TransactionDatabase) -> None:
+    df = database.to_frame("2021-12-01", "2021-12-31 23:59:59")
+    # Строка без даты операции в выборки не попадает, остальные отсортированы по дате
+    assert df["Описание"].tolist() == ["Иван П.", "Ужин", "Такси"]
+    assert df["Дата операции"].dtype == "datetime64[ns]"
+    assert df["Сумма платежа"].tolist() == [-900.0, -200.0, -300.0]
+
+
+@pytest.mark.parametrize("cashback_rules", [None, rules])
+def test_expenses_cards_match_dataframe(database: TransactionDatabase, cashback_rules: list) -> None:
+    assert get_expenses_cards(database, cashback_rules) == get_expenses_cards(transactions, cashback_rules)
+    assert get_expenses_cards_by_month(database, cashback_rules) == get_expenses_cards_by_month(
+        transactions, cashback_rules
+    )
+
+
+def test_top_transaction(database: TransactionDatabase) -> None:
+    assert top_transaction(database, top_n=3) == top_transaction(transactions, top_n=3)
+
+
+def test_transaction_currency(database: TransactionDatabase) -> None:
+    result = transaction_currency(database, "20.12.2021 00:00:00")
+    assert result["Описание"].tolist() == ["Иван П.", "Ужин", "Такси"]
+
+
+def test_spending_by_category(database: TransactionDatabase) -> None:
+    expected = spending_by_category(transactions, "Супермаркеты", "20.12.2021 00:00:00")
+    assert spending_by_category(database, "Супермаркеты", "20.12.2021 00:00:00") == expected
+    assert json.loads(expected) == [{"date": "10.12.2021 16:02:10", "amount": 200.0}]
+
+
+def test_transfers_to_individuals(database: TransactionDatabase) -> None:
+    result = json.loads(get_transfers_to_individuals(database))
+    assert [(item["Описание"], item["Дата операции"]) for item in result] == [("Иван П.", "02.12.2021 09:00:00")]
+
+
+def test_connection_pool(database: TransactionDatabase) -> None:
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(len(database))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [5] * 8
+    assert database.pool._created <= database.pool.size
+
+
+def test_open_database_keeps_replaced_database(database: TransactionDatabase) -> None:
+    old = open_database(database.path)
+    assert len(old) == 5
+    idle = list(old.pool._idle.queue)
+
+    rebuilt = TransactionDatabase.build(transactions.iloc[:2], database.path)
+    os.utime(rebuilt.path, (0, 0))
+    assert len(open_database(database.path)) == 2
+    # Соединения прежней базы не закрываются: ее может использовать другой поток
+    assert [connection.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] for connection in idle] == [5]
+    assert len(old) == 5
+
+
+def test_open_invalid_file(tmp_path: Path) -> None:
+    path = tmp_path / "empty.db"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        TransactionDatabase.open(path)
+
+
+def test_import_operations_json(tmp_path: Path) -> None:
+    source = tmp_path / "operation.json"
+    operations = [
+        {
+            "id": 1,
+            "state": "EXECUTED",
+            "date": "2019-08-26T10:50:58.294041",
+            "operationAmount": {"amount": "31957.58", "currency": {"name": "руб.", "code": "RUB"}},
+            "description": "Перевод организации",
+            "from": "Maestro 1596837868705199",
+            "to": "Счет 64686473678894779589",
+        },
+        {
+            "id": 2,
+            "state": "CANCELED",
+            "date": "2019-07-03T18:35:29.512364",
+            "operationAmount": {"amount": "8221.37", "currency": {"name": "USD", "code": "USD"}},
+            "description": "Открытие вклада",
+            "to": "Счет 35383033474447895560",
+        },
+        {},
+    ]
+    source.write_text(json.dumps(operations, ensure_ascii=False), encoding="utf-8")
+
+    df = read_operations_json(source)
+    assert df["Номер карты"].tolist() == ["*5199", None]
+    assert df["Статус"].tolist() == ["OK", "FAILED"]
+    assert df["Сумма платежа"].tolist() == [-31957.58, -8221.37]
+
+    database = import_statement(source, tmp_path / "operations.db")
+    assert len(database) == 2
+    assert get_expenses_cards(database)[0]["last_digits"] == "5199"
+
+
+def test_form_main_page_info_from_database(database: TransactionDatabase) -> None:
+    result = form_main_page_info(
+        "2021-12-20 00:00:00", statement_path=database.path, currency_rates=[], stock_prices=[]
+    )
+    assert isinstance(result, dict)
+    assert [card["last_digits"] for card in result["cards"]] == ["5091", "7197"]
+    assert len(result["top_transactions"]) == 3
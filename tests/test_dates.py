@@ -0,0 +1,94 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from pytest_mock import MockerFixture
+
+from src import dates
+from src.dates import clear_cache, parse_dates
+
+
+@pytest.fixture(autouse=True)
+def empty_cache() -> None:
+    clear_cache()
+
+
+def test_parse_dates_fixed_layouts() -> None:
+    values = pd.Series(["31.12.2021 16:44:00", "29.02.2024", "01.01.2022 00:00:01"], index=[5, 6, 7], name="d")
+    result = parse_dates(values)
+
+    expected = pd.to_datetime(pd.Series(["2021-12-31 16:44:00", "2024-02-29 00:00:00", "2022-01-01 00:00:01"]))
+    np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+    assert list(result.index) == [5, 6, 7]
+    assert result.name == "d"
+
+
+@pytest.mark.parametrize(
+    "value", ["31.02.2021 10:00:00", "29.02.2023", "01.01.2022 24:00:00", "32.01.2022", "abc", ""]
+)
+def test_parse_dates_invalid(value: str) -> None:
+    assert parse_dates(pd.Series([value])).isna().all()
+
+
+def test_parse_dates_fallback_and_missing() -> None:
+    result = parse_dates(pd.Series(["2021-12-05 10:00:00", None, np.nan, "5.1.2022"]))
+
+    assert result.iloc[0] == pd.Timestamp("2021-12-05 10:00:00")
+    assert result.iloc[1:3].isna().all()
+    assert result.iloc[3] == pd.Timestamp("2022-01-05")
+
+
+def test_parse_dates_matches_to_datetime() -> None:
+    values = pd.Series(["31.12.2021 16:44:00", "15.06.2020", "31.12.2021 16:44:00", "bad"] * 3)
+    expected = pd.to_datetime(values, format="mixed", dayfirst=True, errors="coerce")
+
+    pd.testing.assert_series_equal(parse_dates(values), expected, check_dtype=False)
+
+
+def test_parse_dates_datetime_passthrough() -> None:
+    values = pd.Series(pd.to_datetime(["2022-01-01"]))
+    assert parse_dates(values) is values
+
+
+def test_parse_dates_uses_cache(mocker: MockerFixture) -> None:
+    values = pd.Series(["01.01.2022 10:00:00", "02.01.2022 10:00:00"])
+    parse_dates(values)
+    spy = mocker.spy(dates, "_parse_unique")
+
+    result = parse_dates(pd.Series(["02.01.2022 10:00:00", "03.01.2022 10:00:00"]))
+
+    assert spy.call_count == 1
+    assert list(spy.call_args.args[0]) == ["03.01.2022 10:00:00"]
+    assert result.iloc[0] == pd.Timestamp("2022-01-02 10:00:00")
+
+
+def test_parse_dates_cache_is_bounded(mocker: MockerFixture) -> None:
+    mocker.patch.object(dates, "CACHE_MAX_SIZE", 3)
+    parse_dates(pd.Series(["01.01.2022", "02.01.2022"]))
+    parse_dates(pd.Series(["03.01.2022", "04.01.2022"]))
+
+    assert len(dates._cache) == 2
+
+
+def test_parse_dates_concurrent_misses(mocker: MockerFixture) -> None:
+    """Потоки, одновременно разобравшие одни и те же строки, не дублируют ключи кэша."""
+    barrier = threading.Barrier(2)
+    parse_unique = dates._parse_unique
+
+    def parse_together(strings: np.ndarray) -> np.ndarray:
+        barrier.wait(timeout=5)
+        return parse_unique(strings)
+
+    mocker.patch.object(dates, "_parse_unique", side_effect=parse_together)
+    values = pd.Series(["01.01.2022 10:00:00", "02.01.2022 10:00:00"])
+    threads = [threading.Thread(target=parse_dates, args=(values,)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert dates._cache.index.is_unique
+    assert len(dates._cache) == 2
+    mocker.stopall()
+    assert parse_dates(values).iloc[1] == pd.Timestamp("2022-01-02 10:00:00")
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features import FEATURE_COLUMNS, FeatureMasks, add_features, compute_features
+
+
+@pytest.fixture
+def transactions() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": ["03.06.2018 14:19:08", "04.06.2018 10:15:30", "01.07.2018 12:00:00", None],
+            "Категория": ["Переводы", "Мобильная связь", "Наличные", "Переводы"],
+            "Описание": ["Константин Ф.", "Я МТС +7 921 11-22-33", "Снятие в банкомате", None],
+            "Сумма платежа": [-22000.0, -300.0, -5000.0, 1000.0],
+        }
+    )
+
+
+def test_compute_features(transactions: pd.DataFrame) -> None:
+    features = compute_features(transactions)
+
+    assert list(features.columns) == FEATURE_COLUMNS
+    assert features["is_transfer_to_individual"].tolist() == [True, False, False, False]
+    assert features["has_phone"].tolist() == [False, True, False, False]
+    assert features["is_expense"].tolist() == [True, True, True, False]
+    assert features["is_cash"].tolist() == [False, False, True, False]
+    assert features["month"].tolist() == [201806, 201806, 201807, -1]
+    assert features["weekday"].tolist() == [6, 0, 6, -1]
+    assert features["month"].dtype == np.int32
+    assert features["weekday"].dtype == np.int8
+
+
+def test_add_features_keeps_source(transactions: pd.DataFrame) -> None:
+    result = add_features(transactions)
+
+    assert list(result.columns) == list(transactions.columns) + FEATURE_COLUMNS
+    assert "has_phone" not in transactions.columns
+    # Повторно признаки не вычисляются
+    assert add_features(result) is result
+
+
+def test_compute_features_missing_columns() -> None:
+    features = compute_features(pd.DataFrame({"Статус": ["OK", "OK"]}))
+
+    assert not features[["is_transfer_to_individual", "has_phone", "is_expense", "is_cash"]].any().any()
+    assert features["month"].tolist() == [-1, -1]
+
+
+def test_feature_masks(transactions: pd.DataFrame) -> None:
+    masks = FeatureMasks.from_frame(transactions)
+
+    assert masks.names == ["is_transfer_to_individual", "has_phone", "is_expense", "is_cash"]
+    assert masks.nbytes == 4
+    np.testing.assert_array_equal(masks.mask("is_expense"), [True, True, True, False])
+    np.testing.assert_array_equal(masks.mask("is_cash"), compute_features(transactions)["is_cash"].to_numpy())
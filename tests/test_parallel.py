@@ -0,0 +1,86 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+from pytest_mock import MockerFixture
+
+from src import config, utils
+from src.parallel import aggregate_cards_parallel
+from src.store import TransactionStore
+from src.utils import _aggregate_cards, get_expenses_cards, get_expenses_cards_by_month
+
+transactions = pd.DataFrame(
+    {
+        "Дата операции": [
+            "15.12.2021 13:01:22",
+            "10.12.2021 16:02:10",
+            None,
+            "26.11.2021 01:12:25",
+            "02.11.2021 09:00:00",
+            "20.10.2021 18:30:00",
+        ],
+        "Номер карты": ["*7197", "*5091", "*7197", np.nan, "*4556", "*7197"],
+        "Сумма платежа": [-300.0, -200.0, -50.0, 1000.0, -5000.0, 150.0],
+        "Категория": ["Транспорт", "Супермаркеты", "Супермаркеты", "Пополнения", "Супермаркеты", "Бонусы"],
+        "MCC": [4121.0, 5411.0, 5411.0, np.nan, 5411.0, np.nan],
+    }
+)
+
+rules: List[Dict[str, Any]] = [{"category": "Супермаркеты", "rate": 0.05, "cap": 100}, {"rate": 0.01}]
+
+
+@pytest.mark.parametrize("partition", ["card", "month"])
+@pytest.mark.parametrize("by_month", [False, True])
+def test_parallel_matches_single(partition: str, by_month: bool) -> None:
+    expected = _aggregate_cards(transactions, by_month=by_month, cashback_rules=rules)
+    assert aggregate_cards_parallel(transactions, by_month, rules, partition=partition, workers=2) == expected
+
+
+def test_parallel_store(tmp_path: Path) -> None:
+    store = TransactionStore.build(transactions, tmp_path / "store")
+    expected = _aggregate_cards(transactions, by_month=True, cashback_rules=rules)
+    assert aggregate_cards_parallel(store, True, rules, workers=2) == expected
+
+
+def test_parallel_invalid_partition() -> None:
+    with pytest.raises(ValueError):
+        aggregate_cards_parallel(transactions, partition="category")
+
+
+def test_execution_mode_dispatch(mocker: MockerFixture) -> None:
+    execution = {"mode": "parallel", "partition": "month", "workers": 2, "min_rows": 0}
+    mocker.patch("src.utils.load_execution_config", return_value=execution)
+    spy = mocker.spy(utils, "aggregate_cards_parallel")
+
+    assert get_expenses_cards(transactions) == _aggregate_cards(transactions, False, None)
+    assert get_expenses_cards_by_month(transactions) == _aggregate_cards(transactions, True, None)
+    assert spy.call_count == 2
+
+
+def test_execution_mode_min_rows(mocker: MockerFixture) -> None:
+    execution = {"mode": "parallel", "partition": "card", "workers": 2, "min_rows": len(transactions) + 1}
+    mocker.patch("src.utils.load_execution_config", return_value=execution)
+    spy = mocker.spy(utils, "aggregate_cards_parallel")
+
+    get_expenses_cards(transactions)
+    assert spy.call_count == 0
+
+
+def test_load_execution_config(tmp_path: Path) -> None:
+    path = tmp_path / "config.json"
+    path.write_text('{"execution": {"mode": "parallel", "partition": "bank", "workers": 4}}', encoding="utf-8")
+
+    execution = config.load_execution_config(path)
+    assert execution == {"mode": "parallel", "partition": "card", "workers": 4, "min_rows": 1_000_000}
+    assert config.load_execution_config(tmp_path / "missing.json") == config.DEFAULT_EXECUTION
+    assert config.load_execution_config()["mode"] == "single"
+
+
+@pytest.mark.parametrize("workers, min_rows", [(-2, "1e6"), (1.5, -1), (True, None)])
+def test_load_execution_config_invalid_numbers(tmp_path: Path, workers: Any, min_rows: Any) -> None:
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"execution": {"workers": workers, "min_rows": min_rows}}), encoding="utf-8")
+    assert config.load_execution_config(path) == config.DEFAULT_EXECUTION
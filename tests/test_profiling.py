@@ -0,0 +1,93 @@
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+import pytest
+
+from src import profiling
+from src.profiling import collect_timings, render_prometheus, reset_stage_totals, stage, timed_stage
+
+
+@pytest.fixture(autouse=True)
+def clean_totals() -> None:
+    reset_stage_totals()
+
+
+def test_stage_records_timings() -> None:
+    with collect_timings() as timings:
+        with stage("read", rows=10):
+            pass
+        with stage("filter") as record:
+            record["rows"] = 3
+    assert [record["stage"] for record in timings] == ["read", "filter"]
+    assert [record["rows"] for record in timings] == [10, 3]
+    assert all(record["seconds"] >= 0 for record in timings)
+
+
+def test_stage_without_collector() -> None:
+    """Вне collect_timings замеры попадают только в накопленную статистику."""
+    with stage("read", rows=5):
+        pass
+    assert 'pipeline_stage_rows_total{stage="read"} 5.0' in render_prometheus()
+
+
+def test_timed_stage_counts_rows() -> None:
+    @timed_stage("load")
+    def load() -> pd.DataFrame:
+        return pd.DataFrame({"a": [1, 2, 3]})
+
+    with collect_timings() as timings:
+        load()
+    assert timings[0]["stage"] == "load"
+    assert timings[0]["rows"] == 3
+
+
+def test_render_prometheus() -> None:
+    for _ in range(2):
+        with stage("cards", rows=4):
+            pass
+    text = render_prometheus()
+    assert "# TYPE pipeline_stage_seconds_total counter" in text
+    assert 'pipeline_stage_calls_total{stage="cards"} 2.0' in text
+    assert 'pipeline_stage_rows_total{stage="cards"} 8.0' in text
+
+
+def test_stage_tracemalloc(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(profiling.PROFILE_ENV, "tracemalloc")
+    with collect_timings() as timings:
+        with stage("alloc"):
+            data: List[bytes] = [bytes(1024) for _ in range(1000)]
+    assert len(data) == 1000
+    assert timings[0]["peak_memory"] >= 1024 * 1000
+
+
+def test_stage_memory_without_tracemalloc(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    with collect_timings() as timings:
+        with stage("read"):
+            pass
+    assert timings[0]["peak_memory"] is None
+
+
+def test_nested_stage_keeps_outer_peak(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(profiling.PROFILE_ENV, "tracemalloc")
+    with collect_timings() as timings:
+        with stage("outer"):
+            data = bytes(4 * 1024 * 1024)
+            del data
+            # Вложенный этап сбрасывает пик tracemalloc, но пик внешнего этапа сохраняется
+            with stage("inner"):
+                pass
+    inner, outer = timings
+    assert inner["peak_memory"] < 4 * 1024 * 1024
+    assert outer["peak_memory"] >= 4 * 1024 * 1024
+
+
+def test_stage_cprofile(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setenv(profiling.PROFILE_ENV, "cprofile")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    with stage("outer"):
+        with stage("inner"):
+            sum(range(1000))
+    # Вложенный этап не запускает второй профилировщик
+    assert [path.name.split("-")[0] for path in tmp_path.iterdir()] == ["outer"]
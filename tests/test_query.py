@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.query import Q, TransactionIndex
+
+
+@pytest.fixture
+def transactions() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": [
+                "31.12.2021 16:44:00",
+                "05.12.2021 10:00:00",
+                "20.11.2021 09:00:00",
+                None,
+                "01.12.2021 00:00:00",
+            ],
+            "Статус": ["OK", "OK", "FAILED", "OK", "OK"],
+            "Категория": ["Переводы", "Супермаркеты", "Переводы", "Переводы", "Супермаркеты"],
+            "Описание": ["Константин Л.", "Магнит", "Иван П.", "Оплата Магнит Москва", None],
+            "Сумма платежа": [-1000.0, -250.5, 500.0, -10.0, "bad"],
+        }
+    )
+
+
+def test_leaf_conditions(transactions: pd.DataFrame) -> None:
+    assert Q.category("Переводы").mask(transactions).tolist() == [True, False, True, True, False]
+    assert Q.category("Переводы", "Супермаркеты").mask(transactions).all()
+    assert Q.status("FAILED").mask(transactions).tolist() == [False, False, True, False, False]
+    assert Q.amount_negative().mask(transactions).tolist() == [True, True, False, True, False]
+    assert Q.amount_between(-300, 0).mask(transactions).tolist() == [False, True, False, True, False]
+    assert Q.description_matches(r"[А-Я][а-я]+\s[А-Я]\.").mask(transactions).tolist() == [
+        True,
+        False,
+        True,
+        False,
+        False,
+    ]
+    assert Q.description_contains("магнит").mask(transactions).tolist() == [False, True, False, True, False]
+
+
+def test_date_between(transactions: pd.DataFrame) -> None:
+    query = Q.date_between("2021-12-01", "2021-12-31 16:44:00")
+    assert query.mask(transactions).tolist() == [True, True, False, False, True]
+    assert Q.date_between(end="2021-12-01").mask(transactions).tolist() == [False, False, True, False, True]
+    assert Q.date_between().mask(transactions).tolist() == [True, True, True, False, True]
+
+
+def test_combined_conditions(transactions: pd.DataFrame) -> None:
+    query = Q.category("Переводы") & Q.date_between("2021-12-01", "2021-12-31 23:59:59") & Q.amount_negative()
+    assert query.apply(transactions).index.tolist() == [0]
+
+    query = Q.status("FAILED") | Q.description_contains("магнит")
+    assert query.mask(transactions).tolist() == [False, True, True, True, False]
+    assert (~Q.category("Переводы")).mask(transactions).tolist() == [False, True, False, False, True]
+    assert (Q.category("Нет такой") & Q.status("OK")).apply(transactions).empty
+
+
+def test_and_matches_mask_evaluation(transactions: pd.DataFrame) -> None:
+    """План с индексами дает тот же результат, что и прямое вычисление масок."""
+    frame = pd.concat([transactions] * 50, ignore_index=True).sample(frac=1, random_state=1)
+    conditions = [Q.category("Переводы"), Q.date_between("2021-11-25", None), Q.status("OK"), ~Q.amount_negative()]
+    combined = conditions[0] & conditions[1] & conditions[2] & conditions[3]
+
+    expected = np.logical_and.reduce([condition.mask(frame) for condition in conditions])
+    np.testing.assert_array_equal(combined.mask(frame), expected)
+
+
+def test_index_reused(transactions: pd.DataFrame) -> None:
+    index = TransactionIndex(transactions)
+    Q.category("Переводы").mask(index)
+    groups = index.groups("Категория")
+
+    assert Q.category("Супермаркеты").apply(index).index.tolist() == [1, 4]
+    assert index.groups("Категория") is groups
+
+
+def test_missing_column() -> None:
+    frame = pd.DataFrame({"Статус": ["OK"]})
+    assert not (Q.category("Переводы") | Q.description_matches(".") | Q.flag("has_phone")).mask(frame).any()
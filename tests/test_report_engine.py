@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.report_engine import SpendingReportEngine
+from src.store import TransactionStore
+
+
+@pytest.fixture
+def transactions() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": [
+                "01.01.2022 10:00:00",
+                "05.01.2022 12:00:00",
+                "20.01.2022 09:00:00",
+                "03.02.2022 18:00:00",
+                "28.02.2022 23:59:59",
+                "28.02.2022 10:00:00",
+            ],
+            "Категория": ["Супермаркеты", "Рестораны", "Супермаркеты", "Супермаркеты", "Супермаркеты", "Рестораны"],
+            "Сумма операции с округлением": [100.0, 300.0, 200.0, 50.0, 25.0, 0.0],
+        }
+    )
+
+
+def test_window_totals(transactions: pd.DataFrame) -> None:
+    engine = SpendingReportEngine(transactions)
+    totals = engine.window_totals(30, "28.02.2022")
+    # Окно 30 дней: с 30.01.2022 по 28.02.2022 включительно
+    assert totals["Супермаркеты"] == 75.0
+    assert totals["Рестораны"] == 0.0
+    assert engine.window_totals(90, "2022-02-28")["Супермаркеты"] == 375.0
+
+
+def test_rolling_matches_window_totals(transactions: pd.DataFrame) -> None:
+    engine = SpendingReportEngine(transactions)
+    rolling = engine.rolling(7)
+    for day in ["2022-01-05", "2022-01-20", "2022-02-28"]:
+        assert rolling.loc[day].to_dict() == engine.window_totals(7, day).to_dict()
+
+
+def test_report_and_cache(transactions: pd.DataFrame) -> None:
+    engine = SpendingReportEngine(transactions)
+    report = engine.report(windows=(7, 90), end_date="2022-01-20")
+    assert report == [
+        {"Категория": "Рестораны", "7d": 0.0, "90d": 300.0},
+        {"Категория": "Супермаркеты", "7d": 200.0, "90d": 300.0},
+    ]
+    assert engine.window_totals(7, "2022-01-20 15:00:00") is engine.window_totals(7, "2022-01-20")
+
+
+def test_month_over_month(transactions: pd.DataFrame) -> None:
+    result = SpendingReportEngine(transactions).month_over_month()
+    february = result[(result["month"] == "2022-02") & (result["Категория"] == "Супермаркеты")].iloc[0]
+    assert february["amount"] == 75.0
+    assert february["delta"] == -225.0
+    assert february["delta_pct"] == pytest.approx(-75.0)
+
+
+def test_engine_from_store(transactions: pd.DataFrame, tmp_path: Path) -> None:
+    store = TransactionStore.build(transactions, tmp_path / "store")
+    engine = SpendingReportEngine(store, by="Категория")
+    assert engine.daily_series("2022-01-01", "2022-01-05")["Рестораны"].tolist() == [0.0, 0.0, 0.0, 0.0, 300.0]
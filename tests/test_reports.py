@@ -62,5 +62,19 @@ def test_spending_by_category_with_missing_date(sample_transactions: pd.DataFram
     assert result == json.dumps(expected_result, indent=4, ensure_ascii=False)
 
 
+def test_spending_by_category_custom_days(sample_transactions: pd.DataFrame) -> None:
+    expected_result: List[Dict[str, Any]] = [{"date": "28.02.2022 23:59:59", "amount": 500}]
+
+    result: str = spending_by_category(sample_transactions, "Супермаркеты", "28.02.2022 23:59:59", days=30)
+    assert result == json.dumps(expected_result, indent=4, ensure_ascii=False)
+
+
+def test_spending_by_category_compact(sample_transactions: pd.DataFrame) -> None:
+    result: str = spending_by_category(
+        sample_transactions, "Супермаркеты", "28.02.2022 23:59:59", days=30, compact=True
+    )
+    assert result == '[{"date":"28.02.2022 23:59:59","amount":500}]'
+
+
 if __name__ == "__main__":
     pytest.main()
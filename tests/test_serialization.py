@@ -0,0 +1,54 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import serialization
+from src.serialization import dumps, dumps_bytes, get_backend
+
+DATA = {"name": "Супермаркеты", "amount": np.float64(10.5), "count": np.int64(3), "values": np.array([1, 2])}
+
+
+def test_dumps_pretty_matches_stdlib() -> None:
+    data = {"cards": [{"last_digits": "7197", "total_spent": 2.5}], "amount": float("nan")}
+    assert dumps(data, indent=4) == json.dumps(data, ensure_ascii=False, indent=4)
+    assert dumps(data) == json.dumps(data, ensure_ascii=False)
+
+
+def test_dumps_numpy_and_dates() -> None:
+    data = {**DATA, "date": pd.Timestamp("2021-12-31 16:44:00"), "day": datetime(2021, 12, 1)}
+    expected = {
+        "name": "Супермаркеты",
+        "amount": 10.5,
+        "count": 3,
+        "values": [1, 2],
+        "date": "2021-12-31T16:44:00",
+        "day": "2021-12-01T00:00:00",
+    }
+    assert json.loads(dumps(data, indent=2)) == expected
+    assert json.loads(dumps(data, compact=True, backend="json")) == expected
+    assert json.loads(dumps(data, compact=True, backend="orjson")) == expected
+
+
+@pytest.mark.parametrize("backend", ["json", "orjson"])
+def test_dumps_compact(backend: str) -> None:
+    result = dumps(DATA, compact=True, backend=backend)
+    assert result == '{"name":"Супермаркеты","amount":10.5,"count":3,"values":[1,2]}'
+    assert dumps_bytes(DATA, compact=True, backend=backend) == result.encode("utf-8")
+
+
+def test_dumps_unsupported_type() -> None:
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_get_backend(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("JSON_SERIALIZER", "json")
+    assert get_backend() == "json"
+    monkeypatch.setenv("JSON_SERIALIZER", "unknown")
+    assert get_backend() == "orjson"
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert get_backend() == "json"
+    assert dumps(DATA, compact=True, backend="orjson").startswith('{"name":"Супермаркеты"')
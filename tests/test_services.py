@@ -1,9 +1,12 @@
 import json
 from typing import Any, Dict, List
 
+import pandas as pd
 import pytest
 
-from src.services import get_transactions_ind
+from src import services
+from src.features import add_features
+from src.services import get_transactions_ind, get_transfers_to_individuals, search_by_phone
 
 # Пример данных для тестов с необходимыми полями
 transactions_data: List[Dict[str, Any]] = [
@@ -168,5 +171,114 @@ def test_get_transactions_ind_missing_fields() -> None:
     assert result == "[]"
 
 
+def test_get_transfers_to_individuals_matches_get_transactions_ind() -> None:
+    """Выборка по признаку дает тот же JSON, что и get_transactions_ind"""
+    pattern: str = r"\b[А-Я][а-я]+\s[А-Я]\."
+    df = pd.DataFrame(transactions_data)
+    assert get_transfers_to_individuals(df) == get_transactions_ind(transactions_data, pattern)
+    assert get_transfers_to_individuals(add_features(df)) == get_transactions_ind(transactions_data, pattern)
+
+
+def test_get_transfers_to_individuals_empty() -> None:
+    assert get_transfers_to_individuals(pd.DataFrame(transactions_data[3:])) == "[]"
+
+
+def test_search_by_phone() -> None:
+    df = pd.DataFrame(transactions_data)
+    df.loc[3, "Описание"] = "МТС Mobile +7 981 333-44-55"
+    result = json.loads(search_by_phone(df).replace("NaN", "null"))
+    assert [transaction["Описание"] for transaction in result] == ["МТС Mobile +7 981 333-44-55"]
+
+
+def test_profitable_cashback_categories() -> None:
+    df = pd.DataFrame(transactions_data)
+    df.loc[0, ["Категория", "Сумма платежа"]] = ["Супермаркеты", -2000.0]
+    df.loc[1, "Категория"] = "Наличные"
+    result = json.loads(services.profitable_cashback_categories(df, 2018, 6))
+    assert result == {"Супермаркеты": 20.0, "Коммунальные": 15.0}
+    assert json.loads(services.profitable_cashback_categories(df, 2018, 7)) == {}
+
+
+def test_profitable_cashback_categories_rules() -> None:
+    df = pd.DataFrame(transactions_data)
+    df.loc[0, ["Категория", "Сумма платежа"]] = ["Супермаркеты", -2000.0]
+    df.loc[1, ["Категория", "Сумма платежа"]] = ["Супермаркеты", -1000.0]
+    df["Номер карты"] = ["*1111", "*2222", "*1111", "*1111"]
+    rules: List[Dict[str, Any]] = [{"category": "Супермаркеты", "rate": 0.05, "cap": 60}, {"rate": 0.02}]
+    result = json.loads(services.profitable_cashback_categories(df, 2018, 6, cashback_rules=rules))
+    # Лимит 60 действует для каждой карты отдельно: 60 по карте *1111 и 50 по карте *2222
+    assert result == {"Супермаркеты": 110.0, "Коммунальные": 30.0}
+
+
+def _charges_frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": [
+                "01.06.2018 10:00:00",
+                "01.06.2018 10:05:00",
+                "01.06.2018 10:30:00",
+                "01.06.2018 10:02:00",
+                "02.06.2018 12:00:00",
+                "01.06.2018 10:01:00",
+            ],
+            "Номер карты": ["*1111", "*1111", "*1111", "*2222", "*1111", "*1111"],
+            "Статус": ["OK", "OK", "OK", "OK", "OK", "FAILED"],
+            "Сумма платежа": [-100.0, -100.0, -100.0, -100.0, -100.0, -100.0],
+            "Описание": ["Магнит", "Магнит", "Магнит", "Магнит", "Магнит", "Магнит"],
+            "Категория": ["Супермаркеты"] * 6,
+        }
+    )
+
+
+def test_find_duplicate_charges() -> None:
+    result = json.loads(services.find_duplicate_charges(_charges_frame()))
+    assert [(row["Дата операции"], row["duplicate_group"]) for row in result] == [
+        ("01.06.2018 10:00:00", 1),
+        ("01.06.2018 10:05:00", 1),
+    ]
+    # С окном в 30 минут в серию попадает и третье списание
+    assert len(json.loads(services.find_duplicate_charges(_charges_frame(), window_minutes=30))) == 3
+
+
+def test_find_duplicate_charges_none() -> None:
+    assert services.find_duplicate_charges(pd.DataFrame(transactions_data)) == "[]"
+
+
+def test_find_anomalous_payments() -> None:
+    df = pd.DataFrame(
+        {
+            "Дата операции": [f"{day:02d}.06.2018 10:00:00" for day in range(1, 9)],
+            "Номер карты": ["*1111"] * 8,
+            "Сумма платежа": [-100.0, -110.0, -90.0, -105.0, -95.0, -100.0, -5000.0, 200.0],
+            "Категория": ["Супермаркеты"] * 7 + ["Пополнения"],
+        }
+    )
+    result = json.loads(services.find_anomalous_payments(df))
+    assert len(result) == 1
+    assert result[0]["Сумма платежа"] == -5000.0
+    assert result[0]["median_amount"] == 100.0
+    assert result[0]["robust_z"] > 3.5
+    # Группы меньше min_transactions не рассматриваются
+    assert services.find_anomalous_payments(df, min_transactions=10) == "[]"
+    assert len(json.loads(services.find_anomalous_payments(df, by=("Номер карты", "Категория")))) == 1
+
+
+def test_find_anomalous_payments_repeated_amounts() -> None:
+    """Если больше половины списаний группы одинаковы (MAD равен 0), выброс все равно находится."""
+    df = pd.DataFrame(
+        {
+            "Дата операции": [f"{day:02d}.06.2018 10:00:00" for day in range(1, 13)],
+            "Номер карты": ["*1111"] * 12,
+            "Сумма платежа": [-100.0] * 10 + [-100000.0, -100.0],
+            "Категория": ["Транспорт"] * 11 + ["Связь"],
+        }
+    )
+    result = json.loads(services.find_anomalous_payments(df))
+    assert [row["Сумма платежа"] for row in result] == [-100000.0]
+    assert result[0]["median_amount"] == 100.0
+    # Группа из одинаковых сумм выбросов не содержит
+    assert services.find_anomalous_payments(df[df["Сумма платежа"] == -100.0]) == "[]"
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.store import TransactionStore, is_store, open_store
+from src.utils import get_expenses_cards, top_transaction
+from src.views import form_main_page_info
+
+transactions = pd.DataFrame(
+    {
+        "Дата операции": ["15.12.2021 13:01:22", "10.12.2021 16:02:10", None, "26.11.2021 01:12:25"],
+        "Дата платежа": ["15.12.2021", "10.12.2021", "01.12.2021", "26.11.2021"],
+        "Номер карты": ["*7197", "*5091", "*7197", np.nan],
+        "Сумма платежа": [-300.0, -200.0, -50.0, 1000.0],
+        "Категория": ["Транспорт", "Еда", "Еда", "Пополнения"],
+        "Описание": ["Такси", "Ужин", "Обед", "Пополнение счета"],
+    }
+)
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> TransactionStore:
+    return TransactionStore.build(transactions, tmp_path / "store")
+
+
+def test_build_and_open(store: TransactionStore) -> None:
+    assert is_store(store.directory)
+    assert len(store) == 4
+    assert store.columns == ["Дата операции", "Дата платежа", "Номер карты", "Сумма платежа", "Категория", "Описание"]
+    assert isinstance(TransactionStore.open(store.directory).column("Сумма платежа"), np.memmap)
+
+
+def test_period_slice_is_view(store: TransactionStore) -> None:
+    rows = store.period_slice("2021-12-01", "2021-12-31 23:59:59")
+    amounts = store.column("Сумма платежа", rows)
+    assert amounts.tolist() == [-200.0, -300.0]
+    assert np.shares_memory(amounts, store.column("Сумма платежа"))
+
+
+def test_to_frame(store: TransactionStore) -> None:
+    df = store.to_frame()
+    # Строка без даты операции в выборки не попадает, остальные отсортированы по дате
+    assert df["Описание"].tolist() == ["Пополнение счета", "Ужин", "Такси"]
+    assert df["Номер карты"].isna().tolist() == [True, False, False]
+    assert df["Дата операции"].dtype == "datetime64[ns]"
+    assert np.shares_memory(df["Сумма платежа"].to_numpy(), store.column("Сумма платежа"))
+
+    categorical = store.to_frame(columns=["Категория"], categorical=True)
+    assert categorical["Категория"].cat.categories.tolist() == ["Транспорт", "Еда", "Пополнения"]
+
+
+def test_store_frame_in_utils(store: TransactionStore) -> None:
+    df = store.to_frame("2021-12-01", "2021-12-31")
+    assert [card["last_digits"] for card in get_expenses_cards(df)] == ["5091", "7197"]
+    assert top_transaction(df)[0]["description"] == "Ужин"
+
+
+def test_open_store_cached(store: TransactionStore) -> None:
+    assert open_store(store.directory) is open_store(store.directory)
+
+
+def test_form_main_page_info_from_store(store: TransactionStore) -> None:
+    result = form_main_page_info(
+        "2021-12-20 00:00:00", statement_path=store.directory, currency_rates=[], stock_prices=[]
+    )
+    assert isinstance(result, dict)
+    assert [card["last_digits"] for card in result["cards"]] == ["5091", "7197"]
+    assert len(result["top_transactions"]) == 2
+
+
+def test_rebuild_keeps_open_store_readable(store: TransactionStore) -> None:
+    amounts = store.column("Сумма платежа").copy()
+    rebuilt = TransactionStore.build(transactions.iloc[:2], store.directory)
+
+    # Ранее открытое хранилище читает прежние файлы, новое - файлы нового поколения
+    assert store.column("Сумма платежа").tolist() == amounts.tolist()
+    assert len(rebuilt) == 2
+    assert len(open_store(store.directory)) == 2
+
+    TransactionStore.build(transactions, store.directory)
+    assert len(list(store.directory.glob("*.npy"))) == 2 * len(store.columns)
@@ -0,0 +1,84 @@
+import json
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+import pytest
+import requests
+
+from src.stub_server import StubQuoteServer, _default_price
+from src.utils import get_currency_rates, get_stock_price
+from src.views import form_main_page_info
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> Iterator[StubQuoteServer]:
+    with StubQuoteServer() as stub:
+        for name, value in {**stub.environ(), "API_MODE": "live", "API_KEY": "stub", "API_KEY_STOCK": "stub"}.items():
+            monkeypatch.setenv(name, value)
+        yield stub
+
+
+def test_quotes_from_stub_server(server: StubQuoteServer) -> None:
+    assert get_currency_rates(["USD", "EUR"]) == [
+        {"currency": "USD", "rate": 73.21},
+        {"currency": "EUR", "rate": 83.19},
+    ]
+    assert get_stock_price(["AAPL", "XYZ"]) == [
+        {"stock": "AAPL", "price": 150.12},
+        {"stock": "XYZ", "price": _default_price("XYZ")},
+    ]
+    assert server.requests == 3
+
+
+def test_unknown_path(server: StubQuoteServer) -> None:
+    assert requests.get(f"{server.url}/unknown", timeout=5).status_code == 404
+
+
+def test_error_injection(server: StubQuoteServer) -> None:
+    server.error_rate = 1.0
+    assert get_stock_price(["AAPL", "MSFT"]) == []
+    assert get_currency_rates(["EUR"]) == []
+
+
+def test_error_rate_is_reproducible() -> None:
+    def failures(seed: int) -> list:
+        with StubQuoteServer(error_rate=0.5, seed=seed) as stub:
+            return [requests.get(f"{stub.url}/api/latest.json", timeout=5).status_code for _ in range(10)]
+
+    assert failures(1) == failures(1)
+    assert set(failures(1)) == {200, 500}
+
+
+def test_latency_injection(server: StubQuoteServer) -> None:
+    server.latency = 0.05
+    start = time.perf_counter()
+    get_stock_price(["AAPL", "MSFT"])
+    assert time.perf_counter() - start >= 0.1
+
+
+def test_invalid_error_rate() -> None:
+    with pytest.raises(ValueError):
+        StubQuoteServer(error_rate=1.5)
+
+
+def test_form_main_page_info_with_stub_server(server: StubQuoteServer, tmp_path: Path) -> None:
+    statement = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["10.12.2021 16:02:10"],
+            "Сумма платежа": [-200.0],
+            "Номер карты": ["*7197"],
+            "Категория": ["Еда"],
+            "Описание": ["Ужин"],
+        }
+    ).to_excel(statement, index=False)
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({"user_currencies": ["USD"], "user_stocks": ["AAPL"]}), encoding="utf-8")
+
+    result = form_main_page_info("2021-12-20 00:00:00", statement_path=statement, settings_path=settings)
+    assert isinstance(result, dict)
+    assert len(result["cards"]) == 1
+    assert result["currency_rates"] == [{"currency": "USD", "rate": 73.21}]
+    assert result["stock_prices"] == [{"stock": "AAPL", "price": 150.12}]
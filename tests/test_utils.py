@@ -1,13 +1,14 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, Dict, List
 from unittest.mock import MagicMock
 
 import pandas as pd
 import pytest
 from freezegun import freeze_time
 
-from src.utils import (get_currency_rates, get_data, get_dict_transaction, get_expenses_cards, get_stock_price,
-                       greeting_by_time_of_day, top_transaction)
+from src.utils import (TopTransactions, _detect_date_format, get_currency_rates, get_data, get_dict_transaction,
+                       get_expenses_cards, get_expenses_cards_by_month, get_stock_price, greeting_by_time_of_day,
+                       operation_dates, top_transaction, top_transactions_by_group, transaction_currency)
 
 # Тестовые данные
 mock_transactions = pd.DataFrame(
@@ -38,18 +39,125 @@ def test_get_data() -> None:
         get_data("Некорректная дата")
 
 
+def test_get_data_formats() -> None:
+    assert get_data("2021-01-15") == (datetime(2021, 1, 1), datetime(2021, 1, 15))
+    assert get_data("15/01/2021 10:00", date_format="%d/%m/%Y %H:%M")[1] == datetime(2021, 1, 15, 10, 0)
+
+
+def test_detect_date_format_cached() -> None:
+    _detect_date_format.cache_clear()
+    for _ in range(3):
+        assert _detect_date_format("20.12.2021 12:00:00") == "%d.%m.%Y %H:%M:%S"
+    # Шаблон строится только при первом вызове с этой строкой
+    assert _detect_date_format.cache_info().hits == 2
+    assert _detect_date_format("20/12/2021") is None
+
+
+statement = pd.DataFrame(
+    {
+        "Дата операции": ["03.02.2021 10:00:00", "31.01.2021 23:00:00", "15.01.2021 12:00:00", "28.12.2020 09:00:00"],
+        "Сумма платежа": [-100, -200, -300, -400],
+    }
+)
+
+
+def test_transaction_currency_sorted_slice() -> None:
+    result = transaction_currency(statement, "20.01.2021 00:00:00")
+    assert isinstance(result, pd.DataFrame)
+    assert result["Сумма платежа"].tolist() == [-300]
+    # Для отсортированной выписки возвращается срез исходного датафрейма
+    assert result.index.tolist() == [2]
+
+
+def test_transaction_currency_unsorted() -> None:
+    shuffled = statement.iloc[[2, 0, 3, 1]]
+    result = transaction_currency(shuffled, "31.01.2021 23:59:59")
+    assert sorted(result["Сумма платежа"].tolist()) == [-300, -200]
+
+
+def test_transaction_currency_many_dates() -> None:
+    result = transaction_currency(statement, ["31.01.2021 23:59:59", "2021-02-28", "2020-12-01"])
+    assert {date: len(rows) for date, rows in result.items()} == {
+        "31.01.2021 23:59:59": 2,
+        "2021-02-28": 1,
+        "2020-12-01": 0,
+    }
+
+
+def test_operation_dates_fallback() -> None:
+    dates = operation_dates(pd.DataFrame({"Дата операции": ["01.02.2021 10:00:00", "05.02.2021", None]}))
+    assert dates.tolist()[:2] == [pd.Timestamp("2021-02-01 10:00:00"), pd.Timestamp("2021-02-05")]
+    assert pd.isna(dates.iloc[2])
+
+
 def test_top_transaction() -> None:
     result = top_transaction(mock_transactions)
     assert len(result) == 3  # Ожидаем 3 транзакции
     assert result[0]["amount"] == -200  # Проверяем, что первая транзакция с самой высокой суммой
 
 
+def test_top_transaction_top_n() -> None:
+    result = top_transaction(mock_transactions, top_n=2)
+    assert [t["amount"] for t in result] == [-200, -500]
+    assert result[0]["date"] == "03.01.2021"
+
+
+def test_top_transactions_by_group() -> None:
+    result = top_transactions_by_group(mock_transactions, by="Номер карты", top_n=1)
+    assert result["1234567812345678"][0]["amount"] == -200
+    assert result["8765432187654321"][0]["amount"] == -500
+
+
+def test_top_transactions_incremental() -> None:
+    tracker = TopTransactions(top_n=2)
+    tracker.update(mock_transactions.iloc[:2])
+    assert [t["amount"] for t in tracker.result()] == [-500, -1000]
+    tracker.update(mock_transactions.iloc[2:])
+    assert tracker.result() == top_transaction(mock_transactions, top_n=2)
+
+
 def test_get_expenses_cards() -> None:
     result = get_expenses_cards(mock_transactions)
     assert len(result) == 2  # Ожидаем 2 уникальные карты
     assert result[0]["last_digits"] == "5678"  # Проверяем последние 4 цифры первой карты
 
 
+def test_get_expenses_cards_aggregates() -> None:
+    result = get_expenses_cards(mock_transactions)
+    assert result[0] == {
+        "last_digits": "5678",
+        "total_spent": 1200,
+        "cashback": 12.0,
+        "transactions": 2,
+        "income": 0,
+    }
+
+
+def test_get_expenses_cards_cashback_rules() -> None:
+    rules: List[Dict[str, Any]] = [
+        {"rate": 0.01},
+        {"category": "Еда", "rate": 0.05, "cap": 30},
+        {"category": "Топливо", "rate": 0.1},
+    ]
+    result = get_expenses_cards(mock_transactions, cashback_rules=rules)
+    # 1000 * 5% = 50, но ограничено лимитом 30; 200 * 1% = 2
+    assert result[0]["cashback"] == 32.0
+    assert result[1]["cashback"] == 50.0
+
+
+def test_get_expenses_cards_by_month() -> None:
+    transactions = pd.concat(
+        [mock_transactions, mock_transactions.assign(**{"Дата операции": pd.Timestamp("2021-02-05")})]
+    )
+    result = get_expenses_cards_by_month(transactions)
+    assert [(card["month"], card["last_digits"]) for card in result] == [
+        ("2021-01", "5678"),
+        ("2021-02", "5678"),
+        ("2021-01", "4321"),
+        ("2021-02", "4321"),
+    ]
+
+
 @pytest.mark.usefixtures("mocker")
 def test_get_dict_transaction(mocker: Any) -> None:
     # Используем mock для pd.read_excel
@@ -65,7 +173,7 @@ def test_get_currency_rates(mocker: Any, monkeypatch: pytest.MonkeyPatch) -> Non
     monkeypatch.setenv("API_KEY", "fake_api_key")
 
     mocker.patch(
-        "src.utils.requests.get",
+        "src.api_client.requests.get",
         return_value=MagicMock(status_code=200, json=lambda: {"rates": {"RUB": 73.21, "EUR": 87.08, "USD": 1.0}}),
     )
     result = get_currency_rates(["EUR", "USD"])
@@ -75,7 +183,7 @@ def test_get_currency_rates(mocker: Any, monkeypatch: pytest.MonkeyPatch) -> Non
 @pytest.mark.usefixtures("mocker")
 def test_get_stock_price(mocker: Any) -> None:
     mocker.patch(
-        "src.utils.requests.get",
+        "src.api_client.requests.get",
         return_value=MagicMock(status_code=200, json=lambda: {"Global Quote": {"05. price": "150.12"}}),
     )
     result = get_stock_price(["AAPL"])
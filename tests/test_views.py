@@ -1,12 +1,15 @@
+import asyncio
 import json
 import logging
 import os
+import tempfile
 import unittest
-from unittest.mock import patch
+from typing import Any, Dict
+from unittest.mock import MagicMock, patch
 
 import pandas as pd
 
-from src.views import form_main_page_info
+from src.views import PageDataCache, clear_page_cache, form_main_page_info, form_main_page_info_async, page_cache
 
 # Настройка логирования
 log_directory = "../logs"
@@ -28,6 +31,9 @@ if not logger.hasHandlers():
 
 class TestFormMainPageInfo(unittest.TestCase):
 
+    def setUp(self) -> None:
+        clear_page_cache()
+
     @patch("src.views.greeting_by_time_of_day")
     @patch("src.views.get_expenses_cards")
     @patch("src.views.pd.read_excel")
@@ -66,6 +72,192 @@ class TestFormMainPageInfo(unittest.TestCase):
             result_data = json.loads(result)
             self.assertEqual(result_data["error"], "Не удалось прочитать данные.")
 
+    @patch("src.views.load_user_stocks", return_value=[])
+    @patch("src.views.get_currency_rates", return_value=[])
+    @patch("src.views.pd.read_excel")
+    def test_form_main_page_info_with_timings(self, mock_read_excel: MagicMock, *mocks: MagicMock) -> None:
+        mock_read_excel.return_value = pd.DataFrame(
+            {
+                "Дата операции": ["10.12.2021 16:02:10", "15.12.2021 13:01:22"],
+                "Сумма платежа": [-200, -300],
+                "Номер карты": ["*7197", "*5091"],
+                "Категория": ["Еда", "Транспорт"],
+                "Описание": ["Ужин", "Такси"],
+            }
+        )
+        response = form_main_page_info("2021-12-25 14:52:20", return_json=True, with_timings=True)
+        assert isinstance(response, str)
+        result = json.loads(response)
+        stages = [record["stage"] for record in result["timings"]]
+        self.assertEqual(stages[:3], ["read_excel", "parse_dates", "filter_period"])
+        self.assertIn("currency_rates", stages)
+        self.assertEqual(result["timings"][0]["rows"], 2)
+
+        result = form_main_page_info("2021-12-25 14:52:20")
+        self.assertNotIn("timings", result)
+
+
+class TestFormMainPageInfoAsync(unittest.TestCase):
+
+    def setUp(self) -> None:
+        clear_page_cache()
+
+    @patch("src.views.load_user_stocks", return_value=["AAPL", "MSFT"])
+    @patch("src.views.load_user_currencies", return_value=["USD"])
+    @patch("src.views.get_stock_price", side_effect=lambda stocks: [{"stock": stocks[0], "price": 1.0}])
+    @patch("src.views.get_currency_rates", return_value=[{"currency": "USD", "rate": 90.0}])
+    @patch("src.views.greeting_by_time_of_day", return_value="Добрый день")
+    @patch("src.views.pd.read_excel")
+    def test_form_main_page_info_async(self, mock_read_excel: MagicMock, *mocks: MagicMock) -> None:
+        mock_read_excel.return_value = pd.DataFrame(
+            {
+                "Дата операции": ["10.12.2021 16:02:10", "15.12.2021 13:01:22", "26.12.2021 01:12:25"],
+                "Сумма платежа": [-200, -300, -150],
+                "Номер карты": ["*7197", "*5091", "*7197"],
+                "Категория": ["Еда", "Транспорт", "Развлечения"],
+                "Описание": ["Ужин", "Такси", "Фильм"],
+            }
+        )
+        result = asyncio.run(form_main_page_info_async("2021-12-25 14:52:20"))
+        assert isinstance(result, dict)
+        self.assertEqual(result["greeting"], "Добрый день")
+        self.assertEqual(len(result["cards"]), 2)
+        self.assertEqual(len(result["top_transactions"]), 2)
+        self.assertEqual(result["currency_rates"], [{"currency": "USD", "rate": 90.0}])
+        # Порядок акций сохраняется, хотя запросы выполняются параллельно
+        self.assertEqual([s["stock"] for s in result["stock_prices"]], ["AAPL", "MSFT"])
+
+    @patch("src.views.greeting_by_time_of_day", return_value="Добрый день")
+    @patch("src.views.get_stock_price")
+    @patch("src.views.get_currency_rates")
+    def test_async_matches_sync_arguments(
+        self, mock_rates: MagicMock, mock_stocks: MagicMock, mock_greeting: MagicMock
+    ) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            statement = os.path.join(tmp_dir, "operations.xlsx")
+            pd.DataFrame(
+                {
+                    "Дата операции": ["10.12.2021 16:02:10", "15.12.2021 13:01:22"],
+                    "Сумма платежа": [-200, -300],
+                    "Номер карты": ["*7197", "*5091"],
+                    "Категория": ["Еда", "Транспорт"],
+                    "Описание": ["Ужин", "Такси"],
+                }
+            ).to_excel(statement, index=False)
+            settings = os.path.join(tmp_dir, "user_settings.json")
+            with open(settings, "w", encoding="utf-8") as file:
+                json.dump({"user_currencies": ["EUR"], "user_stocks": ["TSLA"]}, file)
+
+            kwargs: Dict[str, Any] = {
+                "statement_path": statement,
+                "settings_path": settings,
+                "currency_rates": [{"currency": "EUR", "rate": 87.0}],
+                "stock_prices": [{"stock": "TSLA", "price": 700.0}],
+            }
+            expected = form_main_page_info("2021-12-20 12:00:00", **kwargs)
+            clear_page_cache()
+            result = asyncio.run(form_main_page_info_async("2021-12-20 12:00:00", **kwargs))
+
+        # Выписка и настройки пользователя учитываются, готовые котировки не запрашиваются повторно
+        self.assertEqual(result, expected)
+        assert isinstance(result, dict)
+        self.assertEqual(len(result["cards"]), 2)
+        self.assertEqual(result["currency_rates"], [{"currency": "EUR", "rate": 87.0}])
+        mock_rates.assert_not_called()
+        mock_stocks.assert_not_called()
+
+    def test_invalid_date_format_async(self) -> None:
+        result = asyncio.run(form_main_page_info_async("invalid_date"))
+        assert isinstance(result, str)
+        self.assertEqual(json.loads(result)["error"], "Некорректный формат даты.")
+
+    @patch("src.views.load_user_stocks", return_value=[])
+    @patch("src.views.get_currency_rates", return_value=[])
+    def test_read_excel_error_async(self, *mocks: MagicMock) -> None:
+        with patch("src.views.pd.read_excel", side_effect=FileNotFoundError):
+            result = asyncio.run(form_main_page_info_async("2021-12-17 14:52:20"))
+            assert isinstance(result, str)
+            self.assertEqual(json.loads(result)["error"], "Не удалось прочитать данные.")
+
+
+class TestPageDataCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        clear_page_cache()
+
+    @patch("src.views.get_stock_price", return_value=[])
+    @patch("src.views.get_currency_rates", return_value=[])
+    @patch("src.views.pd.read_excel")
+    def test_period_data_cached(
+        self, mock_read_excel: MagicMock, mock_rates: MagicMock, mock_stocks: MagicMock
+    ) -> None:
+        mock_read_excel.return_value = pd.DataFrame(
+            {
+                "Дата операции": ["10.12.2021 16:02:10"],
+                "Сумма платежа": [-200],
+                "Номер карты": ["*7197"],
+                "Категория": ["Еда"],
+                "Описание": ["Ужин"],
+            }
+        )
+        first = form_main_page_info("2021-12-25 14:52:20")
+        second = form_main_page_info("2021-12-25 14:52:20")
+        assert isinstance(first, dict) and isinstance(second, dict)
+        self.assertEqual(first["cards"], second["cards"])
+        self.assertEqual(mock_read_excel.call_count, 1)
+        # Котировки запрашиваются при каждом вызове
+        self.assertEqual(mock_rates.call_count, 2)
+
+        form_main_page_info("2021-12-26 14:52:20")
+        self.assertEqual(mock_read_excel.call_count, 2)
+        self.assertEqual((page_cache.hits, len(page_cache)), (1, 2))
+
+    @patch("src.views.get_stock_price", return_value=[])
+    @patch("src.views.get_currency_rates", return_value=[])
+    @patch("src.views.pd.read_excel")
+    def test_cached_data_not_changed_by_caller(self, mock_read_excel: MagicMock, *mocks: MagicMock) -> None:
+        mock_read_excel.return_value = pd.DataFrame(
+            {
+                "Дата операции": ["10.12.2021 16:02:10"],
+                "Сумма платежа": [-200],
+                "Номер карты": ["*7197"],
+                "Категория": ["Еда"],
+                "Описание": ["Ужин"],
+            }
+        )
+        first = form_main_page_info("2021-12-25 14:52:20")
+        assert isinstance(first, dict)
+        first["cards"].clear()
+        first["top_transactions"][0]["amount"] = 999
+
+        second = form_main_page_info("2021-12-25 14:52:20")
+        assert isinstance(second, dict)
+        second["top_transactions"].append({})
+        third = form_main_page_info("2021-12-25 14:52:20")
+        assert isinstance(third, dict)
+
+        self.assertEqual(page_cache.hits, 2)
+        for result in (second, third):
+            self.assertEqual(len(result["cards"]), 1)
+        self.assertEqual(
+            third["top_transactions"],
+            [{"date": "10.12.2021", "amount": -200, "category": "Еда", "description": "Ужин"}],
+        )
+
+    def test_lru_eviction(self) -> None:
+        cache = PageDataCache(max_entries=2)
+        for day in range(3):
+            cache.put((day,), (False, {"cards": [], "top_transactions": []}))
+        self.assertIsNone(cache.get((0,)))
+        self.assertIsNotNone(cache.get((2,)))
+
+    def test_size_limit(self) -> None:
+        cache = PageDataCache(max_bytes=100)
+        cache.put(("big",), (False, {"cards": ["x" * 200], "top_transactions": []}))
+        cache.put(("small",), (False, {"cards": [], "top_transactions": []}))
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get(("big",)))
+
 
 if __name__ == "__main__":
     unittest.main()